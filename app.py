@@ -3,18 +3,123 @@ from flask import render_template
 from flask import request
 from flask import make_response
 
+import functools
 import json
+import os
+import othello_ai
+import othello_analysis
+import othello_bitboard
+import othello_book
 import othello_logic
+import othello_mcts
+import othello_metrics
+import othello_parallel
+import othello_patterns
+import othello_records
+import othello_sessions
+import othello_solved
 
 app = Flask(__name__)
+app.config['AI_TIME_LIMIT_MS'] = othello_ai.DEFAULT_TIME_LIMIT_MS  # Default search deadline
+app.config['AI_MAX_TIME_LIMIT_MS'] = 2000  # Upper bound on a client-requested deadline
+app.config['OPENING_BOOK_DIR'] = os.environ.get('OTHELLO_BOOK_DIR', othello_book.DEFAULT_BOOK_DIR)
+app.config['RECORDS_PATH'] = os.environ.get('OTHELLO_RECORDS_FILE')  # Finished games are appended here when set
+app.config['SEARCH_WORKERS'] = int(os.environ.get('OTHELLO_SEARCH_WORKERS', '1'))  # Above 1, searches split the root
+
+# Game sessions are kept on disk when OTHELLO_SESSION_DIR is set, otherwise in memory
+if os.environ.get('OTHELLO_SESSION_DIR'):
+    sessions = othello_sessions.DiskSessionStore(os.environ['OTHELLO_SESSION_DIR'])
+else:
+    sessions = othello_sessions.MemorySessionStore()
+game_locks = othello_sessions.GameLocks()  # Held around every change to a game's session
+
+# Move analyses of recently viewed positions, shared by their symmetric variants
+analysis_cache = othello_analysis.AnalysisCache(int(os.environ.get('OTHELLO_ANALYSIS_CACHE_SIZE',
+                                                                   othello_analysis.DEFAULT_CACHE_SIZE)))
+
+# Monte Carlo tree search players of ai_move's 'mcts' engine, one per recently played game_id. A player keeps its
+# tree between the requests of its game. OTHELLO_MCTS_WORKERS trees are searched in parallel for every move
+mcts_players = othello_mcts.MctsPlayers(int(os.environ.get('OTHELLO_MCTS_GAMES', othello_mcts.DEFAULT_PLAYERS)),
+                                        workers=int(os.environ.get('OTHELLO_MCTS_WORKERS', '1')))
+
+# Route latency and stage timers for /metrics, off unless OTHELLO_METRICS=1. OTHELLO_PROFILE_RATE is the
+# fraction of requests run under cProfile, whose hottest functions /metrics/profile reports
+metrics = othello_metrics.Metrics(enabled=os.environ.get('OTHELLO_METRICS') == '1',
+                                  profile_rate=float(os.environ.get('OTHELLO_PROFILE_RATE', '0')))
+
+@app.before_request
+def start_request_metrics():
+    metrics.start_request(request.endpoint or 'unknown')
+
+@app.teardown_request
+def end_request_metrics(exception):
+    metrics.end_request()
+
+def opening_info(state: othello_logic.GameState) -> dict:
+    ''' Returns the opening name and suggested moves of a position, or None if it is not in the book '''
+    book = othello_book.load_book(state.n, app.config['OPENING_BOOK_DIR'])
+    entry = book.lookup_state(state) if book is not None else None
+    if entry is None:
+        return None
+    return { 'name': entry.name, 'moves': entry.moves }
+
+def board_format(req_body: dict) -> str:
+    ''' Returns the board wire format a request asks for, LIST_FORMAT by default. Incoming boards are read and
+        outgoing boards written in it '''
+    board_format = req_body.get('board_format', othello_logic.LIST_FORMAT)
+    if board_format not in othello_logic.BOARD_FORMATS:
+        raise othello_logic.InvalidBoardFormatError(f'Unknown board format {board_format!r}')
+    return board_format
+
+def request_game_info(req_body: dict) -> othello_logic.GameInfo:
+    ''' Returns the game info a request sends. Raises InvalidGameInfoError if it is missing or malformed '''
+    if 'game_info' not in req_body:
+        raise othello_logic.InvalidGameInfoError('Missing game info')
+    return othello_logic.decode_game_info(req_body['game_info'])
+
+@app.errorhandler(othello_logic.InvalidBoardFormatError)
+@app.errorhandler(othello_logic.InvalidGameInfoError)
+@app.errorhandler(othello_logic.InvalidPlayerError)
+def bad_request(error):
+    ''' Answers requests naming an unknown board format or sending a malformed board or game info '''
+    data = json.dumps({ 'message': str(error), 'status': 400 })
+    response = make_response(data)
+    response.content_type = 'application/json'
+    return response
+
+def search_function():
+    ''' Returns the search the AI routes run: othello_ai.search, or the root-split parallel search across
+        SEARCH_WORKERS processes '''
+    workers = app.config['SEARCH_WORKERS']
+    if workers > 1:
+        return functools.partial(othello_parallel.parallel_search, workers=workers)
+    return othello_ai.search
+
+def record_game(state: othello_logic.GameState, moves: [othello_logic.Move]) -> None:
+    ''' Appends a finished game to the records file, if one is configured '''
+    if app.config['RECORDS_PATH']:
+        othello_records.append_record(app.config['RECORDS_PATH'], othello_records.make_record(state, moves))
 
 @app.route('/game/new_game', methods=['POST'])
 def get_info():
     ''' Route for getting a blank board and game info '''
     # Returns a blank board (based on board size) and game info
-    board_size = int(request.json['boardSize'])
+    try:
+        board_size = int(request.json['boardSize'])
+    except (TypeError, ValueError):
+        board_size = None
+    fmt = board_format(request.json)
+    if board_size is None or not othello_logic.is_valid_board_size(board_size):
+        # Every size gets its own cached tables, so only the supported ones may be started
+        response = make_response(json.dumps({ 'message': 'Invalid board size', 'status': 400 }))
+        response.content_type = 'application/json'
+        return response
+    game_id = othello_sessions.new_game_id()
+    sessions.put(game_id, othello_sessions.new_session(board_size))
     
-    data = json.dumps({ 'board': othello_logic.empty_game_board(board_size), 'game_info': othello_logic.default_game_info() })
+    data = json.dumps({ 'board': othello_logic.encode_board(othello_logic.empty_game_board(board_size), fmt),
+                        'game_info': othello_logic.default_game_info(),
+                        'game_id': game_id })
     response = make_response(data)
     response.content_type = 'application/json'
 
@@ -24,57 +129,337 @@ def get_info():
 def update_game():
     ''' Route for making a move and updating the game state '''
     # Makes move if acceptable and returns updated board and game info, else return error msg
-    req_body = request.json
-    board = req_body['board']
-    game_info = othello_logic.GameInfo._make(req_body['game_info']) # Parse array into game_info namedtuple
-    move_row, move_column = int(req_body['move_row']), int(req_body['move_column'])
+    with metrics.stage('parse'):
+        req_body = request.json
+        fmt = board_format(req_body)
+        board = req_body['board']  # Rejected moves echo the board back as it was sent
+        game_info = request_game_info(req_body)
+        move_row, move_column = int(req_body['move_row']), int(req_body['move_column'])
 
     try:
-        is_valid_move, flank_map = othello_logic.is_valid_move(board, move_row, move_column, game_info.curr_turn)
-        if is_valid_move:
-            board = othello_logic.make_move(board, move_row, move_column, game_info.curr_turn, flank_map)
-            count_black = othello_logic.count_player_pieces(board, othello_logic.P_BLACK)
-            count_white = othello_logic.count_player_pieces(board, othello_logic.P_WHITE)
-            game_info = othello_logic.update_game_info(game_info, move_row, move_column, 
-                                                    count_black, count_white)
-            if othello_logic.is_game_over(board) is False:
-                data = json.dumps({ 
+        with metrics.stage('validate'):
+            state = othello_logic.GameState.from_board(othello_logic.decode_board(board, fmt), game_info)
+            flips = state.flips(othello_logic.Move(move_row, move_column))
+        if flips:
+            with metrics.stage('apply'):
+                state = state.apply(othello_logic.Move(move_row, move_column), flips)
+            with metrics.stage('convert'):
+                board, game_info = state.encoded_board(fmt), state.to_game_info()
+            if game_info.is_game_over and 'moves' in req_body:
+                # Clients that send the moves played so far get their finished games recorded
+                with metrics.stage('record'):
+                    moves = [othello_logic.Move(*move) for move in req_body['moves']]
+                    record_game(state, moves + [othello_logic.Move(move_row, move_column)])
+            if game_info.is_game_over is False:
+                with metrics.stage('opening'):
+                    opening = opening_info(state)
+                result = { 
                     'board': board, 
                     'game_info': game_info, 
                     'message': 'Move accepted', 
-                    'status': 200 
-                })
+                    'status': 200,
+                    'opening': opening
+                }
             else:
-                data = json.dumps({
+                result = {
                     'board': board,
                     'game_info': game_info,
                     'message': 'Game over',
                     'status': 201,
-                    'winner': othello_logic.P_BLACK if count_black > count_white else othello_logic.P_WHITE
-                })
+                    'winner': game_info.winner
+                }
         else:
-            data = json.dumps({ 
+            result = { 
                 'board': board, 
                 'game_info': game_info, 
                 'message': 'Invalid move', 
                 'status': 500 
-            })
+            }
     except othello_logic.InvalidMoveError:
-        data = json.dumps({ 
+        result = { 
             'board': board, 
             'game_info': game_info, 
             'message': 'Invalid move', 
             'status': 500 
-        })
-    finally:
-        response = make_response(data)
+        }
+    with metrics.stage('serialize'):
+        data = json.dumps(result)
+    response = make_response(data)
+    response.content_type = 'application/json'
+    return response
+
+def get_session(game_id: str) -> othello_sessions.Session:
+    ''' Returns the session of a game, or None if the id is unknown, expired or malformed '''
+    try:
+        return sessions.get(game_id)
+    except othello_sessions.InvalidGameIdError:
+        return None
+
+def request_state(req_body: dict) -> othello_logic.GameState:
+    ''' Returns the position a request names by { game_id } or { board, game_info }, or None for an unknown game '''
+    if 'game_id' in req_body:
+        session = get_session(req_body['game_id'])
+        return session.state if session is not None else None
+    board = othello_logic.decode_board(req_body['board'], board_format(req_body))
+    return othello_logic.GameState.from_board(board, request_game_info(req_body))
+
+def play_session_move(game_id: str, move: othello_logic.Move, precondition=None) -> dict:
+    ''' Makes a move in a server-held game. Returns the changed cells and new game info, else an error msg.
+        [precondition] is called with the session under the game's lock and may return an error msg instead '''
+    with game_locks.get(game_id):
+        with metrics.stage('session_load'):
+            session = get_session(game_id)
+        if session is None:
+            return { 'message': 'Unknown game', 'status': 404 }
+        error = precondition(session) if precondition is not None else None
+        if error is not None:
+            return error
+        state = session.state
+        try:
+            with metrics.stage('validate'):
+                flips = state.flips(move)
+            with metrics.stage('apply'):
+                session = othello_sessions.play(session, move, flips)
+        except othello_logic.InvalidMoveError:
+            return { 'game_info': state.to_game_info(), 'message': 'Invalid move', 'status': 500 }
+        new_state = session.state
+        record = new_state.is_game_over and not session.recorded
+        if record:
+            session = session._replace(recorded=True)
+        with metrics.stage('session_store'):
+            sessions.put(game_id, session)
+    if record:
+        with metrics.stage('record'):
+            record_game(new_state, othello_sessions.session_moves(session))
+    with metrics.stage('opening'):
+        opening = opening_info(new_state)
+    return {
+        'placed': [move.row, move.column, state.curr_turn],
+        'flipped': [[square // state.n, square % state.n] for square in othello_bitboard.iter_squares(flips)],
+        'game_info': new_state.to_game_info(),
+        'message': 'Game over' if new_state.is_game_over else 'Move accepted',
+        'status': 201 if new_state.is_game_over else 200,
+        'winner': new_state.winner,
+        'opening': opening
+    }
+
+@app.route('/game/move', methods=['POST'])
+def session_move():
+    ''' Route for making a move in a server-held game '''
+    # Makes move if acceptable and returns only the changed cells and new game info, else return error msg
+    req_body = request.json
+    move = othello_logic.Move(int(req_body['row']), int(req_body['column']))
+    result = play_session_move(req_body['game_id'], move)
+    with metrics.stage('serialize'):
+        data = json.dumps(result)
+    response = make_response(data)
+    response.content_type = 'application/json'
+    return response
+
+def step_session(game_id: str, step, done_message: str, empty_message: str,
+                 fmt: str = othello_logic.LIST_FORMAT) -> dict:
+    ''' Applies othello_sessions.undo or redo to a game. Returns the board and game info with the move taken back
+        or replayed, else an error msg '''
+    with game_locks.get(game_id):
+        session = get_session(game_id)
+        if session is None:
+            return { 'message': 'Unknown game', 'status': 404 }
+        new_session = step(session)
+        if new_session is None:
+            return { 'game_info': session.state.to_game_info(), 'message': empty_message, 'status': 500 }
+        sessions.put(game_id, new_session)
+    record = session.history[-1] if step is othello_sessions.undo else new_session.history[-1]
+    return {
+        'board': new_session.state.encoded_board(fmt),
+        'game_info': new_session.state.to_game_info(),
+        'move': [record.move.row, record.move.column, record.player],
+        'can_undo': bool(new_session.history),
+        'can_redo': bool(new_session.redo),
+        'message': done_message,
+        'status': 200
+    }
+
+@app.route('/game/undo', methods=['POST'])
+def undo_move():
+    ''' Route for taking back the last move of a server-held game '''
+    data = json.dumps(step_session(request.json['game_id'], othello_sessions.undo, 'Move undone', 'Nothing to undo',
+                                   board_format(request.json)))
+    response = make_response(data)
+    response.content_type = 'application/json'
+    return response
+
+@app.route('/game/redo', methods=['POST'])
+def redo_move():
+    ''' Route for replaying the last move taken back in a server-held game '''
+    data = json.dumps(step_session(request.json['game_id'], othello_sessions.redo, 'Move redone', 'Nothing to redo',
+                                   board_format(request.json)))
+    response = make_response(data)
+    response.content_type = 'application/json'
+    return response
+
+@app.route('/game/batch', methods=['POST'])
+def batch_moves():
+    ''' Route for playing many moves or move sequences in one request '''
+    # Each item is { board, game_info, moves: [[row, column], ...] }; returns every result and the throughput
+    fmt = board_format(request.json)
+    items = [(othello_logic.decode_board(item['board'], fmt), request_game_info(item),
+              [tuple(move) for move in item['moves']])
+             for item in request.json['items']]
+    batch = othello_logic.play_batch(items)
+    data = json.dumps({
+        'results': [result._replace(board=othello_logic.encode_board(result.board, fmt))._asdict()
+                    for result in batch.results],
+        'positions': batch.positions,
+        'elapsed_ms': batch.elapsed_ms,
+        'positions_per_second': batch.positions_per_second,
+        'status': 200
+    })
+    response = make_response(data)
+    response.content_type = 'application/json'
+    return response
+
+def choose_search_move(board: [[str]], game_info: othello_logic.GameInfo,
+                       time_limit_ms: int) -> othello_ai.SearchResult:
+    ''' Returns the alpha-beta search move, from the solved table or opening book when they have the position '''
+    book = othello_book.load_book(len(board), app.config['OPENING_BOOK_DIR'])
+    solved = othello_solved.load_table(len(board), app.config['OPENING_BOOK_DIR'])
+    evaluator = othello_patterns.load_weights(len(board), app.config['OPENING_BOOK_DIR']) or othello_ai.evaluate
+    with metrics.stage('search'):
+        return othello_ai.choose_move(board, game_info, time_limit_ms, evaluator=evaluator, book=book,
+                                      solved=solved, search_function=search_function())
+
+@app.route('/game/ai_move', methods=['POST'])
+def ai_move():
+    ''' Route for letting the computer make the move for the player to move '''
+    # Searches for a move within the time limit, makes it and returns updated board and game info.
+    # engine is 'search' (alpha-beta, the default) or 'mcts' (Monte Carlo tree search). An mcts request with a
+    # game_id reuses the tree of that game's earlier requests
+    req_body = request.json
+    fmt = board_format(req_body)
+    board = othello_logic.decode_board(req_body['board'], fmt)
+    game_info = request_game_info(req_body)
+    time_limit_ms = min(int(req_body.get('time_limit_ms', app.config['AI_TIME_LIMIT_MS'])),
+                        app.config['AI_MAX_TIME_LIMIT_MS'])
+    engine = req_body.get('engine', 'search')
+    if engine not in ('search', 'mcts'):
+        response = make_response(json.dumps({ 'message': 'Unknown engine', 'status': 400 }))
         response.content_type = 'application/json'
         return response
 
+    state = othello_logic.GameState.from_board(board, game_info)
+    try:
+        if state.is_game_over:
+            raise othello_ai.NoMovesError('The game is over')
+        if engine == 'mcts':
+            with metrics.stage('search'):
+                result = mcts_players.choose_move(req_body.get('game_id'), state, time_limit_ms)
+            search_info = { 'playouts': result.playouts, 'playouts_per_second': result.playouts_per_second,
+                            'visits': result.visits, 'win_rate': result.win_rate, 'elapsed_ms': result.elapsed_ms }
+        else:
+            result = choose_search_move(board, game_info, time_limit_ms)
+            search_info = { 'depth': result.depth, 'nodes': result.nodes, 'elapsed_ms': result.elapsed_ms }
+        if result.move is None:
+            raise othello_ai.NoMovesError(f'{game_info.curr_turn} has no legal moves')
+        with metrics.stage('apply'):
+            state = state.apply(result.move)
+        board, game_info = state.encoded_board(fmt), state.to_game_info()
+        data = json.dumps({
+            'board': board,
+            'game_info': game_info,
+            'message': 'Game over' if game_info.is_game_over else 'Move accepted',
+            'status': 201 if game_info.is_game_over else 200,
+            'winner': game_info.winner,
+            'search': search_info
+        })
+    except (othello_ai.NoMovesError, othello_mcts.NoMovesError, othello_logic.InvalidMoveError):
+        # A finished game, a player to move without moves or a move the position does not allow is the request's fault
+        data = json.dumps({
+            'board': othello_logic.encode_board(board, fmt),
+            'game_info': game_info,
+            'message': 'Game over' if state.is_game_over else 'No moves available',
+            'status': 400,
+            'winner': state.winner
+        })
+    response = make_response(data)
+    response.content_type = 'application/json'
+    return response
+
+@app.route('/game/hint', methods=['POST'])
+def hint():
+    ''' Route for the best move of the player to move, without making it '''
+    # Accepts { game_id } or { board, game_info }; solved small boards are answered from the table without searching
+    state = request_state(request.json)
+    if state is None:
+        data = json.dumps({ 'message': 'Unknown game', 'status': 404 })
+    elif state.is_game_over:
+        data = json.dumps({ 'message': 'Game over', 'status': 500 })
+    else:
+        solved = othello_solved.load_table(state.n, app.config['OPENING_BOOK_DIR'])
+        entry = solved.lookup_state(state) if solved is not None else None
+        if entry is not None:
+            data = json.dumps({ 'move': entry.move, 'score': entry.score, 'source': othello_ai.SOURCE_SOLVED,
+                                'status': 200 })
+        else:
+            book = othello_book.load_book(state.n, app.config['OPENING_BOOK_DIR'])
+            evaluator = othello_patterns.load_weights(state.n, app.config['OPENING_BOOK_DIR']) or othello_ai.evaluate
+            result = othello_ai.choose_move(state.to_board(), state.to_game_info(), app.config['AI_TIME_LIMIT_MS'],
+                                            evaluator=evaluator, book=book, search_function=search_function())
+            data = json.dumps({ 'move': result.move, 'score': result.score, 'source': result.source, 'status': 200 })
+    response = make_response(data)
+    response.content_type = 'application/json'
+    return response
+
+@app.route('/game/analyze', methods=['POST'])
+def analyze():
+    ''' Route for every legal move of the player to move with its flip count and a shallow search score '''
+    # Accepts { game_id } or { board, game_info } and an optional depth; popular positions are served from the cache
+    req_body = request.json
+    state = request_state(req_body)
+    if state is None:
+        data = json.dumps({ 'message': 'Unknown game', 'status': 404 })
+    else:
+        depth = max(1, min(int(req_body.get('depth', othello_analysis.DEFAULT_DEPTH)), othello_analysis.MAX_DEPTH))
+        with metrics.stage('analyze'):
+            moves, cached = othello_analysis.analyze(state, depth, analysis_cache)
+        data = json.dumps({
+            'moves': [{ 'row': analysis.move.row, 'column': analysis.move.column, 'flips': analysis.flip_count,
+                        'score': analysis.score } for analysis in moves],
+            'depth': depth,
+            'cached': cached,
+            'cache': analysis_cache.stats()._asdict(),
+            'status': 200
+        })
+    response = make_response(data)
+    response.content_type = 'application/json'
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_page():
+    ''' Route for the request and stage timers and the analysis cache counters in the Prometheus text format '''
+    cache_stats = analysis_cache.stats()
+    counters = [('othello_analysis_cache_hits_total', 'Analysis cache hits', cache_stats.hits),
+                ('othello_analysis_cache_misses_total', 'Analysis cache misses', cache_stats.misses)]
+    gauges = [('othello_analysis_cache_size', 'Positions in the analysis cache', cache_stats.size),
+              ('othello_analysis_cache_capacity', 'Analysis cache capacity', cache_stats.capacity),
+              ('othello_analysis_cache_hit_ratio', 'Analysis cache hits per lookup', cache_stats.hit_ratio)]
+    response = make_response(metrics.render() + othello_metrics.render_counters(counters)
+                             + othello_metrics.render_gauges(gauges))
+    response.content_type = othello_metrics.PROMETHEUS_CONTENT_TYPE
+    return response
+
+@app.route('/metrics/profile', methods=['GET'])
+def profile_page():
+    ''' Route for the hottest functions of the requests the profiler sampled '''
+    limit = int(request.args.get('limit', othello_metrics.DEFAULT_PROFILE_LIMIT))
+    response = make_response(metrics.profile_report(limit))
+    response.content_type = 'text/plain'
+    return response
+
 @app.route('/', methods=['GET'])
 def home_page():
     return render_template('index.html')
 
 
 if __name__ == '__main__':
+    othello_logic.CHECK_PIECE_COUNTS = True
     app.run(debug=True)
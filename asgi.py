@@ -0,0 +1,203 @@
+# asgi.py
+import asyncio
+import functools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+import app as flask_app
+import othello_ai
+import othello_book
+import othello_logic
+import othello_patterns
+import othello_sessions
+import othello_solved
+
+# Asynchronous serving mode, run with any ASGI server:  uvicorn asgi:application
+# HTTP requests are handed to the Flask app unchanged. A WebSocket at /game/ws/<game_id> carries the moves
+# of one server-held game: every accepted move is pushed to all sockets open on the game, and with
+# ?computer=B or ?computer=W the server answers with the computer's moves. Searches run in a process pool,
+# so the event loop keeps serving other games while the computer thinks.
+#
+# Client messages:  { "type": "move", "row": r, "column": c }  and  { "type": "ai_move" }
+# Server messages:  { "type": "state", "board", "game_info", "moves" } on connect, then
+#                   { "type": "move", ... } with the /game/move response fields for every move
+
+SOCKET_PATH_PREFIX = '/game/ws/'
+AI_WORKERS = int(os.environ.get('OTHELLO_AI_WORKERS', '0')) or None  # Default: one per core
+UNKNOWN_GAME_CLOSE_CODE = 4404
+
+http_application = WsgiToAsgi(flask_app.app)
+
+_executor = None
+_game_sockets = {}  # game id -> send callables of the sockets open on the game
+
+
+async def application(scope: dict, receive, send) -> None:
+    """ ASGI entry point """
+    if scope['type'] == 'http':
+        await http_application(scope, receive, send)
+    elif scope['type'] == 'websocket':
+        await game_socket(scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+
+
+async def lifespan(receive, send) -> None:
+    """ Starts the search process pool with the server and shuts it down with it """
+    global _executor
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            _get_executor()
+            await send({ 'type': 'lifespan.startup.complete' })
+        elif message['type'] == 'lifespan.shutdown':
+            if _executor is not None:
+                _executor.shutdown(cancel_futures=True)
+                _executor = None
+            await send({ 'type': 'lifespan.shutdown.complete' })
+            return
+
+
+async def game_socket(scope: dict, receive, send) -> None:
+    """ Serves one WebSocket connection to a game until the client disconnects """
+    await receive()  # websocket.connect
+    path = scope['path']
+    game_id = path[len(SOCKET_PATH_PREFIX):] if path.startswith(SOCKET_PATH_PREFIX) else None
+    session = await _get_session(game_id) if game_id else None
+    if session is None:
+        await send({ 'type': 'websocket.close', 'code': UNKNOWN_GAME_CLOSE_CODE })
+        return
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    computer = query.get('computer', [None])[0]
+    if computer not in (othello_logic.P_BLACK, othello_logic.P_WHITE):
+        computer = None
+    try:
+        time_limit_ms = int(query['ms'][0])
+    except (KeyError, ValueError):
+        time_limit_ms = flask_app.app.config['AI_TIME_LIMIT_MS']
+    time_limit_ms = min(time_limit_ms, flask_app.app.config['AI_MAX_TIME_LIMIT_MS'])
+
+    await send({ 'type': 'websocket.accept' })
+    sockets = _game_sockets.setdefault(game_id, set())
+    sockets.add(send)
+    try:
+        await _send_json(send, {
+            'type': 'state',
+            'board': session.state.to_board(),
+            'game_info': session.state.to_game_info(),
+            'moves': othello_sessions.session_moves(session)
+        })
+        if computer is not None:
+            await play_computer(game_id, computer, time_limit_ms)  # The computer may be first to move
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                return
+            try:
+                request = json.loads(message.get('text') or message.get('bytes') or '')
+                if request['type'] == 'move':
+                    move = othello_logic.Move(int(request['row']), int(request['column']))
+                    await player_move(game_id, move, send, computer, time_limit_ms)
+                elif request['type'] == 'ai_move':
+                    session = await _get_session(game_id)
+                    if session is not None:
+                        await play_computer(game_id, session.state.curr_turn, time_limit_ms, once=True)
+                else:
+                    raise KeyError
+            except (ValueError, TypeError, KeyError):
+                await _send_json(send, { 'type': 'error', 'message': 'Invalid request', 'status': 400 })
+    finally:
+        sockets.discard(send)
+        if not sockets:
+            del _game_sockets[game_id]
+
+
+async def player_move(game_id: str, move: othello_logic.Move, send, computer: str, time_limit_ms: int) -> None:
+    """ Makes a player's move and pushes it to every socket of the game, then lets the computer answer.
+        A rejected move is only reported back to the sender """
+    def computer_to_move(session):
+        if session.state.curr_turn == computer:
+            return { 'game_info': session.state.to_game_info(), 'message': 'Not your turn', 'status': 500 }
+        return None
+    data = await _play_session_move(game_id, move, computer_to_move)
+    data['type'] = 'move'
+    if data['status'] not in (200, 201):
+        await _send_json(send, data)
+        return
+    await _broadcast(game_id, data)
+    if computer is not None:
+        await play_computer(game_id, computer, time_limit_ms)
+
+
+async def play_computer(game_id: str, computer: str, time_limit_ms: int, once: bool = False) -> None:
+    """ Plays [computer]'s moves for as long as it is its turn (it moves again when the player passes),
+        searching in the process pool and pushing every move to the game's sockets """
+    loop = asyncio.get_running_loop()
+    while True:
+        session = await _get_session(game_id)
+        if session is None or session.state.is_game_over or session.state.curr_turn != computer:
+            return
+        state = session.state
+        result = await loop.run_in_executor(_get_executor(), search_move, state.to_board(), state.to_game_info(),
+                                            time_limit_ms, flask_app.app.config['OPENING_BOOK_DIR'])
+        def position_changed(session):
+            return { 'message': 'Position changed', 'status': 409 } if session.state != state else None
+        data = await _play_session_move(game_id, result.move, position_changed)
+        if data['status'] in (404, 409):
+            return  # The game expired, or another client moved while the computer was thinking
+        data['type'] = 'move'
+        data['search'] = { 'depth': result.depth, 'nodes': result.nodes, 'elapsed_ms': result.elapsed_ms }
+        await _broadcast(game_id, data)
+        if once or data['status'] != 200:
+            return
+
+
+def search_move(board: [[str]], game_info: othello_logic.GameInfo, time_limit_ms: int,
+                book_dir: str) -> othello_ai.SearchResult:
+    """ Worker task: searches for the move of the player to move. Books, solved tables and pattern weights are
+        opened once per worker process """
+    n = len(board)
+    evaluator = othello_patterns.load_weights(n, book_dir) or othello_ai.evaluate
+    return othello_ai.choose_move(board, game_info, time_limit_ms, evaluator=evaluator,
+                                  book=othello_book.load_book(n, book_dir),
+                                  solved=othello_solved.load_table(n, book_dir))
+
+
+# Helper functions
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """ Returns the search process pool, starting it on first use """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=AI_WORKERS)
+    return _executor
+
+
+async def _get_session(game_id: str) -> othello_sessions.Session:
+    """ Runs app.get_session in a thread, keeping the session store IO off the event loop """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, flask_app.get_session, game_id)
+
+
+async def _play_session_move(game_id: str, move: othello_logic.Move, precondition) -> dict:
+    """ Runs app.play_session_move in a thread: it takes the same per-game lock as the HTTP routes, so socket
+        and HTTP moves on one game are serialised, and the session store IO stays off the event loop """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(flask_app.play_session_move, game_id, move,
+                                                              precondition))
+
+
+async def _broadcast(game_id: str, data: dict) -> None:
+    """ Pushes a message to every socket open on a game """
+    text = json.dumps(data)
+    for socket_send in list(_game_sockets.get(game_id, ())):
+        await socket_send({ 'type': 'websocket.send', 'text': text })
+
+
+async def _send_json(send, data: dict) -> None:
+    await send({ 'type': 'websocket.send', 'text': json.dumps(data) })
@@ -0,0 +1,62 @@
+# benchmarks/conftest.py
+""" Benchmarks of the othello_logic hot paths, run with pytest-benchmark.
+
+    Save a baseline:     pytest benchmarks --benchmark-save=baseline
+    Compare against it:  pytest benchmarks --benchmark-compare=0001_baseline --benchmark-compare-fail=mean:10%
+
+    Results are stored as JSON under .benchmarks/. The compare run fails if any benchmark's mean
+    regresses by more than the given threshold. Every corpus is built from fixed seeds, so runs
+    on the same machine measure the same positions. """
+import os
+import random
+import sys
+from collections import namedtuple
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import othello_logic
+
+Position = namedtuple('Position', 'board game_info move')
+
+CORPUS_SEED = 20211
+CORPUS_GAMES = 40
+BOARD_SIZES = (4, 6, 8)
+
+
+def random_game_positions(n: int, games: int, seed: int) -> [Position]:
+    """ Returns every position of [games] seeded random games with the move played from it """
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(games):
+        state = othello_logic.GameState.new(n)
+        while not state.is_game_over:
+            move = rng.choice(sorted(state.legal_moves()))
+            positions.append(Position(state.to_board(), state.to_game_info(), move))
+            state = state.apply(move)
+    return positions
+
+
+@pytest.fixture(scope='session', params=BOARD_SIZES, ids=lambda n: f'{n}x{n}')
+def board_size(request) -> int:
+    return request.param
+
+
+@pytest.fixture(scope='session')
+def corpus(board_size) -> [Position]:
+    """ Seeded corpus of positions on the current board size """
+    return random_game_positions(board_size, CORPUS_GAMES, CORPUS_SEED + board_size)
+
+
+@pytest.fixture(scope='session')
+def corpus_seed() -> int:
+    return CORPUS_SEED
+
+
+@pytest.fixture(scope='session')
+def make_corpus():
+    """ Builds seeded corpora for benchmarks with their own board sizes: make_corpus(n, games) """
+    def make(n: int, games: int) -> [Position]:
+        return random_game_positions(n, games, CORPUS_SEED + n)
+    return make
@@ -0,0 +1,29 @@
+# benchmarks/test_app_benchmarks.py
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('flask')
+
+from app import app
+
+REQUESTS_PER_ROUND = 50
+
+
+@pytest.fixture(scope='module')
+def client():
+    return app.test_client()
+
+
+def test_request_move(benchmark, client, corpus):
+    bodies = [{
+        'board': position.board,
+        'game_info': position.game_info,
+        'move_row': position.move.row,
+        'move_column': position.move.column
+    } for position in corpus[:REQUESTS_PER_ROUND]]
+
+    def post_all():
+        for body in bodies:
+            response = client.post('/game/request_move', json=body)
+            assert response.status_code == 200
+    benchmark(post_all)
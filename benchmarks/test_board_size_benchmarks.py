@@ -0,0 +1,41 @@
+# benchmarks/test_board_size_benchmarks.py
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+import othello_logic
+
+LARGE_BOARD_SIZES = (8, 10, 12, 16)
+LARGE_CORPUS_GAMES = 10
+
+
+@pytest.fixture(scope='module', params=LARGE_BOARD_SIZES, ids=lambda n: f'{n}x{n}')
+def large_corpus(request, make_corpus) -> [(othello_logic.GameState, othello_logic.Move)]:
+    positions = make_corpus(request.param, LARGE_CORPUS_GAMES)
+    return [(othello_logic.GameState.from_board(position.board, position.game_info), position.move)
+            for position in positions]
+
+
+def record_per_move(benchmark, moves: int) -> None:
+    """ Stores the mean cost of one move, the figure to compare across board sizes """
+    benchmark.extra_info['moves'] = moves
+    if benchmark.stats is not None:
+        benchmark.extra_info['per_move_us'] = benchmark.stats.stats.mean / moves * 1e6
+
+
+def test_validate_and_play_per_move(benchmark, large_corpus):
+    def play_all():
+        for state, move in large_corpus:
+            state.apply(move, state.flips(move))
+    benchmark.group = 'validate and play one move'
+    benchmark(play_all)
+    record_per_move(benchmark, len(large_corpus))
+
+
+def test_legal_moves_per_position(benchmark, large_corpus):
+    def generate_all():
+        for state, _ in large_corpus:
+            state.legal_moves()
+    benchmark.group = 'legal moves of one position'
+    benchmark(generate_all)
+    record_per_move(benchmark, len(large_corpus))
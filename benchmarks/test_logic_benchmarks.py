@@ -0,0 +1,81 @@
+# benchmarks/test_logic_benchmarks.py
+import random
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+import othello_logic
+
+PLAYOUT_SEED = 7
+PLAYOUTS = 20
+
+
+def play_move(board: [[str]], game_info: othello_logic.GameInfo, move_row: int, move_column: int,
+              flips: int) -> ([[str]], othello_logic.GameInfo):
+    """ Makes a validated move on a list board through GameState. Returns the new board and game info """
+    state = othello_logic.GameState.from_board(board, game_info).apply(othello_logic.Move(move_row, move_column), flips)
+    return state.to_board(), state.to_game_info()
+
+
+def test_is_valid_move(benchmark, corpus):
+    def validate_all():
+        for position in corpus:
+            othello_logic.is_valid_move(position.board, position.move.row, position.move.column,
+                                        position.game_info.curr_turn)
+    benchmark(validate_all)
+
+
+def test_legal_moves(benchmark, corpus):
+    def generate_all():
+        for position in corpus:
+            othello_logic.legal_moves(position.board, position.game_info.curr_turn)
+    benchmark(generate_all)
+
+
+def test_make_move(benchmark, corpus):
+    moves = [(position, othello_logic.is_valid_move(position.board, position.move.row, position.move.column,
+                                                    position.game_info.curr_turn)[1]) for position in corpus]
+
+    def make_all():
+        for position, flips in moves:
+            othello_logic.make_move(position.board, position.move.row, position.move.column,
+                                    position.game_info.curr_turn, flips)
+    benchmark(make_all)
+
+
+def test_play_move(benchmark, corpus):
+    moves = [(position, othello_logic.is_valid_move(position.board, position.move.row, position.move.column,
+                                                    position.game_info.curr_turn)[1]) for position in corpus]
+
+    def play_all():
+        for position, flips in moves:
+            play_move(position.board, position.game_info, position.move.row, position.move.column, flips)
+    benchmark(play_all)
+
+
+def test_count_player_pieces(benchmark, corpus):
+    def count_all():
+        for position in corpus:
+            othello_logic.count_player_pieces(position.board, othello_logic.P_BLACK)
+            othello_logic.count_player_pieces(position.board, othello_logic.P_WHITE)
+    benchmark(count_all)
+
+
+def test_is_game_over(benchmark, corpus):
+    def check_all():
+        for position in corpus:
+            othello_logic.is_game_over(position.board)
+    benchmark(check_all)
+
+
+def test_random_playouts(benchmark, board_size):
+    def play_out():
+        rng = random.Random(PLAYOUT_SEED)
+        for _ in range(PLAYOUTS):
+            board, game_info = othello_logic.empty_game_board(board_size), othello_logic.default_game_info()
+            while not game_info.is_game_over:
+                moves = othello_logic.legal_moves(board, game_info.curr_turn)
+                move = rng.choice(sorted(moves))
+                board, game_info = play_move(board, game_info, move.row, move.column, moves[move])
+    benchmark(play_out)
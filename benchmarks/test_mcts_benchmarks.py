@@ -0,0 +1,25 @@
+# benchmarks/test_mcts_benchmarks.py
+import random
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+import othello_logic
+import othello_mcts
+
+PLAYOUT_POSITIONS = 50
+
+
+def test_random_playouts(benchmark, corpus, board_size, corpus_seed):
+    rng = random.Random(corpus_seed)
+    positions = [othello_logic.GameState.from_board(position.board, position.game_info).player_bitboards()
+                 for position in rng.sample(corpus, PLAYOUT_POSITIONS)]
+
+    def play_all():
+        for player, opponent in positions:
+            othello_mcts.playout(player, opponent, board_size, rng)
+    benchmark.group = 'random playouts'
+    benchmark(play_all)
+    if benchmark.stats is not None:
+        benchmark.extra_info['playouts_per_second'] = PLAYOUT_POSITIONS / benchmark.stats.stats.mean
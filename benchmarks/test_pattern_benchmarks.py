@@ -0,0 +1,26 @@
+# benchmarks/test_pattern_benchmarks.py
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+import othello_ai
+import othello_logic
+import othello_patterns
+
+
+@pytest.fixture(params=['classic', 'patterns'])
+def evaluator(request, board_size):
+    if request.param == 'classic':
+        return othello_ai.evaluate
+    return othello_patterns.PatternEvaluator(board_size)
+
+
+def test_leaf_evaluation(benchmark, corpus, evaluator, board_size):
+    positions = [othello_logic.GameState.from_board(position.board, position.game_info).player_bitboards()
+                 for position in corpus]
+
+    def evaluate_all():
+        for player, opponent in positions:
+            evaluator(player, opponent, board_size)
+    benchmark.group = f'evaluate {board_size}x{board_size} leaves'
+    benchmark(evaluate_all)
@@ -0,0 +1,39 @@
+# benchmarks/test_wire_format_benchmarks.py
+import json
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+import othello_logic
+
+
+@pytest.fixture(params=othello_logic.BOARD_FORMATS)
+def board_format(request) -> str:
+    return request.param
+
+
+def record_payload(benchmark, payloads: [str]) -> None:
+    """ Stores the mean size of one board's JSON, the figure to compare across formats """
+    benchmark.extra_info['boards'] = len(payloads)
+    benchmark.extra_info['bytes_per_board'] = sum(map(len, payloads)) / len(payloads)
+
+
+def test_encode_board(benchmark, corpus, board_format):
+    states = [othello_logic.GameState.from_board(position.board, position.game_info) for position in corpus]
+
+    def encode_all():
+        return [json.dumps(state.encoded_board(board_format)) for state in states]
+    benchmark.group = f'encode board {len(corpus[0].board)}x{len(corpus[0].board)}'
+    record_payload(benchmark, benchmark(encode_all))
+
+
+def test_decode_board(benchmark, corpus, board_format):
+    payloads = [json.dumps(othello_logic.encode_board(position.board, board_format)) for position in corpus]
+
+    def decode_all():
+        for payload in payloads:
+            othello_logic.decode_board(json.loads(payload), board_format)
+    benchmark.group = f'decode board {len(corpus[0].board)}x{len(corpus[0].board)}'
+    benchmark(decode_all)
+    record_payload(benchmark, payloads)
@@ -0,0 +1,309 @@
+# othello_ai.py
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+import othello_bitboard
+import othello_endgame
+import othello_hashing
+import othello_logic
+
+SOURCE_SEARCH = 'search'  # Where a SearchResult's move came from
+SOURCE_BOOK = 'book'
+SOURCE_SOLVED = 'solved'
+SearchResult = namedtuple('SearchResult', 'move score depth nodes elapsed_ms source', defaults=(SOURCE_SEARCH,))
+
+DEFAULT_TIME_LIMIT_MS = 200
+WIN_SCORE = 100000  # Added to the final disc differential of a finished game
+ENDGAME_EMPTIES = 10  # At or below this many empties the exact solver is tried first
+_DEADLINE_CHECK_INTERVAL = 8  # Nodes searched between clock reads
+
+
+def make_evaluator(mobility: int = 10, corners: int = 30, parity: int = 1):
+    """ Returns an evaluation function (player, opponent, n) -> score from the side to move's point of view,
+        weighting the mobility, corner and disc differences """
+    def evaluate(player: int, opponent: int, n: int) -> int:
+        corner_mask = _corner_mask(n)
+        score = parity * (othello_bitboard.popcount(player) - othello_bitboard.popcount(opponent))
+        score += corners * (othello_bitboard.popcount(player & corner_mask)
+                            - othello_bitboard.popcount(opponent & corner_mask))
+        score += mobility * (othello_bitboard.popcount(othello_bitboard.legal_moves_mask(player, opponent, n))
+                             - othello_bitboard.popcount(othello_bitboard.legal_moves_mask(opponent, player, n)))
+        return score
+    return evaluate
+
+
+evaluate = make_evaluator()
+
+
+def choose_move(board: [[str]], game_info: othello_logic.GameInfo, time_limit_ms: int = DEFAULT_TIME_LIMIT_MS,
+                evaluator=evaluate, max_depth: int = None,
+                table: othello_hashing.TranspositionTable = None, book=None, solved=None,
+                search_function=None) -> SearchResult:
+    """ Searches the board for the player to move in game_info. Returns the best move found within the time limit.
+        When a solved table or an opening book is given and has the position, its move is played without searching.
+        [search_function] replaces search(), e.g. with othello_parallel.parallel_search """
+    black, white = othello_logic.board_to_bitboards(board)
+    if game_info.curr_turn == othello_logic.P_BLACK:
+        player, opponent, color = black, white, othello_hashing.BLACK
+    else:
+        player, opponent, color = white, black, othello_hashing.WHITE
+    n = len(board)
+    if solved is not None and solved.n == n:
+        entry = solved.lookup(black, white, color)
+        if entry is not None and entry.move is not None:
+            return SearchResult(entry.move, _score_difference(entry.score), n * n, 0, 0.0, SOURCE_SOLVED)
+    if book is not None and book.n == n:
+        entry = book.lookup(black, white, color)
+        if entry is not None and entry.moves:
+            return SearchResult(entry.moves[0], 0, 0, 0, 0.0, SOURCE_BOOK)
+    result = (search_function or search)(player, opponent, n, time_limit_ms, evaluator, max_depth, color, table)
+    if result.move is None:
+        raise NoMovesError(f'{game_info.curr_turn} has no legal moves')
+    return result._replace(move=othello_logic.Move(result.move // n, result.move % n))
+
+
+def search(player: int, opponent: int, n: int, time_limit_ms: int = DEFAULT_TIME_LIMIT_MS,
+           evaluator=evaluate, max_depth: int = None, color: int = othello_hashing.BLACK,
+           table: othello_hashing.TranspositionTable = None) -> SearchResult:
+    """ Iterative deepening negamax search on bitboards. [color] is the colour of [player], used for hashing.
+        A table passed in is reused and keeps its entries, otherwise a new one is made for this search.
+        The result move is a square index, or None if [player] has no legal moves """
+    start = time.perf_counter()
+    if table is None:
+        table = othello_hashing.TranspositionTable()
+    searcher = _Searcher(n, evaluator, start + time_limit_ms / 1000, table)
+    moves = ordered_moves(player, opponent, n)
+    if not moves:
+        return SearchResult(None, 0, 0, 0, 0.0)
+    empties = n * n - othello_bitboard.popcount(player | opponent)
+    if empties <= ENDGAME_EMPTIES and max_depth is None:
+        # Solve exactly with half the time, falling back to the heuristic search if that is not enough
+        try:
+            solved = othello_endgame.solve(player, opponent, n, time_limit_ms=time_limit_ms / 2)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            return SearchResult(solved.move, _score_difference(solved.score), empties, solved.nodes, elapsed_ms)
+        except othello_endgame.SearchLimitError:
+            pass
+    max_depth = empties if max_depth is None else min(max_depth, empties)
+    best_move, best_score, completed_depth = moves[0][0], 0, 0
+    for depth in range(1, max_depth + 1):
+        try:
+            best_score, move = searcher.search_root(player, opponent, moves, depth, color)
+        except _SearchTimeout:
+            break
+        best_move, completed_depth = move, depth
+        # Search the best move first on the next iteration
+        moves.sort(key=lambda candidate: candidate[0] != best_move)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return SearchResult(best_move, best_score, completed_depth, searcher.nodes, elapsed_ms)
+
+
+def ordered_moves(player: int, opponent: int, n: int) -> [(int, int)]:
+    """ Returns the (square, flip mask) of every legal move of [player] in search order """
+    moves = othello_bitboard.legal_moves(player, opponent, n)
+    moves.sort(key=lambda move: _square_priority(n)[move[0]])
+    return moves
+
+
+def search_root_move(player: int, opponent: int, n: int, square: int, flips: int, depth: int, alpha: int,
+                     beta: int, evaluator=evaluate, color: int = othello_hashing.BLACK, deadline: float = float('inf'),
+                     table: othello_hashing.TranspositionTable = None) -> (int, int):
+    """ Searches one root move of [player] to [depth] within the (alpha, beta) window, [deadline] being a
+        time.perf_counter() time. Returns the move's score (an upper bound if it is not above alpha) and the nodes
+        searched, or None for the score if the deadline passed first """
+    if table is None:
+        table = othello_hashing.TranspositionTable()
+    searcher = _Searcher(n, evaluator, deadline, table)
+    black, white = (player, opponent) if color == othello_hashing.BLACK else (opponent, player)
+    key = othello_hashing.update_hash(othello_hashing.position_hash(black, white, n, color), square, flips, color, n)
+    new_player, new_opponent = othello_bitboard.apply_move(player, opponent, square, flips)
+    searcher.set_position(new_player, new_opponent, color)
+    try:
+        score = -searcher.negamax(new_opponent, new_player, depth - 1, -beta, -alpha, 1 - color, key)
+    except _SearchTimeout:
+        return None, searcher.nodes
+    return score, searcher.nodes
+
+
+def score_moves(player: int, opponent: int, n: int, depth: int, evaluator=evaluate,
+                color: int = othello_hashing.BLACK) -> [(int, int, int)]:
+    """ Scores every legal move of [player] with a full-window search to [depth].
+        Returns (square, flip mask, score) triples, best first """
+    searcher = _Searcher(n, evaluator, float('inf'), othello_hashing.TranspositionTable())
+    black, white = (player, opponent) if color == othello_hashing.BLACK else (opponent, player)
+    key = othello_hashing.position_hash(black, white, n, color)
+    scored = []
+    for square, flips in othello_bitboard.legal_moves(player, opponent, n):
+        new_player, new_opponent = othello_bitboard.apply_move(player, opponent, square, flips)
+        child_key = othello_hashing.update_hash(key, square, flips, color, n)
+        searcher.set_position(new_player, new_opponent, color)
+        score = -searcher.negamax(new_opponent, new_player, depth - 1, -WIN_SCORE * 2, WIN_SCORE * 2,
+                                  1 - color, child_key)
+        scored.append((square, flips, score))
+    scored.sort(key=lambda move: -move[2])
+    return scored
+
+
+# Helper functions
+
+
+@lru_cache(maxsize=None)
+def _corner_mask(n: int) -> int:
+    """ Returns the mask of the four corners of a nxn board """
+    return 1 | (1 << (n - 1)) | (1 << (n * (n - 1))) | (1 << (n * n - 1))
+
+
+@lru_cache(maxsize=None)
+def _square_priority(n: int) -> (int,):
+    """ Returns the move ordering priority of every square (lower is searched first):
+        corners, then edges, then the interior, then the cells next to the corners """
+    priorities = []
+    for square in range(n * n):
+        row, column = divmod(square, n)
+        on_row_edge, on_column_edge = row in (0, n - 1), column in (0, n - 1)
+        near_row_edge, near_column_edge = row in (0, 1, n - 2, n - 1), column in (0, 1, n - 2, n - 1)
+        if on_row_edge and on_column_edge:
+            priorities.append(0)
+        elif near_row_edge and near_column_edge:
+            priorities.append(3)  # Next to a corner, gives the corner away
+        elif on_row_edge or on_column_edge:
+            priorities.append(1)
+        else:
+            priorities.append(2)
+    return tuple(priorities)
+
+
+def _final_score(player: int, opponent: int) -> int:
+    """ Scores a finished game from [player]'s point of view """
+    return _score_difference(othello_bitboard.popcount(player) - othello_bitboard.popcount(opponent))
+
+
+def _score_difference(difference: int) -> int:
+    """ Scores a final disc differential so any win outranks every heuristic score """
+    if difference > 0:
+        return WIN_SCORE + difference
+    if difference < 0:
+        return -WIN_SCORE + difference
+    return 0
+
+
+class _Searcher:
+    """ Negamax alpha-beta search state for one move decision """
+    def __init__(self, n: int, evaluator, deadline: float, table: othello_hashing.TranspositionTable):
+        self.n = n
+        self.evaluator = evaluator
+        self.deadline = deadline
+        self.table = table
+        self.nodes = 0
+        self.priority = _square_priority(n)
+        # Pattern evaluators score black-1/white-2 pattern indices kept up to date move by move
+        self.patterns = getattr(evaluator, 'patterns', None) if hasattr(evaluator, 'score') else None
+        self.indices = None
+
+    def set_position(self, player: int, opponent: int, color: int) -> None:
+        """ Computes the pattern indices of the position the search starts from, for pattern evaluators """
+        if self.patterns is not None:
+            black, white = (player, opponent) if color == othello_hashing.BLACK else (opponent, player)
+            self.indices = self.patterns.indices(black, white)
+
+    def search_root(self, player: int, opponent: int, moves: [(int, int)], depth: int, color: int) -> (int, int):
+        """ Searches every root move to [depth]. Returns the best score and move """
+        n = self.n
+        black, white = (player, opponent) if color == othello_hashing.BLACK else (opponent, player)
+        key = othello_hashing.position_hash(black, white, n, color)
+        self.set_position(player, opponent, color)
+        indices = self.indices
+        alpha, beta = -WIN_SCORE * 2, WIN_SCORE * 2
+        best_move = moves[0][0]
+        for square, flips in moves:
+            new_player, new_opponent = othello_bitboard.apply_move(player, opponent, square, flips)
+            child_key = othello_hashing.update_hash(key, square, flips, color, n)
+            if indices is not None:
+                self.patterns.update(indices, square, flips, color)
+            try:
+                score = -self.negamax(new_opponent, new_player, depth - 1, -beta, -alpha, 1 - color, child_key)
+            finally:
+                # A timeout unwinds through here, and the indices must still match the position when it does
+                if indices is not None:
+                    self.patterns.undo(indices, square, flips, color)
+            if score > alpha:
+                alpha, best_move = score, square
+        return alpha, best_move
+
+    def negamax(self, player: int, opponent: int, depth: int, alpha: int, beta: int, color: int, key: int) -> int:
+        """ Returns the score of the position for [player] to move, searched to [depth] """
+        self.nodes += 1
+        if self.nodes % _DEADLINE_CHECK_INTERVAL == 0 and time.perf_counter() > self.deadline:
+            raise _SearchTimeout
+        n = self.n
+        move_mask = othello_bitboard.legal_moves_mask(player, opponent, n)
+        if not move_mask:
+            if not othello_bitboard.has_any_move(opponent, player, n):
+                return _final_score(player, opponent)
+            return -self.negamax(opponent, player, depth, -beta, -alpha, 1 - color,
+                                 othello_hashing.pass_hash(key, n))  # Pass
+        indices = self.indices
+        if depth <= 0:
+            if indices is not None:
+                return self.evaluator.score(indices, color, othello_bitboard.popcount(player | opponent))
+            return self.evaluator(player, opponent, n)
+
+        # Reuse a stored result for this position, or at least search its best move first
+        entry = self.table.probe(key)
+        table_move = None
+        if entry is not None:
+            if entry.depth >= depth:
+                if entry.flag == othello_hashing.EXACT:
+                    return entry.score
+                if entry.flag == othello_hashing.LOWER_BOUND:
+                    alpha = max(alpha, entry.score)
+                else:
+                    beta = min(beta, entry.score)
+                if alpha >= beta:
+                    return entry.score
+            table_move = entry.move
+
+        original_alpha = alpha
+        best_score, best_move = -WIN_SCORE * 2, None
+        squares = sorted(othello_bitboard.iter_squares(move_mask), key=self.priority.__getitem__)
+        if table_move is not None and move_mask >> table_move & 1:
+            squares.remove(table_move)
+            squares.insert(0, table_move)
+        for square in squares:
+            flips = othello_bitboard.flip_mask(player, opponent, square, n)
+            new_player, new_opponent = othello_bitboard.apply_move(player, opponent, square, flips)
+            child_key = othello_hashing.update_hash(key, square, flips, color, n)
+            if indices is not None:
+                self.patterns.update(indices, square, flips, color)
+            try:
+                score = -self.negamax(new_opponent, new_player, depth - 1, -beta, -alpha, 1 - color, child_key)
+            finally:
+                if indices is not None:
+                    self.patterns.undo(indices, square, flips, color)
+            if score > best_score:
+                best_score, best_move = score, square
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score <= original_alpha:
+            flag = othello_hashing.UPPER_BOUND
+        elif best_score >= beta:
+            flag = othello_hashing.LOWER_BOUND
+        else:
+            flag = othello_hashing.EXACT
+        self.table.store(key, depth, best_score, flag, best_move)
+        return best_score
+
+
+# Exception classes
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+class NoMovesError(Exception):
+    pass
@@ -0,0 +1,82 @@
+# othello_analysis.py
+import threading
+from collections import OrderedDict
+from collections import namedtuple
+
+import othello_ai
+import othello_bitboard
+import othello_hashing
+import othello_logic
+
+MoveAnalysis = namedtuple('MoveAnalysis', 'move flip_count score')
+CacheStats = namedtuple('CacheStats', 'hits misses size capacity hit_ratio')
+
+DEFAULT_DEPTH = 2
+MAX_DEPTH = 4
+DEFAULT_CACHE_SIZE = 4096
+
+
+class AnalysisCache:
+    """ Bounded LRU of move analyses keyed by (canonical position hash, depth), so the eight symmetric
+        variants of a position share one entry. Entries hold moves in the canonical orientation """
+    def __init__(self, capacity: int = DEFAULT_CACHE_SIZE):
+        self.capacity = capacity
+        self._entries = OrderedDict()  # (canonical key, depth) -> [(canonical square, flip count, score)]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: (int, int)) -> [(int, int, int)]:
+        """ Returns the entry for [key], or None """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: (int, int), entry: [(int, int, int)]) -> None:
+        """ Stores an entry, evicting the least recently used one past the capacity """
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """ Empties the cache and resets the counters """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> CacheStats:
+        """ Returns the hit and miss counters, the number of entries and the hit ratio """
+        lookups = self.hits + self.misses
+        return CacheStats(self.hits, self.misses, len(self._entries), self.capacity,
+                          self.hits / lookups if lookups else 0.0)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def analyze(state: othello_logic.GameState, depth: int = DEFAULT_DEPTH,
+            cache: AnalysisCache = None) -> ([MoveAnalysis], bool):
+    """ Returns every legal move of the player to move with its flip count and a [depth] search score,
+        best first, and whether the result came from [cache] """
+    n = state.n
+    color = othello_hashing.BLACK if state.curr_turn == othello_logic.P_BLACK else othello_hashing.WHITE
+    canonical_key, symmetry = othello_hashing.canonical_hash(state.black, state.white, n, color)
+    entry = cache.get((canonical_key, depth)) if cache is not None else None
+    cached = entry is not None
+    if entry is None:
+        player, opponent = state.player_bitboards()
+        to_canonical = othello_hashing.symmetry_permutations(n)[symmetry]
+        entry = [(to_canonical[square], othello_bitboard.popcount(flips), score)
+                 for square, flips, score in othello_ai.score_moves(player, opponent, n, depth, color=color)]
+        if cache is not None:
+            cache.put((canonical_key, depth), entry)
+    to_board = othello_hashing.inverse_symmetry_permutations(n)[symmetry]
+    return [MoveAnalysis(othello_logic.Move(*divmod(to_board[square], n)), flip_count, score)
+            for square, flip_count, score in entry], cached
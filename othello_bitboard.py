@@ -0,0 +1,144 @@
+# othello_bitboard.py
+from functools import lru_cache
+
+# A position is a pair of integers, one per player. Bit (row * n + column) is set when the player
+# owns the cell at (row, column). Python integers are unbounded, so the same code serves every board size.
+
+# (row step, column step) for each of the eight directions
+DIRECTION_STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1), (-1, -1), (-1, 1), (1, 1), (1, -1))
+
+
+@lru_cache(maxsize=None)
+def board_masks(n: int) -> (int, ((int, int),)):
+    """ Returns the full board mask and a (shift, pre-shift mask) pair for every direction of a nxn board.
+        The pre-shift mask clears the edge column a shift would otherwise wrap around. """
+    full = (1 << (n * n)) - 1
+    first_column = 0
+    for row in range(n):
+        first_column |= 1 << (row * n)
+    last_column = first_column << (n - 1)
+    directions = []
+    for row_step, column_step in DIRECTION_STEPS:
+        pre_mask = full
+        if column_step == 1:
+            pre_mask &= ~last_column
+        elif column_step == -1:
+            pre_mask &= ~first_column
+        directions.append((row_step * n + column_step, pre_mask))
+    return full, tuple(directions)
+
+
+def legal_moves_mask(player: int, opponent: int, n: int) -> int:
+    """ Returns a mask of every empty cell where [player] outflanks at least one opponent piece """
+    full, directions = board_masks(n)
+    empty = ~(player | opponent) & full
+    moves = 0
+    run_length = n - 3
+    for shift, pre_mask in directions:
+        if shift > 0:
+            run = ((player & pre_mask) << shift) & opponent
+            for _ in range(run_length):
+                run |= ((run & pre_mask) << shift) & opponent
+            moves |= ((run & pre_mask) << shift) & empty
+        else:
+            shift = -shift
+            run = ((player & pre_mask) >> shift) & opponent
+            for _ in range(run_length):
+                run |= ((run & pre_mask) >> shift) & opponent
+            moves |= ((run & pre_mask) >> shift) & empty
+    return moves
+
+
+@lru_cache(maxsize=None)
+def ray_tables(n: int) -> (((int, (int,)),),):
+    """ Returns, for every square of a nxn board, a (ray mask, cell bits) pair per direction holding the
+        single-bit masks of the cells along the ray, nearest first. Rays of fewer than two cells can never
+        outflank and are left out. Built once per board size """
+    tables = []
+    for square in range(n * n):
+        row, column = divmod(square, n)
+        rays = []
+        for row_step, column_step in DIRECTION_STEPS:
+            bits = []
+            ray_row, ray_column = row + row_step, column + column_step
+            while 0 <= ray_row < n and 0 <= ray_column < n:
+                bits.append(1 << (ray_row * n + ray_column))
+                ray_row, ray_column = ray_row + row_step, ray_column + column_step
+            if len(bits) >= 2:
+                mask = 0
+                for bit in bits:
+                    mask |= bit
+                rays.append((mask, tuple(bits)))
+        tables.append(tuple(rays))
+    return tuple(tables)
+
+
+def flip_mask(player: int, opponent: int, square: int, n: int) -> int:
+    """ Returns a mask of the opponent pieces flipped by [player] moving on [square] (0 if the move is illegal) """
+    flips = 0
+    for mask, bits in ray_tables(n)[square]:
+        if not (opponent & bits[0] and player & mask):
+            continue  # No adjacent opponent piece or nothing of the player's to close the line
+        line = 0
+        for bit in bits:
+            if opponent & bit:
+                line |= bit
+            else:
+                if player & bit:
+                    flips |= line
+                break
+    return flips
+
+
+def legal_moves(player: int, opponent: int, n: int) -> [(int, int)]:
+    """ Returns a (square, flip mask) pair for every legal move of [player] """
+    return [(square, flip_mask(player, opponent, square, n))
+            for square in iter_squares(legal_moves_mask(player, opponent, n))]
+
+
+def has_any_move(player: int, opponent: int, n: int) -> bool:
+    """ Checks whether [player] has a legal move, stopping at the first direction that yields one """
+    full, directions = board_masks(n)
+    empty = ~(player | opponent) & full
+    run_length = n - 3
+    for shift, pre_mask in directions:
+        if shift > 0:
+            run = ((player & pre_mask) << shift) & opponent
+            for _ in range(run_length):
+                run |= ((run & pre_mask) << shift) & opponent
+            if ((run & pre_mask) << shift) & empty:
+                return True
+        else:
+            shift = -shift
+            run = ((player & pre_mask) >> shift) & opponent
+            for _ in range(run_length):
+                run |= ((run & pre_mask) >> shift) & opponent
+            if ((run & pre_mask) >> shift) & empty:
+                return True
+    return False
+
+
+def apply_move(player: int, opponent: int, square: int, flips: int) -> (int, int):
+    """ Returns the (player, opponent) bitboards after [player] moves on [square] flipping [flips] """
+    return player | flips | (1 << square), opponent & ~flips
+
+
+def popcount(bits: int) -> int:
+    """ Counts the set bits of a bitboard """
+    return bin(bits).count('1')
+
+
+def iter_squares(bits: int):
+    """ Yields the index of every set bit, lowest first """
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+def initial_position(n: int) -> (int, int):
+    """ Returns the (black, white) bitboards of the starting position of a nxn board """
+    half = n // 2
+    black = (1 << ((half - 1) * n + half)) | (1 << (half * n + half - 1))
+    white = (1 << ((half - 1) * n + half - 1)) | (1 << (half * n + half))
+    return black, white
@@ -0,0 +1,288 @@
+# othello_book.py
+import argparse
+import mmap
+import os
+import struct
+from collections import namedtuple
+from functools import lru_cache
+
+import othello_ai
+import othello_hashing
+import othello_logic
+
+BookEntry = namedtuple('BookEntry', 'name moves')
+
+DEFAULT_BOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'books')
+BOOK_MAGIC = b'OTHB'
+FORMAT_VERSION = 1
+MAX_BOOK_MOVES = 5
+NO_NAME = 0xFFFF
+
+# File layout: header, records sorted by key, then a table-specific extra section
+_HEADER = struct.Struct('<4sHBxIIQ')  # magic, version, board size, record size, record count, extra offset
+_KEY = struct.Struct('<Q')
+_BOOK_RECORD = struct.Struct(f'<QHB{MAX_BOOK_MOVES}B')  # key, name id, move count, canonical move squares
+_NAME_COUNT = struct.Struct('<H')
+_NAME_OFFSET = struct.Struct('<I')
+
+# Well known 8x8 opening lines in standard notation (column letter, row number)
+OPENING_LINES = {
+    8: (('Perpendicular', 'f5 d6'),
+        ('Diagonal', 'f5 f6'),
+        ('Parallel', 'f5 f4'),
+        ('Cow', 'f5 d6 c5'),
+        ('Tiger', 'f5 d6 c3 d3 c4'),
+        ('Buffalo', 'f5 f6 e6 f4 c3'),
+        ('Heath', 'f5 f6 e6 f4 g5'))
+}
+
+
+class MappedTable:
+    """ Read-only file of fixed size records sorted by their leading 64 bit key. The file is memory-mapped,
+        so opening it parses nothing but the header and every process mapping it shares the same pages """
+    def __init__(self, path: str, magic: bytes):
+        self.path = path
+        with open(path, 'rb') as table_file:
+            self._map = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        file_magic, version, n, record_size, count, extra_offset = _HEADER.unpack_from(self._map, 0)
+        if file_magic != magic or version != FORMAT_VERSION:
+            self._map.close()
+            raise InvalidTableError(f'{path} is not a version {FORMAT_VERSION} {magic!r} table')
+        self.n = n
+        self.record_size = record_size
+        self.count = count
+        self.extra_offset = extra_offset
+
+    def find(self, key: int) -> int:
+        """ Binary searches for [key]. Returns the offset of its record, or -1 """
+        low, high = 0, self.count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            offset = _HEADER.size + middle * self.record_size
+            middle_key = _KEY.unpack_from(self._map, offset)[0]
+            if middle_key < key:
+                low = middle + 1
+            elif middle_key > key:
+                high = middle - 1
+            else:
+                return offset
+        return -1
+
+    def read(self, record: struct.Struct, offset: int) -> tuple:
+        """ Unpacks the record at [offset] """
+        return record.unpack_from(self._map, offset)
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __len__(self):
+        return self.count
+
+
+def write_table(path: str, magic: bytes, n: int, record: struct.Struct, records: [tuple], extra: bytes = b'') -> None:
+    """ Writes records (tuples starting with their key) as a MappedTable file, replacing [path] atomically """
+    records = sorted(records, key=lambda values: values[0])
+    extra_offset = _HEADER.size + len(records) * record.size
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as table_file:
+        table_file.write(_HEADER.pack(magic, FORMAT_VERSION, n, record.size, len(records), extra_offset))
+        for values in records:
+            table_file.write(record.pack(*values))
+        table_file.write(extra)
+    os.replace(temp_path, path)
+
+
+class OpeningBook(MappedTable):
+    """ Opening book keyed by canonical position hash, so the eight symmetric variants of a position
+        share one record. Suggested moves are stored in the canonical orientation """
+    def __init__(self, path: str):
+        super().__init__(path, BOOK_MAGIC)
+
+    def lookup(self, black: int, white: int, side_to_move: int) -> BookEntry:
+        """ Returns the opening name (or None) and suggested moves of a position, or None if it is not in the book """
+        key, symmetry = othello_hashing.canonical_hash(black, white, self.n, side_to_move)
+        offset = self.find(key)
+        if offset < 0:
+            return None
+        _, name_id, move_count, *squares = self.read(_BOOK_RECORD, offset)
+        to_board = othello_hashing.inverse_symmetry_permutations(self.n)[symmetry]
+        moves = [othello_logic.Move(*divmod(to_board[square], self.n)) for square in squares[:move_count]]
+        return BookEntry(self._name(name_id), moves)
+
+    def lookup_state(self, state: othello_logic.GameState) -> BookEntry:
+        """ Looks up the position of a game state """
+        if state.n != self.n or state.is_game_over:
+            return None
+        return self.lookup(state.black, state.white, _side_to_move(state.curr_turn))
+
+    def _name(self, name_id: int) -> str:
+        """ Reads an opening name from the names section """
+        if name_id == NO_NAME:
+            return None
+        offsets_start = self.extra_offset + _NAME_COUNT.size
+        start = _NAME_OFFSET.unpack_from(self._map, offsets_start + name_id * _NAME_OFFSET.size)[0]
+        end = _NAME_OFFSET.unpack_from(self._map, offsets_start + (name_id + 1) * _NAME_OFFSET.size)[0]
+        return self._map[start:end].decode('utf-8')
+
+
+def load_book(n: int, directory: str = DEFAULT_BOOK_DIR) -> OpeningBook:
+    """ Returns the opening book of a board size (opened once per process), or None if it has not been built.
+        A missing book is looked for again on the next call, so building one does not need a restart """
+    path = book_path(n, directory)
+    if not os.path.exists(path):
+        return None
+    return _open_book(path)
+
+
+@lru_cache(maxsize=None)
+def _open_book(path: str) -> OpeningBook:
+    """ Maps a book file once per path """
+    return OpeningBook(path)
+
+
+def book_path(n: int, directory: str = DEFAULT_BOOK_DIR) -> str:
+    """ Returns the default file of a board size's opening book """
+    return os.path.join(directory, f'opening_book_{n}.bin')
+
+
+# Book building
+
+
+def parse_line(text: str, n: int) -> [othello_logic.Move]:
+    """ Parses moves in standard notation such as 'f5 d6 c3', checking that they are legal in order """
+    state = othello_logic.GameState.new(n)
+    moves = []
+    for token in text.split():
+        column, row = ord(token[0].lower()) - ord('a'), int(token[1:]) - 1
+        move = othello_logic.Move(row, column)
+        try:
+            state = state.apply(move)
+        except othello_logic.InvalidMoveError:
+            raise InvalidBookLineError(f'Illegal move {token} in {text!r}')
+        moves.append(move)
+    return moves
+
+
+def read_lines_file(path: str) -> [(str, str)]:
+    """ Reads 'name: moves' opening lines from a text file. Blank lines and lines starting with # are skipped """
+    lines = []
+    with open(path) as lines_file:
+        for line in lines_file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                name, _, moves = line.partition(':')
+                lines.append((name.strip(), moves.strip()))
+    return lines
+
+
+def build_book(n: int, depth: int, search_depth: int = 3, lines: [(str, str)] = None) -> {int: (str, [int])}:
+    """ Enumerates every position up to [depth] plies from the start plus the positions along the named lines.
+        Each gets its best [MAX_BOOK_MOVES] moves by a [search_depth] search, a named line's next move first.
+        Returns {canonical key: (name, canonical move squares)} """
+    lines = OPENING_LINES.get(n, ()) if lines is None else lines
+    names, line_moves = {}, {}  # canonical key -> name / next line move
+    positions = {}  # canonical key -> (state, symmetry)
+
+    def add(state: othello_logic.GameState) -> (int, int):
+        key, symmetry = othello_hashing.canonical_hash(state.black, state.white, n, _side_to_move(state.curr_turn))
+        positions.setdefault(key, (state, symmetry))
+        return key, symmetry
+
+    frontier = [othello_logic.GameState.new(n)]
+    add(frontier[0])
+    for _ in range(depth):
+        next_frontier = []
+        for state in frontier:
+            for move in state.legal_moves():
+                child = state.apply(move)
+                if child.is_game_over:
+                    continue
+                key, _ = othello_hashing.canonical_hash(child.black, child.white, n, _side_to_move(child.curr_turn))
+                if key not in positions:
+                    add(child)
+                    next_frontier.append(child)
+        frontier = next_frontier
+
+    for name, text in sorted(lines, key=lambda line: len(line[1].split())):
+        state = othello_logic.GameState.new(n)
+        for move in parse_line(text, n):
+            key, symmetry = add(state)
+            line_moves.setdefault(key, othello_hashing.symmetry_permutations(n)[symmetry][move.row * n + move.column])
+            state = state.apply(move)
+        if not state.is_game_over:
+            key, _ = add(state)
+            names[key] = name  # Longer lines are named last and win
+
+    book = {}
+    for key, (state, symmetry) in positions.items():
+        player, opponent = state.player_bitboards()
+        to_canonical = othello_hashing.symmetry_permutations(n)[symmetry]
+        scored = othello_ai.score_moves(player, opponent, n, search_depth, color=_side_to_move(state.curr_turn))
+        squares = [to_canonical[square] for square, _, _ in scored]
+        if key in line_moves:
+            squares.remove(line_moves[key])
+            squares.insert(0, line_moves[key])
+        book[key] = (names.get(key), squares[:MAX_BOOK_MOVES])
+    return book
+
+
+def write_book(path: str, n: int, book: {int: (str, [int])}) -> None:
+    """ Writes a built book as an OpeningBook file """
+    names = sorted({name for name, _ in book.values() if name is not None})
+    name_ids = {name: name_id for name_id, name in enumerate(names)}
+    records = []
+    for key, (name, squares) in book.items():
+        padded = list(squares) + [0] * (MAX_BOOK_MOVES - len(squares))
+        records.append((key, name_ids.get(name, NO_NAME), len(squares), *padded))
+
+    # Names section: count, count + 1 absolute end offsets, then the UTF-8 names back to back
+    encoded = [name.encode('utf-8') for name in names]
+    extra_offset = _HEADER.size + len(records) * _BOOK_RECORD.size
+    data_offset = extra_offset + _NAME_COUNT.size + (len(encoded) + 1) * _NAME_OFFSET.size
+    extra = bytearray(_NAME_COUNT.pack(len(encoded)))
+    for name in encoded:
+        extra += _NAME_OFFSET.pack(data_offset)
+        data_offset += len(name)
+    extra += _NAME_OFFSET.pack(data_offset)
+    extra += b''.join(encoded)
+    write_table(path, BOOK_MAGIC, n, _BOOK_RECORD, records, bytes(extra))
+
+
+def _side_to_move(curr_turn: str) -> int:
+    """ Returns the hashing colour of the player to move """
+    return othello_hashing.BLACK if curr_turn == othello_logic.P_BLACK else othello_hashing.WHITE
+
+
+def main():
+    """ Builds an opening book from the command line """
+    parser = argparse.ArgumentParser(description='Build an opening book.')
+    parser.add_argument('-s', '--size', type=int, default=8, help='board size')
+    parser.add_argument('-d', '--depth', type=int, default=6, help='plies of every opening enumerated')
+    parser.add_argument('--search-depth', type=int, default=3, help='search depth used to rank book moves')
+    parser.add_argument('--lines', default=None, help='file of "name: moves" lines to import instead of the built-in')
+    parser.add_argument('-o', '--output', default=None, help='book file (default: books/opening_book_<size>.bin)')
+    args = parser.parse_args()
+    if not othello_logic.is_valid_board_size(args.size):
+        parser.error(f'invalid board size {args.size}')
+
+    lines = read_lines_file(args.lines) if args.lines else None
+    output = args.output or book_path(args.size)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    book = build_book(args.size, args.depth, args.search_depth, lines)
+    write_book(output, args.size, book)
+    print(f'Wrote {len(book)} positions to {output}')
+
+
+# Exception classes
+
+
+class InvalidTableError(Exception):
+    pass
+
+
+class InvalidBookLineError(Exception):
+    pass
+
+
+if __name__ == '__main__':
+    main()
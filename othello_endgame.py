@@ -0,0 +1,227 @@
+# othello_endgame.py
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+import othello_bitboard
+import othello_logic
+
+EndgameResult = namedtuple('EndgameResult', 'score move nodes elapsed_ms nodes_per_second')
+
+FASTEST_FIRST_EMPTIES = 7  # Above this many empties, moves leaving the opponent fewest replies go first
+_LIMIT_CHECK_INTERVAL = 1024  # Nodes searched between clock reads
+
+
+def solve_board(board: [[str]], curr_turn: str, node_limit: int = None, time_limit_ms: int = None) -> EndgameResult:
+    """ Solves a board exactly for [curr_turn]. The result move is a Move, or None if the player must pass
+        or the game is over """
+    black, white = othello_logic.board_to_bitboards(board)
+    player, opponent = (black, white) if curr_turn == othello_logic.P_BLACK else (white, black)
+    n = len(board)
+    result = solve(player, opponent, n, node_limit, time_limit_ms)
+    if result.move is None:
+        return result
+    return result._replace(move=othello_logic.Move(result.move // n, result.move % n))
+
+
+def solve(player: int, opponent: int, n: int, node_limit: int = None, time_limit_ms: int = None) -> EndgameResult:
+    """ Returns the final disc differential (player - opponent) under perfect play and the best move square.
+        Raises SearchLimitError when the node or time limit runs out first """
+    start = time.perf_counter()
+    solver = _Solver(n, node_limit, start + time_limit_ms / 1000 if time_limit_ms is not None else None)
+    score, move = solver.solve_root(player, opponent)
+    elapsed = time.perf_counter() - start
+    return EndgameResult(score, move, solver.nodes, elapsed * 1000, solver.nodes / elapsed if elapsed > 0 else 0.0)
+
+
+# Helper functions
+
+
+@lru_cache(maxsize=None)
+def _quadrant_masks(n: int) -> (int,):
+    """ Returns the masks of the four quadrants of a nxn board, the regions used for parity ordering """
+    half = n // 2
+    masks = [0, 0, 0, 0]
+    for square in range(n * n):
+        row, column = divmod(square, n)
+        masks[(row >= half) * 2 + (column >= half)] |= 1 << square
+    return tuple(masks)
+
+
+def _disc_difference(player: int, opponent: int) -> int:
+    return othello_bitboard.popcount(player) - othello_bitboard.popcount(opponent)
+
+
+class _Solver:
+    """ Exact alpha-beta search state for one endgame """
+    def __init__(self, n: int, node_limit: int, deadline: float):
+        self.n = n
+        self.node_limit = node_limit
+        self.deadline = deadline
+        self.nodes = 0
+        self.quadrants = _quadrant_masks(n)
+
+    def count_node(self) -> None:
+        """ Counts a node, raising SearchLimitError once a limit is exceeded """
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchLimitError(f'Node limit of {self.node_limit} reached')
+        if (self.deadline is not None and self.nodes % _LIMIT_CHECK_INTERVAL == 0
+                and time.perf_counter() > self.deadline):
+            raise SearchLimitError('Time limit reached')
+
+    def solve_root(self, player: int, opponent: int) -> (int, int):
+        """ Returns the exact score and best move square (None if there is no move) """
+        n = self.n
+        moves = self.ordered_moves(player, opponent)
+        if not moves:
+            if othello_bitboard.has_any_move(opponent, player, n):
+                return -self.negamax(opponent, player, -n * n, n * n), None
+            return _disc_difference(player, opponent), None
+        alpha, beta = -n * n - 1, n * n + 1
+        best_move = moves[0][0]
+        for square, flips in moves:
+            new_player, new_opponent = othello_bitboard.apply_move(player, opponent, square, flips)
+            score = -self.negamax(new_opponent, new_player, -beta, -alpha)
+            if score > alpha:
+                alpha, best_move = score, square
+        return alpha, best_move
+
+    def ordered_moves(self, player: int, opponent: int) -> [(int, int)]:
+        """ Returns the (square, flips) moves of [player], ordered fastest-first with many empties left,
+            otherwise odd-parity quadrants first """
+        n = self.n
+        moves = othello_bitboard.legal_moves(player, opponent, n)
+        empty = ~(player | opponent) & ((1 << (n * n)) - 1)
+        if othello_bitboard.popcount(empty) > FASTEST_FIRST_EMPTIES:
+            def opponent_mobility(move: (int, int)) -> int:
+                new_player, new_opponent = othello_bitboard.apply_move(player, opponent, *move)
+                return othello_bitboard.popcount(othello_bitboard.legal_moves_mask(new_opponent, new_player, n))
+            moves.sort(key=opponent_mobility)
+        else:
+            odd = 0
+            for quadrant in self.quadrants:
+                if othello_bitboard.popcount(empty & quadrant) & 1:
+                    odd |= quadrant
+            moves.sort(key=lambda move: not (odd >> move[0] & 1))
+        return moves
+
+    def negamax(self, player: int, opponent: int, alpha: int, beta: int) -> int:
+        """ Returns the exact score for [player] to move, within the (alpha, beta) window """
+        self.count_node()
+        n = self.n
+        empty = ~(player | opponent) & ((1 << (n * n)) - 1)
+        empties = othello_bitboard.popcount(empty)
+        if empties <= 3:
+            squares = list(othello_bitboard.iter_squares(empty))
+            if empties == 3:
+                return self.solve3(player, opponent, squares, alpha, beta)
+            if empties == 2:
+                return self.solve2(player, opponent, squares[0], squares[1], alpha, beta)
+            if empties == 1:
+                return self.solve1(player, opponent, squares[0])
+            return _disc_difference(player, opponent)
+
+        moves = self.ordered_moves(player, opponent)
+        if not moves:
+            if othello_bitboard.has_any_move(opponent, player, n):
+                return -self.negamax(opponent, player, -beta, -alpha)
+            return _disc_difference(player, opponent)
+        best = -n * n - 1
+        for square, flips in moves:
+            new_player, new_opponent = othello_bitboard.apply_move(player, opponent, square, flips)
+            score = -self.negamax(new_opponent, new_player, -beta, -alpha)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best
+
+    def solve3(self, player: int, opponent: int, squares: [int], alpha: int, beta: int) -> int:
+        """ Solves a position with three empties, trying the lone-quadrant empty first """
+        self.count_node()
+        n = self.n
+        quadrants = self.quadrants
+        # With one empty alone in its quadrant, playing it first keeps the last move in the pair
+        squares = sorted(squares, key=lambda square: sum(
+            1 for other in squares if any(quadrant >> square & 1 and quadrant >> other & 1 for quadrant in quadrants)))
+        best = None
+        for mover, other, sign in ((player, opponent, 1), (opponent, player, -1)):
+            for index, square in enumerate(squares):
+                flips = othello_bitboard.flip_mask(mover, other, square, n)
+                if not flips:
+                    continue
+                new_mover, new_other = othello_bitboard.apply_move(mover, other, square, flips)
+                rest = squares[:index] + squares[index + 1:]
+                if sign == 1:
+                    score = -self.solve2(new_other, new_mover, rest[0], rest[1], -beta, -alpha)
+                    if best is None or score > best:
+                        best = score
+                        if score > alpha:
+                            alpha = score
+                            if alpha >= beta:
+                                return best
+                else:
+                    # [player] passes: the opponent moves and [player] answers
+                    score = self.solve2(new_other, new_mover, rest[0], rest[1], alpha, beta)
+                    if best is None or score < best:
+                        best = score
+                        if score < beta:
+                            beta = score
+                            if alpha >= beta:
+                                return best
+            if best is not None:
+                return best
+        return _disc_difference(player, opponent)
+
+    def solve2(self, player: int, opponent: int, first: int, second: int, alpha: int, beta: int) -> int:
+        """ Solves a position with two empties without generating a move mask """
+        self.count_node()
+        n = self.n
+        best = None
+        for square, last in ((first, second), (second, first)):
+            flips = othello_bitboard.flip_mask(player, opponent, square, n)
+            if flips:
+                new_player, new_opponent = othello_bitboard.apply_move(player, opponent, square, flips)
+                score = -self.solve1(new_opponent, new_player, last)
+                if best is None or score > best:
+                    best = score
+                    if best >= beta:
+                        return best
+        if best is not None:
+            return best
+        # [player] passes
+        for square, last in ((first, second), (second, first)):
+            flips = othello_bitboard.flip_mask(opponent, player, square, n)
+            if flips:
+                new_opponent, new_player = othello_bitboard.apply_move(opponent, player, square, flips)
+                score = self.solve1(new_player, new_opponent, last)
+                if best is None or score < best:
+                    best = score
+                    if best <= alpha:
+                        return best
+        if best is not None:
+            return best
+        return _disc_difference(player, opponent)
+
+    def solve1(self, player: int, opponent: int, square: int) -> int:
+        """ Solves a position with one empty: only the flip counts matter """
+        self.nodes += 1
+        n = self.n
+        difference = _disc_difference(player, opponent)
+        flips = othello_bitboard.flip_mask(player, opponent, square, n)
+        if flips:
+            return difference + 2 * othello_bitboard.popcount(flips) + 1
+        flips = othello_bitboard.flip_mask(opponent, player, square, n)
+        if flips:
+            return difference - 2 * othello_bitboard.popcount(flips) - 1
+        return difference
+
+
+# Exception classes
+
+
+class SearchLimitError(Exception):
+    pass
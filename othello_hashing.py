@@ -0,0 +1,172 @@
+# othello_hashing.py
+import random
+from collections import namedtuple
+from functools import lru_cache
+
+import othello_bitboard
+
+TableEntry = namedtuple('TableEntry', 'key depth score flag move')
+TableStats = namedtuple('TableStats', 'hits misses collisions stores size capacity')
+ZobristKeys = namedtuple('ZobristKeys', 'black white flip side')
+
+BLACK = 0
+WHITE = 1
+ZOBRIST_SEED = 20211  # Fixed so hashes are stable across processes and runs
+
+# Transposition table score bounds
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+DEFAULT_TABLE_BITS = 16
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(n: int) -> ZobristKeys:
+    """ Returns the random 64 bit keys of a nxn board: one per cell per player, the per-cell flip key
+        (black key ^ white key) and the key toggled when the side to move changes """
+    rng = random.Random(ZOBRIST_SEED * 100 + n)
+    black = tuple(rng.getrandbits(64) for _ in range(n * n))
+    white = tuple(rng.getrandbits(64) for _ in range(n * n))
+    flip = tuple(black_key ^ white_key for black_key, white_key in zip(black, white))
+    return ZobristKeys(black, white, flip, rng.getrandbits(64))
+
+
+def position_hash(black: int, white: int, n: int, side_to_move: int) -> int:
+    """ Computes the Zobrist hash of a position from scratch """
+    keys = zobrist_keys(n)
+    key = keys.side if side_to_move == WHITE else 0
+    for square in othello_bitboard.iter_squares(black):
+        key ^= keys.black[square]
+    for square in othello_bitboard.iter_squares(white):
+        key ^= keys.white[square]
+    return key
+
+
+@lru_cache(maxsize=None)
+def symmetry_permutations(n: int) -> ((int,),):
+    """ Returns the eight symmetries of a nxn board (rotations and reflections, identity first)
+        as tuples mapping each square to its transformed square """
+    last = n - 1
+    transforms = (lambda row, column: (row, column),
+                  lambda row, column: (column, last - row),
+                  lambda row, column: (last - row, last - column),
+                  lambda row, column: (last - column, row),
+                  lambda row, column: (row, last - column),
+                  lambda row, column: (last - row, column),
+                  lambda row, column: (column, row),
+                  lambda row, column: (last - column, last - row))
+    permutations = []
+    for transform in transforms:
+        permutation = []
+        for square in range(n * n):
+            row, column = transform(*divmod(square, n))
+            permutation.append(row * n + column)
+        permutations.append(tuple(permutation))
+    return tuple(permutations)
+
+
+@lru_cache(maxsize=None)
+def inverse_symmetry_permutations(n: int) -> ((int,),):
+    """ Returns the inverse of every permutation of symmetry_permutations """
+    inverses = []
+    for permutation in symmetry_permutations(n):
+        inverse = [0] * (n * n)
+        for square, transformed in enumerate(permutation):
+            inverse[transformed] = square
+        inverses.append(tuple(inverse))
+    return tuple(inverses)
+
+
+@lru_cache(maxsize=None)
+def _symmetry_keys(n: int) -> (((int,), (int,)),):
+    """ Returns the (black, white) Zobrist keys of every symmetry, indexed by the untransformed square """
+    keys = zobrist_keys(n)
+    return tuple((tuple(keys.black[transformed] for transformed in permutation),
+                  tuple(keys.white[transformed] for transformed in permutation))
+                 for permutation in symmetry_permutations(n))
+
+
+def canonical_hash(black: int, white: int, n: int, side_to_move: int) -> (int, int):
+    """ Returns the smallest hash over the eight symmetries of the position, so all symmetric positions share
+        one key, and the index of the symmetry that produced it (see symmetry_permutations) """
+    black_squares = list(othello_bitboard.iter_squares(black))
+    white_squares = list(othello_bitboard.iter_squares(white))
+    side = zobrist_keys(n).side if side_to_move == WHITE else 0
+    best_key, best_symmetry = None, 0
+    for symmetry, (black_keys, white_keys) in enumerate(_symmetry_keys(n)):
+        key = side
+        for square in black_squares:
+            key ^= black_keys[square]
+        for square in white_squares:
+            key ^= white_keys[square]
+        if best_key is None or key < best_key:
+            best_key, best_symmetry = key, symmetry
+    return best_key, best_symmetry
+
+
+def update_hash(key: int, square: int, flips: int, color: int, n: int) -> int:
+    """ Returns the hash after [color] moves on [square] flipping [flips]; the side to move changes """
+    keys = zobrist_keys(n)
+    key ^= (keys.black if color == BLACK else keys.white)[square] ^ keys.side
+    flip_keys = keys.flip
+    for flipped in othello_bitboard.iter_squares(flips):
+        key ^= flip_keys[flipped]
+    return key
+
+
+def pass_hash(key: int, n: int) -> int:
+    """ Returns the hash after the side to move passes """
+    return key ^ zobrist_keys(n).side
+
+
+class TranspositionTable:
+    """ Fixed size two-tier hash table of search results. Each bucket holds a depth-preferred entry,
+        replaced only by searches at least as deep, and an always-replace entry for everything else """
+    def __init__(self, bits: int = DEFAULT_TABLE_BITS):
+        self.capacity = 1 << bits
+        self._mask = self.capacity - 1
+        self._deep = [None] * self.capacity
+        self._recent = [None] * self.capacity
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def probe(self, key: int) -> TableEntry:
+        """ Returns the entry stored for [key], or None """
+        index = key & self._mask
+        entry = self._deep[index]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        recent = self._recent[index]
+        if recent is not None and recent.key == key:
+            self.hits += 1
+            return recent
+        if entry is not None or recent is not None:
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, score: int, flag: int, move: int) -> None:
+        """ Stores a search result, keeping the deeper of the results that share a bucket """
+        index = key & self._mask
+        entry = TableEntry(key, depth, score, flag, move)
+        self.stores += 1
+        deep = self._deep[index]
+        if deep is None or depth >= deep.depth:
+            self._deep[index] = entry
+        else:
+            self._recent[index] = entry
+
+    def clear(self) -> None:
+        """ Empties the table and resets the counters """
+        self._deep = [None] * self.capacity
+        self._recent = [None] * self.capacity
+        self.hits = self.misses = self.collisions = self.stores = 0
+
+    def stats(self) -> TableStats:
+        """ Returns the hit, miss, collision and store counters and the number of filled slots """
+        size = sum(entry is not None for entry in self._deep) + sum(entry is not None for entry in self._recent)
+        return TableStats(self.hits, self.misses, self.collisions, self.stores, size, 2 * self.capacity)
@@ -1,17 +1,19 @@
 # othello_interface.py
+import othello_ai
 import othello_logic
+import othello_records
 
 
 def print_board(board: [[str]]) -> None:
     """ Prints the game board to the console """
     # Column indices
     print('\n')
-    print('  ', end='')
+    print('   ', end='')
     for col_index in range(len(board)):  # board has equal column to row
-        print(f' {col_index} ', end='')
+        print(f'{col_index:^3}', end='')  # Centred so two-digit indices on large boards stay aligned
     print('\n')
     for row_index in range(len(board)):
-        print(f'{row_index} ', end='')  # Row index
+        print(f'{row_index:<2} ', end='')  # Row index
         for col in board[row_index]:
             print(f' {col} ', end='')
         print('\n')
@@ -24,22 +26,41 @@ def print_game_over(winner: str) -> None:
     print(f'WINNER: {winner}')
 
 
-def game_loop():
-    """ Runs the game loop """
+def record_game(records_path: str, board: [[str]], game_info: othello_logic.GameInfo,
+                history: [othello_logic.MoveRecord]) -> None:
+    """ Appends the game to the records file, if one is given """
+    if records_path is not None:
+        state = othello_logic.GameState.from_board(board, game_info)
+        othello_records.append_record(records_path,
+                                      othello_records.make_record(state, [record.move for record in history]))
+
+
+def game_loop(records_path: str = None):
+    """ Runs the game loop. Games, finished or quit, are appended to [records_path] when it is given """
     print('#----------OTHELLO----------#')
     while True:  # Board size validation
         try:
-            board_size = int(input('Board size [4, 6, or 8] (or 0 to quit): '))
+            board_size = int(input('Board size [4, 6, 8, 10, 12, 14, or 16] (or 0 to quit): '))
             if board_size == 0:
                 return  # Game exited
             if othello_logic.is_valid_board_size(board_size):
                 break
             raise ValueError
         except ValueError:
-            print('Please enter a board size of 4, 6, or 8')
+            print('Please enter an even board size from 4 to 16')
+
+    while True:  # Computer opponent selection
+        computer_player = input('Computer plays [B, W, or none]: ').strip().upper()
+        if computer_player in (othello_logic.P_BLACK, othello_logic.P_WHITE):
+            break
+        if computer_player in ('', 'NONE'):
+            computer_player = None
+            break
+        print('Please enter B, W, or none')
 
     game_board = othello_logic.empty_game_board(board_size)
     game_info = othello_logic.default_game_info()
+    history = []  # MoveRecords of the moves played, so "undo" only restores the cells a move changed
     error_msg = None
 
     while True:  # Main game loop
@@ -51,34 +72,52 @@ def game_loop():
             print(error_msg)
         if game_info.prev_turn is not None and error_msg is None:
             print(f'Placed {game_info.prev_turn} at ({game_info.prev_move.row},{game_info.prev_move.column})')
-        print(f'Turn: {game_info.curr_turn}')
+            if game_info.passed_turn is not None:
+                print(f'{game_info.passed_turn} has no moves and passes')
         # Check if any moves left
-        if othello_logic.is_game_over(game_board):
-            winner = othello_logic.P_BLACK if game_info.black_count > game_info.white_count else othello_logic.P_WHITE
-            winner = 'TIE' if game_info.black_count == game_info.white_count else winner
-            return print_game_over(winner)
+        if game_info.is_game_over:
+            record_game(records_path, game_board, game_info, history)
+            return print_game_over(game_info.winner)
+        print(f'Turn: {game_info.curr_turn}')
+
+        if game_info.curr_turn == computer_player:
+            move = othello_ai.choose_move(game_board, game_info).move
+            flips = othello_logic.is_valid_move(game_board, move.row, move.column, game_info.curr_turn)[1]
+            game_info, record = othello_logic.make_move_in_place(game_board, game_info, move.row, move.column, flips)
+            history.append(record)
+            error_msg = None
+            continue
 
-        move = input('Please enter a move: [row] [col] (or "quit" to quit)\n')
+        move = input('Please enter a move: [row] [col] (or "undo" to take back, "quit" to quit)\n')
+        if move == 'undo':
+            # Against the computer, its reply is taken back too so it is the player's turn again
+            if not history or all(record.player == computer_player for record in history):
+                error_msg = 'Nothing to undo.'
+                continue
+            game_info = othello_logic.unmake_move(game_board, history.pop())
+            while history and game_info.curr_turn == computer_player:
+                game_info = othello_logic.unmake_move(game_board, history.pop())
+            error_msg = 'Move undone.'
+            continue
         if move == 'quit':
+            record_game(records_path, game_board, game_info, history)
             return print('Game quit. Game over!')
         try:
             move = move.split(' ')
             move_row, move_column = int(move[0]), int(move[1])
-            is_valid_move, flank_map = othello_logic.is_valid_move(game_board, move_row,
+            is_valid_move, flips = othello_logic.is_valid_move(game_board, move_row,
                                                                    move_column, game_info.curr_turn)
             if is_valid_move:
-                # Place player piece and flip opponent pieces
-                game_board = othello_logic.make_move(game_board, move_row, move_column, game_info.curr_turn, flank_map)
-                # Update game info with new piece counts
-                black_count = othello_logic.count_player_pieces(game_board, othello_logic.P_BLACK)
-                white_count = othello_logic.count_player_pieces(game_board, othello_logic.P_WHITE)
-                game_info = othello_logic.update_game_info(game_info, move_row, move_column, black_count, white_count)
+                # Place player piece, flip opponent pieces and update game info with new piece counts
+                game_info, record = othello_logic.make_move_in_place(game_board, game_info, move_row, move_column,
+                                                                     flips)
+                history.append(record)
                 error_msg = None
             else:
                 raise othello_logic.InvalidMoveError
         except othello_logic.InvalidMoveError:
             error_msg = 'Invalid move.'
         except ValueError:
-            error_msg = 'Please enter numbers in the range 0-9.'
+            error_msg = f'Please enter numbers in the range 0-{board_size - 1}.'
         except IndexError:
-            error_msg = 'Invalid move. Please enter a row number and a column number in the range 0-9.'
+            error_msg = f'Invalid move. Please enter a row number and a column number in the range 0-{board_size - 1}.'
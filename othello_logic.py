@@ -1,26 +1,44 @@
 # othello_logic.py
+import base64
+import binascii
+import time
 from collections import namedtuple
 
+import othello_bitboard
+import othello_hashing
+
 GameInfo = namedtuple('GameInfo', 'black_count '
                                   'white_count '
                                   'curr_turn '
                                   'winner '
                                   'is_game_over '
                                   'prev_move '
-                                  'prev_turn')
+                                  'prev_turn '
+                                  'passed_turn')
 Move = namedtuple('Move', 'row column')
-Direction = namedtuple('Direction', 'NORTH SOUTH EAST WEST NORTHWEST NORTHEAST SOUTHEAST SOUTHWEST')
+MoveRecord = namedtuple('MoveRecord', 'move player flips game_info')  # flips: mask; game_info: before the move
+BatchItemResult = namedtuple('BatchItemResult', 'board game_info moves_applied error')
+BatchResult = namedtuple('BatchResult', 'results positions elapsed_ms positions_per_second')
 
 P_BLACK = 'B'
 P_WHITE = 'W'
 EMPTY_CELL = '-'
-DIRECTION = Direction('north', 'south', 'east', 'west', 'northwest', 'northeast', 'southeast', 'southwest')
+TIE = 'TIE'
+LIST_FORMAT = 'list'  # Board wire formats: nested lists of cells,
+STRING_FORMAT = 'string'  # one string of n * n cells, row by row,
+PACKED_FORMAT = 'packed'  # or base64 of the board size byte and the black and white bitboards
+BOARD_FORMATS = (LIST_FORMAT, STRING_FORMAT, PACKED_FORMAT)
+_CELL_CHARS = frozenset((P_BLACK, P_WHITE, EMPTY_CELL))
+CHECK_PIECE_COUNTS = False  # Debug mode: verify incremental piece counts against a full recount
+
+_BLACK_BITS = str.maketrans({P_BLACK: '1', P_WHITE: '0', EMPTY_CELL: '0'})
+_WHITE_BITS = str.maketrans({P_BLACK: '0', P_WHITE: '1', EMPTY_CELL: '0'})
 
 
 def default_game_info() -> namedtuple:
     """ Returns namedtuple of game info
-        (black_count, white_count, curr_turn, winner, is_game_over, prev_move, prev_turn) """
-    return GameInfo(2, 2, 'B', None, False, None, None)
+        (black_count, white_count, curr_turn, winner, is_game_over, prev_move, prev_turn, passed_turn) """
+    return GameInfo(2, 2, 'B', None, False, None, None, None)
 
 
 def empty_game_board(n: int) -> [[str]]:
@@ -34,57 +52,408 @@ def empty_game_board(n: int) -> [[str]]:
 
 
 def update_game_info(game_info: GameInfo, curr_move_row: int, curr_move_column: int,
-                     new_black_count: int, new_white_count: int) -> GameInfo:
-    """ Returns updated game info """
+                     new_black_count: int, new_white_count: int, board: [[str]] = None) -> GameInfo:
+    """ Returns updated game info. When the board after the move is given, the next turn is resolved:
+        a player without moves passes (recorded in passed_turn) and the game ends when neither can move """
     prev_move = Move(curr_move_row, curr_move_column)
-    return game_info._replace(
+    game_info = game_info._replace(
         black_count=new_black_count,
         white_count=new_white_count,
         curr_turn=_change_turn(game_info.curr_turn),
         prev_move=prev_move,
-        prev_turn=game_info.curr_turn
+        prev_turn=game_info.curr_turn,
+        passed_turn=None
     )
+    if board is None:
+        return game_info
+    return _resolve_next_turn(game_info, board)
+
+
+def make_move(board: [[str]], move_row: int, move_column: int, curr_turn: str, flips: int) -> [[str]]:
+    """ Places a player piece on the board and flips opponent pieces that are outflanked. Returns new board,
+        leaving [board] unchanged. [flips] is the flip mask returned by is_valid_move """
+    n = len(board)
+    board = list(map(list, board))
+    board[move_row][move_column] = curr_turn
+    for square in othello_bitboard.iter_squares(flips):
+        board[square // n][square % n] = curr_turn
+    return board
 
 
-def make_move(board: [[str]], move_row: int, move_column: int, curr_turn: str, flank_map: dict) -> [[str]]:
-    """ Places a player piece on the board and flips opponent pieces that are outflanked. Returns new board. """
-    # Place a player piece
-    board = _place_piece_on_board(board, move_row, move_column, curr_turn)
-    # Flip opponent pieces that are outflanked
-    board = _flip_opponent_pieces(flank_map, board, move_row, move_column, curr_turn)
-    return board
+def make_move_in_place(board: [[str]], game_info: GameInfo, move_row: int, move_column: int,
+                       flips: int) -> (GameInfo, MoveRecord):
+    """ Makes a validated move by changing only the placed and flipped cells of [board].
+        Returns the new game info and the record unmake_move needs to take the move back """
+    n = len(board)
+    player = game_info.curr_turn
+    board[move_row][move_column] = player
+    for square in othello_bitboard.iter_squares(flips):
+        board[square // n][square % n] = player
+    flip_count = othello_bitboard.popcount(flips)
+    if player == P_BLACK:
+        black_count, white_count = game_info.black_count + flip_count + 1, game_info.white_count - flip_count
+    else:
+        black_count, white_count = game_info.black_count - flip_count, game_info.white_count + flip_count + 1
+    if CHECK_PIECE_COUNTS:
+        _check_piece_counts(*board_to_bitboards(board), black_count, white_count)
+    new_game_info = update_game_info(game_info, move_row, move_column, black_count, white_count, board)
+    return new_game_info, MoveRecord(Move(move_row, move_column), player, flips, game_info)
+
+
+def unmake_move(board: [[str]], record: MoveRecord) -> GameInfo:
+    """ Takes back a move made by make_move_in_place, restoring only the cells it changed.
+        Returns the game info from before the move """
+    n = len(board)
+    opponent = _change_turn(record.player)
+    board[record.move.row][record.move.column] = EMPTY_CELL
+    for square in othello_bitboard.iter_squares(record.flips):
+        board[square // n][square % n] = opponent
+    return record.game_info
 
 
 def count_player_pieces(board: [[str]], player: str) -> int:
     """ Counts the pieces of [player] on the board """
     if player != P_WHITE and player != P_BLACK:
         raise InvalidPlayerError('Player must be either B or W')
-    count = 0
-    for row in board:
-        for col in row:
-            if col == player:
-                count += 1
-    return count
+    return sum(row.count(player) for row in board)
+
+
+def legal_moves(board: [[str]], player: str) -> {Move: int}:
+    """ Returns every legal move of [player] mapped to the mask of opponent pieces it flips """
+    n = len(board)
+    player_bits, opponent_bits = _player_bitboards(board, player)
+    return {Move(square // n, square % n): flips
+            for square, flips in othello_bitboard.legal_moves(player_bits, opponent_bits, n)}
+
+
+def has_any_move(board: [[str]], player: str) -> bool:
+    """ Checks if [player] has at least one legal move """
+    player_bits, opponent_bits = _player_bitboards(board, player)
+    return othello_bitboard.has_any_move(player_bits, opponent_bits, len(board))
+
+
+def play_batch(items: [([[str]], GameInfo, [Move])]) -> BatchResult:
+    """ Plays many (board, game info, moves) items in one call. [moves] is a single move or a sequence of moves
+        played in order; a sequence stops at its first invalid move, whose index is reported as the error.
+        Returns every item's final board and game info along with the throughput in positions per second """
+    start = time.perf_counter()
+    results = []
+    positions = 0
+    for board, game_info, moves in items:
+        if isinstance(moves, Move) or (len(moves) == 2 and isinstance(moves[0], int)):
+            moves = (moves,)
+        state = GameState.from_board(board, decode_game_info(game_info))
+        applied, error = 0, None
+        for row, column in moves:
+            try:
+                state = state.apply(Move(row, column))
+            except InvalidMoveError:
+                error = applied
+                break
+            applied += 1
+        positions += applied
+        results.append(BatchItemResult(state.to_board(), state.to_game_info(), applied, error))
+    elapsed = time.perf_counter() - start
+    return BatchResult(results, positions, elapsed * 1000, positions / elapsed if elapsed > 0 else 0.0)
+
+
+# Game state
+
+
+class GameState:
+    """ Immutable game position: the board as (black, white) bitboards plus everything in GameInfo.
+        apply() returns a new state instead of changing this one, so states can be cached, hashed in O(1)
+        through their Zobrist key, and shared between threads """
+    __slots__ = ('n', 'black', 'white', 'curr_turn', 'black_count', 'white_count', 'winner', 'is_game_over',
+                 'prev_move', 'prev_turn', 'passed_turn', '_key')
+
+    def __init__(self, n: int, black: int, white: int, curr_turn: str = P_BLACK, winner: str = None,
+                 is_game_over: bool = False, prev_move: Move = None, prev_turn: str = None, passed_turn: str = None,
+                 black_count: int = None, white_count: int = None, key: int = None):
+        if curr_turn != P_WHITE and curr_turn != P_BLACK:
+            raise InvalidPlayerError('Player must be either B or W')
+        set_slot = object.__setattr__
+        set_slot(self, 'n', n)
+        set_slot(self, 'black', black)
+        set_slot(self, 'white', white)
+        set_slot(self, 'curr_turn', curr_turn)
+        set_slot(self, 'winner', winner)
+        set_slot(self, 'is_game_over', is_game_over)
+        set_slot(self, 'prev_move', prev_move)
+        set_slot(self, 'prev_turn', prev_turn)
+        set_slot(self, 'passed_turn', passed_turn)
+        set_slot(self, 'black_count', othello_bitboard.popcount(black) if black_count is None else black_count)
+        set_slot(self, 'white_count', othello_bitboard.popcount(white) if white_count is None else white_count)
+        set_slot(self, '_key', key)  # Hashed on first use, as states parsed from a request often never need it
+
+    @classmethod
+    def new(cls, n: int) -> 'GameState':
+        """ Returns the starting state of a nxn game """
+        black, white = othello_bitboard.initial_position(n)
+        return cls(n, black, white)
+
+    @classmethod
+    def from_board(cls, board: [[str]], game_info: GameInfo = None, curr_turn: str = None) -> 'GameState':
+        """ Builds a state from a board and its game info. Without game info the piece counts are taken
+            from the board; [curr_turn] overrides the player to move """
+        black, white = board_to_bitboards(board)
+        if game_info is None:
+            return cls(len(board), black, white, curr_turn or P_BLACK)
+        prev_move = Move._make(game_info.prev_move) if game_info.prev_move is not None else None
+        return cls(len(board), black, white, curr_turn or game_info.curr_turn, game_info.winner,
+                   game_info.is_game_over, prev_move, game_info.prev_turn, game_info.passed_turn,
+                   game_info.black_count, game_info.white_count)
+
+    @property
+    def key(self) -> int:
+        """ The Zobrist key of the position and the player to move """
+        if self._key is None:
+            object.__setattr__(self, '_key', othello_hashing.position_hash(self.black, self.white, self.n,
+                                                                           _color(self.curr_turn)))
+        return self._key
+
+    def to_board(self) -> [[str]]:
+        """ Returns the board as a list of rows """
+        return bitboards_to_board(self.black, self.white, self.n)
+
+    def to_game_info(self) -> GameInfo:
+        """ Returns the game info of this state """
+        return GameInfo(self.black_count, self.white_count, self.curr_turn, self.winner, self.is_game_over,
+                        self.prev_move, self.prev_turn, self.passed_turn)
+
+    def player_bitboards(self) -> (int, int):
+        """ Returns the (player to move, opponent) bitboards """
+        return (self.black, self.white) if self.curr_turn == P_BLACK else (self.white, self.black)
+
+    def flips(self, move: Move) -> int:
+        """ Returns the mask of pieces the player to move flips with [move], 0 if it outflanks nothing.
+            Raises InvalidMoveError if the cell is off the board or taken """
+        n = self.n
+        if (move.row < 0 or move.row > n - 1) or (move.column < 0 or move.column > n - 1):
+            raise InvalidMoveError
+        square = move.row * n + move.column
+        if (self.black | self.white) >> square & 1:
+            raise InvalidMoveError
+        player, opponent = self.player_bitboards()
+        return othello_bitboard.flip_mask(player, opponent, square, n)
+
+    def legal_moves(self) -> {Move: int}:
+        """ Returns every legal move of the player to move mapped to its flip mask """
+        n = self.n
+        player, opponent = self.player_bitboards()
+        return {Move(square // n, square % n): flips
+                for square, flips in othello_bitboard.legal_moves(player, opponent, n)}
+
+    def has_any_move(self) -> bool:
+        """ Checks if the player to move has at least one legal move """
+        player, opponent = self.player_bitboards()
+        return othello_bitboard.has_any_move(player, opponent, self.n)
+
+    def apply(self, move: Move, flips: int = None) -> 'GameState':
+        """ Returns the state after the player to move makes [move], resolving passes and game over.
+            [flips] may be given when already known from validation """
+        if flips is None:
+            flips = self.flips(move)
+        if self.is_game_over or not flips:
+            raise InvalidMoveError
+        n = self.n
+        square = move.row * n + move.column
+        player, opponent = othello_bitboard.apply_move(*self.player_bitboards(), square, flips)
+        flip_count = othello_bitboard.popcount(flips)
+        mover, color = self.curr_turn, _color(self.curr_turn)
+        key = self._key
+        if key is not None:  # An unhashed state's children are hashed lazily too
+            key = othello_hashing.update_hash(key, square, flips, color, n)
+        if mover == P_BLACK:
+            black, white = player, opponent
+            black_count, white_count = self.black_count + flip_count + 1, self.white_count - flip_count
+        else:
+            black, white = opponent, player
+            black_count, white_count = self.black_count - flip_count, self.white_count + flip_count + 1
+        if CHECK_PIECE_COUNTS:
+            _check_piece_counts(black, white, black_count, white_count)
+
+        curr_turn, passed_turn, winner, is_game_over = _change_turn(mover), None, None, False
+        if not othello_bitboard.has_any_move(opponent, player, n):
+            if othello_bitboard.has_any_move(player, opponent, n):
+                curr_turn, passed_turn = mover, curr_turn
+                key = othello_hashing.pass_hash(key, n) if key is not None else None
+            else:
+                winner, is_game_over = _winner(black_count, white_count), True
+        return GameState(n, black, white, curr_turn, winner, is_game_over, Move(move.row, move.column), mover,
+                         passed_turn, black_count, white_count, key)
+
+    def apply_recorded(self, move: Move, flips: int = None) -> ('GameState', MoveRecord):
+        """ Applies [move] as apply() does and also returns the record undo() needs to take it back """
+        if flips is None:
+            flips = self.flips(move)
+        return self.apply(move, flips), MoveRecord(Move(move.row, move.column), self.curr_turn, flips,
+                                                   self.to_game_info())
+
+    def undo(self, record: MoveRecord) -> 'GameState':
+        """ Returns the state before the recorded move, the last one played to reach this state.
+            Only the placed cell and the flipped cells change, so this costs O(flips) """
+        n = self.n
+        square = record.move.row * n + record.move.column
+        moved = record.flips | (1 << square)
+        if record.player == P_BLACK:
+            black, white = self.black & ~moved, self.white | record.flips
+        else:
+            black, white = self.black | record.flips, self.white & ~moved
+        key = self._key
+        if key is not None:
+            key = othello_hashing.pass_hash(key, n) if self.passed_turn is not None else key
+            key = othello_hashing.update_hash(key, square, record.flips, _color(record.player), n)  # XOR undoes itself
+        game_info = record.game_info
+        prev_move = Move._make(game_info.prev_move) if game_info.prev_move is not None else None
+        return GameState(n, black, white, game_info.curr_turn, game_info.winner, game_info.is_game_over, prev_move,
+                         game_info.prev_turn, game_info.passed_turn, game_info.black_count, game_info.white_count,
+                         key)
+
+    def encoded_board(self, board_format: str = LIST_FORMAT):
+        """ Returns the board encoded in one of BOARD_FORMATS, packing the bitboards directly """
+        if board_format == PACKED_FORMAT:
+            return encode_bitboards(self.black, self.white, self.n)
+        return encode_board(self.to_board(), board_format)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('GameState is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('GameState is immutable')
+
+    def __reduce__(self):
+        return GameState, (self.n, self.black, self.white, self.curr_turn, self.winner, self.is_game_over,
+                           self.prev_move, self.prev_turn, self.passed_turn, self.black_count, self.white_count,
+                           self._key)
+
+    def __hash__(self):
+        return self.key
+
+    def __eq__(self, other):
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return (self.key == other.key and self.black == other.black and self.white == other.white
+                and self.n == other.n and self.curr_turn == other.curr_turn)
+
+    def __repr__(self):
+        return (f'GameState(n={self.n}, black={self.black:#x}, white={self.white:#x}, '
+                f'curr_turn={self.curr_turn!r}, prev_move={self.prev_move})')
+
+
+# Bitboard conversion functions
+
+
+def board_to_bitboards(board: [[str]]) -> (int, int):
+    """ Converts a board to its (black, white) bitboards. Bit (row * n + column) is set for an occupied cell """
+    cells = ''.join(map(''.join, board))[::-1]  # Highest bit first, as int() expects
+    return int(cells.translate(_BLACK_BITS) or '0', 2), int(cells.translate(_WHITE_BITS) or '0', 2)
+
+
+def bitboards_to_board(black: int, white: int, n: int) -> [[str]]:
+    """ Converts (black, white) bitboards back to a nxn board """
+    cells = [EMPTY_CELL] * (n * n)
+    for square in othello_bitboard.iter_squares(black):
+        cells[square] = P_BLACK
+    for square in othello_bitboard.iter_squares(white):
+        cells[square] = P_WHITE
+    return [cells[row * n:(row + 1) * n] for row in range(n)]
+
+
+# Wire format functions
+
+
+def encode_board(board: [[str]], board_format: str = LIST_FORMAT):
+    """ Encodes a board in one of BOARD_FORMATS for sending. The list format is the board itself """
+    if board_format == LIST_FORMAT:
+        return board
+    if board_format == STRING_FORMAT:
+        return ''.join(map(''.join, board))
+    if board_format == PACKED_FORMAT:
+        return encode_bitboards(*board_to_bitboards(board), len(board))
+    raise InvalidBoardFormatError(f'Unknown board format {board_format!r}')
+
+
+def encode_bitboards(black: int, white: int, n: int) -> str:
+    """ Encodes (black, white) bitboards in the packed format: the board size byte, then each bitboard
+        in (n * n + 7) // 8 little-endian bytes, all in base64 """
+    size = (n * n + 7) // 8
+    raw = bytes((n,)) + black.to_bytes(size, 'little') + white.to_bytes(size, 'little')
+    return base64.b64encode(raw).decode('ascii')
+
+
+def decode_board(data, board_format: str = LIST_FORMAT) -> [[str]]:
+    """ Decodes a board sent in one of BOARD_FORMATS. Raises InvalidBoardFormatError if it is malformed """
+    if board_format == LIST_FORMAT:
+        n = len(data) if isinstance(data, list) else 0
+        if not is_valid_board_size(n) or any(not isinstance(row, list) or len(row) != n for row in data):
+            raise InvalidBoardFormatError('A list board must be a supported number of rows of as many cells')
+        try:
+            cells = ''.join(map(''.join, data))
+        except TypeError:
+            cells = None
+        if cells is None or len(cells) != n * n or not set(cells) <= _CELL_CHARS:
+            raise InvalidBoardFormatError(f'A board may only hold {P_BLACK}, {P_WHITE} and {EMPTY_CELL} cells')
+        return data
+    if board_format == STRING_FORMAT:
+        if not isinstance(data, str):
+            raise InvalidBoardFormatError('A string board must be a string')
+        n = int(len(data) ** 0.5)
+        if n * n != len(data) or not is_valid_board_size(n):
+            raise InvalidBoardFormatError(f'A board string of {len(data)} cells is not a supported board')
+        if not set(data) <= _CELL_CHARS:
+            raise InvalidBoardFormatError(f'A board string may only hold {P_BLACK}, {P_WHITE} and {EMPTY_CELL}')
+        return [list(data[row * n:(row + 1) * n]) for row in range(n)]
+    if board_format == PACKED_FORMAT:
+        try:
+            raw = base64.b64decode(data, validate=True)
+        except (binascii.Error, TypeError, ValueError):
+            raise InvalidBoardFormatError('A packed board must be base64')
+        n = raw[0] if raw else 0
+        if not is_valid_board_size(n):
+            raise InvalidBoardFormatError(f'A packed board of size {n} is not a supported board')
+        size = (n * n + 7) // 8
+        if len(raw) != 1 + 2 * size:
+            raise InvalidBoardFormatError(f'A packed {n}x{n} board must be {1 + 2 * size} bytes')
+        black = int.from_bytes(raw[1:1 + size], 'little')
+        white = int.from_bytes(raw[1 + size:], 'little')
+        if black & white:
+            raise InvalidBoardFormatError('A packed board has cells owned by both players')
+        return bitboards_to_board(black, white, n)
+    raise InvalidBoardFormatError(f'Unknown board format {board_format!r}')
+
+
+def decode_game_info(data) -> GameInfo:
+    """ Decodes game info sent as an array of the GameInfo fields. Raises InvalidGameInfoError if it has the wrong
+        number of fields or names no player to move """
+    try:
+        game_info = GameInfo._make(data)
+    except TypeError:
+        raise InvalidGameInfoError(f'Game info must be an array of {len(GameInfo._fields)} fields')
+    if game_info.curr_turn != P_WHITE and game_info.curr_turn != P_BLACK:
+        raise InvalidGameInfoError('Player must be either B or W')
+    return game_info
 
 
 # Validation functions
 
 
-def is_valid_move(board: [[str]], row: int, column: int, curr_turn: str) -> (bool, dict):
+def is_valid_move(board: [[str]], row: int, column: int, curr_turn: str) -> (bool, int):
     """ Validates a move. Valid if cell is within board indices, is empty, and an outflank is performable.
-        Returns whether a move is valid and the dict of directions that can be flanked """
-    board_len = len(board)
-    if (row < 0 or row > board_len - 1) or (column < 0 or column > board_len - 1):
+        Returns whether a move is valid and the mask of opponent pieces the move flips """
+    n = len(board)
+    if (row < 0 or row > n - 1) or (column < 0 or column > n - 1):
         raise InvalidMoveError
     if board[row][column] != EMPTY_CELL:
         raise InvalidMoveError
-    flank_map = _create_flank_map(board, row, column, curr_turn)
-    return _player_can_outflank(flank_map), flank_map
+    player, opponent = _player_bitboards(board, curr_turn)
+    flips = othello_bitboard.flip_mask(player, opponent, row * n + column, n)
+    return flips != 0, flips
 
 
 def is_valid_board_size(board_size: int) -> int:
     """ Validates the board size given """
-    if board_size < 4 or board_size > 8 or (board_size % 2 != 0):
+    if board_size < 4 or board_size > 16 or (board_size % 2 != 0):
         return False
     return True
 
@@ -92,14 +461,9 @@ def is_valid_board_size(board_size: int) -> int:
 def is_game_over(board: [[str]]) -> bool:
     """ Checks if no more moves are available """
     # Check if outflanks available for either player
-    for row in range(len(board)):
-        for col in range(len(board[row])):
-            if board[row][col] == EMPTY_CELL:
-                black_move_possible = _player_can_outflank(_create_flank_map(board, row, col, P_BLACK))
-                white_move_possible = _player_can_outflank(_create_flank_map(board, row, col, P_WHITE))
-                if black_move_possible is False and white_move_possible is False:
-                    return True
-                return False
+    n = len(board)
+    black, white = board_to_bitboards(board)
+    return not othello_bitboard.has_any_move(black, white, n) and not othello_bitboard.has_any_move(white, black, n)
 
 
 # Helper functions
@@ -120,335 +484,63 @@ def _change_turn(curr_turn: str) -> str:
     return P_WHITE if curr_turn == P_BLACK else P_BLACK
 
 
-def _place_piece_on_board(board: [[str]], row: int, column: int, player: str) -> [[str]]:
-    """ Places a piece on the game board """
-    board[row][column] = player
-    return board
+def _resolve_next_turn(game_info: GameInfo, board: [[str]]) -> GameInfo:
+    """ Passes the turn back when the player to move has no moves, and ends the game when neither player has """
+    n = len(board)
+    player, opponent = _player_bitboards(board, game_info.curr_turn)
+    if othello_bitboard.has_any_move(player, opponent, n):
+        return game_info
+    if othello_bitboard.has_any_move(opponent, player, n):
+        return game_info._replace(curr_turn=game_info.prev_turn, passed_turn=game_info.curr_turn)
+    return game_info._replace(winner=_winner(game_info.black_count, game_info.white_count), is_game_over=True)
 
 
-def _create_flank_map(board: [[str]], move_row: int, move_column: int, player: str) -> {str: bool}:
-    """ Creates a dictionary {direction, _can_outflank} that stores whether a move will outflank
-        opponent pieces in a direction """
-    position = Move(move_row, move_column)
-    outflanking_directions = {DIRECTION.SOUTH: _can_outflank_south(board, position, player),
-                              DIRECTION.NORTH: _can_outflank_north(board, position, player),
-                              DIRECTION.EAST: _can_outflank_east(board, position, player),
-                              DIRECTION.WEST: _can_outflank_west(board, position, player),
-                              DIRECTION.SOUTHEAST: _can_outflank_southeast(board, position, player),
-                              DIRECTION.SOUTHWEST: _can_outflank_southwest(board, position, player),
-                              DIRECTION.NORTHEAST: _can_outflank_northeast(board, position, player),
-                              DIRECTION.NORTHWEST: _can_outflank_northwest(board, position, player)}
-    return outflanking_directions
-
-
-def _flip_opponent_pieces(flank_map: dict, board: [[str]], move_row: int, move_column: int, player: str) -> [[str]]:
-    """ Call all outflank functions in valid directions """
-    position = Move(move_row, move_column)
-    outflank_functions = {DIRECTION.SOUTH: _outflank_south,
-                          DIRECTION.NORTH: _outflank_north,
-                          DIRECTION.EAST: _outflank_east,
-                          DIRECTION.WEST: _outflank_west,
-                          DIRECTION.SOUTHEAST: _outflank_southeast,
-                          DIRECTION.SOUTHWEST: _outflank_southwest,
-                          DIRECTION.NORTHEAST: _outflank_northeast,
-                          DIRECTION.NORTHWEST: _outflank_northwest}
-    for direction in flank_map.keys():
-        if flank_map[direction]:
-            board = outflank_functions[direction](board, position, player)
-    return board
+def _winner(black_count: int, white_count: int) -> str:
+    """ Returns the player with more pieces, or TIE """
+    if black_count == white_count:
+        return TIE
+    return P_BLACK if black_count > white_count else P_WHITE
 
 
-def _player_can_outflank(flank_map: dict) -> bool:
-    """ Verify if outflank is available in at least one direction """
-    for direction in flank_map.keys():
-        if flank_map[direction]:
-            return True
-    return False
-
-
-# Functions to check and perform outflanks
-
-
-def _can_outflank_south(board: [[str]], player_position: Move, player: str) -> bool:
-    """ Check if pieces will flip south of current position """
-    if not _boundary_check(DIRECTION.SOUTH, player_position, board):  # Needs to be third from last row minimum
-        return False
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    opponent_seen = False
-    for row_index in range(player_position.row + 1, len(board)):  # Check all rows after current row
-        curr_position = board[row_index][player_position.column]
-        if curr_position == EMPTY_CELL:
-            return False
-        if curr_position == opponent:
-            opponent_seen = True
-        elif curr_position == player:
-            return opponent_seen  # True if opponent seen before player.
-    return False  # # Reaches here if opponent piece encountered but flank not met by another player piece
-
-
-def _can_outflank_north(board: [[str]], player_position: Move, player: str) -> bool:
-    """ Check if pieces will flip north of current position """
-    if not _boundary_check(DIRECTION.NORTH, player_position, board):  # Minimum third row from top
-        return False
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    opponent_seen = False
-    for row_index in range(player_position.row - 1, -1, -1):  # Check all rows before current row
-        curr_position = board[row_index][player_position.column]
-        if curr_position == EMPTY_CELL:
-            return False
-        if curr_position == opponent:
-            opponent_seen = True
-        elif curr_position == player:
-            return opponent_seen  # True if opponent seen before player.
-    return False  # Reaches here if opponent piece encountered but flank not met by another player piece
-
-
-def _can_outflank_east(board: [[str]], player_position: Move, player: str) -> bool:
-    """ Check if pieces will flip east of current position """
-    if not _boundary_check(DIRECTION.EAST, player_position, board):  # Minimum third col from right
-        return False
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    opponent_seen = False
-    for col_index in range(player_position.column + 1, len(board)):  # Check all columns after current column
-        curr_position = board[player_position.row][col_index]
-        if curr_position == EMPTY_CELL:
-            return False
-        if curr_position == opponent:
-            opponent_seen = True
-        elif curr_position == player:
-            return opponent_seen  # True if opponent seen before player.
-    return False  # Reaches here if opponent piece encountered but flank not met by another player piece
-
-
-def _can_outflank_west(board: [[str]], player_position: Move, player: str) -> bool:
-    """ Check if pieces will flip west of current position """
-    if not _boundary_check(DIRECTION.WEST, player_position, board):  # Minimum third col from left
-        return False
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    opponent_seen = False
-    for col_index in range(player_position.column - 1, -1, -1):  # Check all columns before current column
-        curr_position = board[player_position.row][col_index]
-        if curr_position == EMPTY_CELL:
-            return False
-        if curr_position == opponent:
-            opponent_seen = True
-        elif curr_position == player:
-            return opponent_seen  # True if opponent seen before player.
-    return False  # Reaches here if opponent piece encountered but flank not met by another player piece
-
-
-def _can_outflank_southeast(board: [[str]], player_position: Move, player: str) -> bool:
-    """ Check if pieces will flip southeast of current position """
-    if not _boundary_check(DIRECTION.SOUTHEAST, player_position, board):  # Min third cell from lower right corner
-        return False
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    opponent_seen = False
-    col_index = player_position.column
-    for row_index in range(player_position.row + 1, len(board)):
-        col_index += 1
-        if col_index >= len(board): # Column out of bounds, not finding flank
-            return False
-        curr_position = board[row_index][col_index]
-        if curr_position == EMPTY_CELL:
-            return False
-        if curr_position == opponent:
-            opponent_seen = True
-        elif curr_position == player:
-            return opponent_seen
-    return False
-
-
-def _can_outflank_southwest(board: [[str]], player_position: Move, player: str) -> bool:
-    """ Check if pieces will flip southwest of current position """
-    if not _boundary_check(DIRECTION.SOUTHWEST, player_position, board):
-        return False
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    opponent_seen = False
-    col_index = player_position.column
-    for row_index in range(player_position.row + 1, len(board)):
-        col_index -= 1
-        if col_index < 0: # Column out of bounds, not finding flank
-            return False
-        curr_position = board[row_index][col_index]
-        if curr_position == EMPTY_CELL:
-            return False
-        if curr_position == opponent:
-            opponent_seen = True
-        elif curr_position == player:
-            return opponent_seen
-    return False
-
-
-def _can_outflank_northeast(board: [[str]], player_position: Move, player: str) -> bool:
-    """ Check if pieces will flip northeast of current position """
-    if not _boundary_check(DIRECTION.NORTHEAST, player_position, board):
-        return False
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    opponent_seen = False
-    col_index = player_position.column
-    for row_index in range(player_position.row - 1, -1, -1):
-        col_index += 1
-        if col_index >= len(board): # Column out of bounds, not finding flank
-            return False
-        curr_position = board[row_index][col_index]
-        if curr_position == EMPTY_CELL:
-            return False
-        if curr_position == opponent:
-            opponent_seen = True
-        elif curr_position == player:
-            return opponent_seen
-    return False
-
-
-def _can_outflank_northwest(board: [[str]], player_position: Move, player: str) -> bool:
-    """ Check if pieces will flip northwest of current position """
-    if not _boundary_check(DIRECTION.NORTHWEST, player_position, board):
-        return False
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    opponent_seen = False
-    col_index = player_position.column
-    for row_index in range(player_position.row - 1, -1, -1):
-        col_index -= 1
-        if col_index < 0: # Column out of bounds, not finding flank
-            return False
-        curr_position = board[row_index][col_index]
-        if curr_position == EMPTY_CELL:
-            return False
-        if curr_position == opponent:
-            opponent_seen = True
-        elif curr_position == player:
-            return opponent_seen
-    return False
-
-
-def _boundary_check(direction: str, position: Move, board: [[str]]) -> bool:
-    """ Returns whether an outflank in a direction even has enough cells to take place """
-    if direction == DIRECTION.SOUTH:
-        return position.row < len(board) - 2
-    elif direction == DIRECTION.NORTH:
-        return position.row > 1
-    elif direction == DIRECTION.EAST:
-        return position.column < len(board) - 2
-    elif direction == DIRECTION.WEST:
-        return position.column > 1
-    elif direction == DIRECTION.SOUTHEAST:
-        return (position.row < len(board) - 2) and (position.column < len(board) - 2)
-    elif direction == DIRECTION.SOUTHWEST:
-        return (position.row < len(board) - 2) and (position.column > 1)
-    elif direction == DIRECTION.NORTHEAST:
-        return (position.row > 1) and (position.column < len(board) - 2)
-    elif direction == DIRECTION.NORTHWEST:
-        return (position.row > 1) and (position.column > 1)
-    else:
-        raise InvalidDirectionError
+def _check_piece_counts(black: int, white: int, black_count: int, white_count: int) -> None:
+    """ Raises PieceCountError if the piece counts do not match a full recount of the bitboards """
+    actual_black, actual_white = othello_bitboard.popcount(black), othello_bitboard.popcount(white)
+    if (actual_black, actual_white) != (black_count, white_count):
+        raise PieceCountError(f'Counted B: {actual_black}, W: {actual_white} '
+                              f'but game info has B: {black_count}, W: {white_count}')
 
 
-def _outflank_south(board: [[str]], player_position: Move, player: str) -> [[str]]:  # Return new board
-    """ Flips pieces south of current position """
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    for row_index in range(player_position.row + 1, len(board)):  # Must stop when end player piece reached
-        curr_position = board[row_index][player_position.column]
-        if curr_position == opponent:
-            board[row_index][player_position.column] = player
-        else:
-            return board
+def _color(player: str) -> int:
+    """ Returns the hashing colour of a player """
+    return othello_hashing.BLACK if player == P_BLACK else othello_hashing.WHITE
 
 
-def _outflank_north(board: [[str]], player_position: Move, player: str) -> [[str]]:
-    """ Flips pieces north of current position """
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    for row_index in range(player_position.row - 1, -1, -1):
-        curr_position = board[row_index][player_position.column]
-        if curr_position == opponent:
-            board[row_index][player_position.column] = player
-        else:
-            return board
+def _player_bitboards(board: [[str]], player: str) -> (int, int):
+    """ Returns the (player, opponent) bitboards of a board """
+    if player != P_WHITE and player != P_BLACK:
+        raise InvalidPlayerError('Player must be either B or W')
+    black, white = board_to_bitboards(board)
+    return (black, white) if player == P_BLACK else (white, black)
 
 
-def _outflank_east(board: [[str]], player_position: Move, player: str) -> [[str]]:
-    """ Flips pieces east of current position """
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    for col_index in range(player_position.column + 1, len(board)):
-        curr_position = board[player_position.row][col_index]
-        if curr_position == opponent:
-            board[player_position.row][col_index] = player
-        else:
-            return board
+# Exception classes
 
 
-def _outflank_west(board: [[str]], player_position: Move, player: str) -> [[str]]:
-    """ Flips pieces west of current position """
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    for col_index in range(player_position.column - 1, -1, -1):
-        curr_position = board[player_position.row][col_index]
-        if curr_position == opponent:
-            board[player_position.row][col_index] = player
-        else:
-            return board
-
-
-def _outflank_southeast(board: [[str]], player_position: Move, player: str) -> [[str]]:
-    """ Flips pieces southeast of current position """
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    col_index = player_position.column
-    for row_index in range(player_position.row + 1, len(board)):
-        col_index += 1
-        curr_position = board[row_index][col_index]
-        if curr_position == opponent:
-            board[row_index][col_index] = player
-        else:
-            return board
-
-
-def _outflank_southwest(board: [[str]], player_position: Move, player: str) -> [[str]]:
-    """ Flips pieces southwest of current position """
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    col_index = player_position.column
-    for row_index in range(player_position.row + 1, len(board)):
-        col_index -= 1
-        curr_position = board[row_index][col_index]
-        if curr_position == opponent:
-            board[row_index][col_index] = player
-        else:
-            return board
-
-
-def _outflank_northeast(board: [[str]], player_position: Move, player: str) -> [[str]]:
-    """ Flips pieces northeast of current position """
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    col_index = player_position.column
-    for row_index in range(player_position.row - 1, -1, -1):
-        col_index += 1
-        curr_position = board[row_index][col_index]
-        if curr_position == opponent:
-            board[row_index][col_index] = player
-        else:
-            return board
-
-
-def _outflank_northwest(board: [[str]], player_position: Move, player: str) -> [[str]]:
-    """ Flips pieces northwest of current position """
-    opponent = P_WHITE if player == P_BLACK else P_BLACK
-    col_index = player_position.column
-    for row_index in range(player_position.row - 1, -1, -1):
-        col_index -= 1
-        curr_position = board[row_index][col_index]
-        if curr_position == opponent:
-            board[row_index][col_index] = player
-        else:
-            return board
+class InvalidPlayerError(Exception):
+    pass
 
 
-# Exception classes
+class InvalidMoveError(Exception):
+    pass
 
 
-class InvalidPlayerError(Exception):
+class PieceCountError(Exception):
     pass
 
 
-class InvalidMoveError(Exception):
+class InvalidBoardFormatError(Exception):
     pass
 
 
-class InvalidDirectionError(Exception):
+class InvalidGameInfoError(Exception):
     pass
@@ -0,0 +1,251 @@
+# othello_mcts.py
+import math
+import random
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import othello_bitboard
+import othello_logic
+
+# Monte Carlo tree search with UCT selection. Nodes hold the bitboards of their position from the side to move's
+# point of view and the moves not yet expanded as a bit mask; a forced pass is the extra bit past the last square.
+# Playouts play uniformly random moves on bitboards until the game ends.
+
+MctsResult = namedtuple('MctsResult', 'move visits win_rate playouts playouts_per_second elapsed_ms')
+
+EXPLORATION = math.sqrt(2)
+DEFAULT_TIME_LIMIT_MS = 200
+DEFAULT_PLAYERS = 64  # Games whose trees MctsPlayers keeps
+PASS = -1  # Move of a pass node
+_REUSE_PLIES = 2  # How deep below the previous root a reused tree's new root is looked for
+
+_executors = {}  # worker count -> pool for root parallel searches
+_executors_lock = threading.Lock()
+
+
+class _Node:
+    """ A position in the tree. [wins] are counted for the player who moved into it """
+    __slots__ = ('player', 'opponent', 'move', 'parent', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, player: int, opponent: int, n: int, move: int = None, parent: '_Node' = None):
+        self.player = player
+        self.opponent = opponent
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = othello_bitboard.legal_moves_mask(player, opponent, n)
+        if not self.untried and othello_bitboard.has_any_move(opponent, player, n):
+            self.untried = 1 << (n * n)  # Forced pass
+        self.visits = 0
+        self.wins = 0.0
+
+
+class MctsPlayer:
+    """ UCT searcher that keeps its tree between the moves of a game: the next search starts from the node of the
+        new position when it is within two plies of the last root. Counts every playout it runs. Not thread-safe """
+    def __init__(self, exploration: float = EXPLORATION, workers: int = 1, seed: int = None):
+        self.exploration = exploration
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.root = None
+        self.n = None
+        self.playouts = 0
+        self.elapsed = 0.0
+
+    def choose_move(self, state: othello_logic.GameState, time_limit_ms: int = DEFAULT_TIME_LIMIT_MS,
+                    iterations: int = None) -> MctsResult:
+        """ Searches the player to move's best move for [time_limit_ms] and/or [iterations] playouts. With more
+            than one worker, as many extra trees are searched in other processes and their root visits added up """
+        if state.is_game_over:
+            raise NoMovesError('The game is over')
+        start = time.perf_counter()
+        player, opponent = state.player_bitboards()
+        if not othello_bitboard.legal_moves_mask(player, opponent, state.n):
+            raise NoMovesError(f'{state.curr_turn} has no legal moves')
+        self._move_root(player, opponent, state.n)
+        futures = []
+        if self.workers > 1:
+            executor = _get_executor(self.workers - 1)
+            futures = [executor.submit(_search_tree, player, opponent, state.n, time_limit_ms, iterations,
+                                       self.rng.getrandbits(32), self.exploration)
+                       for _ in range(self.workers - 1)]
+        playouts = _run(self.root, state.n, time_limit_ms, iterations, self.rng, self.exploration)
+        statistics = {child.move: [child.visits, child.wins] for child in self.root.children}
+        for future in futures:
+            worker_statistics, worker_playouts = future.result()
+            playouts += worker_playouts
+            for move, visits, wins in worker_statistics:
+                totals = statistics.setdefault(move, [0, 0.0])
+                totals[0] += visits
+                totals[1] += wins
+        square, (visits, wins) = max(statistics.items(), key=lambda item: item[1][0])
+        elapsed = time.perf_counter() - start
+        self.playouts += playouts
+        self.elapsed += elapsed
+        return MctsResult(othello_logic.Move(*divmod(square, state.n)), visits, wins / visits if visits else 0.0,
+                          playouts, playouts / elapsed if elapsed else 0.0, elapsed * 1000)
+
+    @property
+    def playouts_per_second(self) -> float:
+        """ Playouts per second over every search so far """
+        return self.playouts / self.elapsed if self.elapsed else 0.0
+
+    def _move_root(self, player: int, opponent: int, n: int) -> None:
+        """ Makes the root the node of the position, reusing the tree when the position is in it """
+        if self.root is not None and self.n == n:
+            level = [self.root]
+            for _ in range(_REUSE_PLIES + 1):
+                for node in level:
+                    if node.player == player and node.opponent == opponent:
+                        node.parent = None  # Free the rest of the old tree
+                        self.root = node
+                        return
+                level = [child for node in level for child in node.children]
+        self.root, self.n = _Node(player, opponent, n), n
+
+
+class MctsPlayers:
+    """ Bounded LRU of players keyed by game id, so every game keeps its own tree between its moves and the games
+        are searched independently. Searches of one game are serialised, those of different games are not """
+    def __init__(self, capacity: int = DEFAULT_PLAYERS, **options):
+        self.capacity = capacity
+        self.options = options  # MctsPlayer arguments
+        self._players = OrderedDict()  # game id -> (MctsPlayer, lock held while it searches)
+        self._lock = threading.Lock()
+
+    def choose_move(self, game_id, state: othello_logic.GameState, time_limit_ms: int = DEFAULT_TIME_LIMIT_MS,
+                    iterations: int = None) -> MctsResult:
+        """ MctsPlayer.choose_move with the player of [game_id]. Without a game id a fresh player searches """
+        if game_id is None:
+            return MctsPlayer(**self.options).choose_move(state, time_limit_ms, iterations)
+        player, lock = self._entry(game_id)
+        with lock:
+            return player.choose_move(state, time_limit_ms, iterations)
+
+    def get(self, game_id) -> MctsPlayer:
+        """ Returns the player of [game_id], or None """
+        with self._lock:
+            entry = self._players.get(game_id)
+            return entry[0] if entry is not None else None
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def _entry(self, game_id) -> (MctsPlayer, threading.Lock):
+        """ Returns the player of [game_id] and its lock, making them and evicting the least recently used game
+            past the capacity. An evicted player still finishes a search in progress """
+        with self._lock:
+            entry = self._players.get(game_id)
+            if entry is None:
+                entry = self._players[game_id] = (MctsPlayer(**self.options), threading.Lock())
+            self._players.move_to_end(game_id)
+            while len(self._players) > self.capacity:
+                self._players.popitem(last=False)
+            return entry
+
+
+def playout(player: int, opponent: int, n: int, rng: random.Random) -> float:
+    """ Plays random moves to the end of the game. Returns 1, 0.5 or 0 for a win, draw or loss of [player] """
+    flip_mask, apply_move = othello_bitboard.flip_mask, othello_bitboard.apply_move
+    legal_moves_mask = othello_bitboard.legal_moves_mask
+    to_move = 0  # 0 while [player] is to move
+    passed = False
+    while True:
+        moves = legal_moves_mask(player, opponent, n)
+        if not moves:
+            if passed:
+                break
+            passed = True
+        else:
+            passed = False
+            # Pick the k-th set bit of the move mask
+            for _ in range(rng.randrange(othello_bitboard.popcount(moves))):
+                moves &= moves - 1
+            square = (moves & -moves).bit_length() - 1
+            player, opponent = apply_move(player, opponent, square, flip_mask(player, opponent, square, n))
+        player, opponent = opponent, player
+        to_move ^= 1
+    difference = othello_bitboard.popcount(player) - othello_bitboard.popcount(opponent)
+    if to_move:
+        difference = -difference
+    return 1.0 if difference > 0 else 0.0 if difference < 0 else 0.5
+
+
+def shutdown() -> None:
+    """ Stops every root parallel worker pool """
+    with _executors_lock:
+        for executor in _executors.values():
+            executor.shutdown(cancel_futures=True)
+        _executors.clear()
+
+
+# Helper functions
+
+
+def _run(root: _Node, n: int, time_limit_ms: int, iterations: int, rng: random.Random, exploration: float) -> int:
+    """ Runs UCT iterations from [root] until the budget is spent. Returns the number of playouts """
+    if time_limit_ms is None and iterations is None:
+        time_limit_ms = DEFAULT_TIME_LIMIT_MS
+    deadline = time.perf_counter() + time_limit_ms / 1000 if time_limit_ms is not None else float('inf')
+    pass_bit = 1 << (n * n)
+    count = 0
+    while (iterations is None or count < iterations) and (count == 0 or time.perf_counter() < deadline):
+        node = root
+        # Selection: descend through fully expanded nodes by the UCT score
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            node = max(node.children, key=lambda child: child.wins / child.visits
+                       + exploration * math.sqrt(log_visits / child.visits))
+        # Expansion: add one untried move
+        if node.untried:
+            if node.untried == pass_bit:
+                node.untried = 0
+                child = _Node(node.opponent, node.player, n, PASS, node)
+            else:
+                untried = node.untried
+                for _ in range(rng.randrange(othello_bitboard.popcount(untried))):
+                    untried &= untried - 1
+                bit = untried & -untried
+                node.untried ^= bit
+                square = bit.bit_length() - 1
+                flips = othello_bitboard.flip_mask(node.player, node.opponent, square, n)
+                player, opponent = othello_bitboard.apply_move(node.player, node.opponent, square, flips)
+                child = _Node(opponent, player, n, square, node)
+            node.children.append(child)
+            node = child
+        # Simulation, then backpropagation: a result for the side to move is a loss for the player who moved
+        result = playout(node.player, node.opponent, n, rng)
+        while node is not None:
+            node.visits += 1
+            node.wins += 1.0 - result
+            result = 1.0 - result
+            node = node.parent
+        count += 1
+    return count
+
+
+def _search_tree(player: int, opponent: int, n: int, time_limit_ms: int, iterations: int, seed: int,
+                 exploration: float) -> ([(int, int, float)], int):
+    """ Worker task: searches a fresh tree. Returns the (move, visits, wins) of the root's children and the
+        number of playouts """
+    root = _Node(player, opponent, n)
+    playouts = _run(root, n, time_limit_ms, iterations, random.Random(seed), exploration)
+    return [(child.move, child.visits, child.wins) for child in root.children], playouts
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    """ Returns the pool of [workers] processes, starting it on first use """
+    with _executors_lock:
+        executor = _executors.get(workers)
+        if executor is None:
+            executor = _executors[workers] = ProcessPoolExecutor(max_workers=workers)
+        return executor
+
+
+# Exception classes
+
+
+class NoMovesError(Exception):
+    pass
@@ -0,0 +1,220 @@
+# othello_metrics.py
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+
+# Latency histogram bucket upper bounds in seconds, 50us to 5s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_PROFILE_LIMIT = 30
+
+
+class Histogram:
+    """ Cumulative-bucket latency histogram in the Prometheus model """
+    def __init__(self, buckets: (float,) = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Per bucket, the last one for values above every bound
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        index = 0
+        for bound in self.buckets:
+            if seconds <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+
+    def cumulative_counts(self) -> [int]:
+        """ Returns the number of observations at or below each bound, then the total count """
+        cumulative, running = [], 0
+        for count in self.counts:
+            running += count
+            cumulative.append(running)
+        return cumulative
+
+
+class Metrics:
+    """ Per-route request latency and per-stage timers, with an optional profiler that samples
+        [profile_rate] of requests. When disabled every hook returns at once, so instrumented code
+        pays only a function call per hook """
+    def __init__(self, enabled: bool = False, profile_rate: float = 0.0, buckets: (float,) = DEFAULT_BUCKETS,
+                 seed: int = None):
+        self.enabled = enabled
+        self.profile_rate = profile_rate
+        self.buckets = buckets
+        self._requests = {}  # route -> Histogram
+        self._stages = {}  # (route, stage) -> Histogram
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._rng = random.Random(seed)
+        self._profile_lock = threading.Lock()  # Only one profiler can run at a time
+        self._profile_stats = None
+        self.profiled_requests = 0
+
+    def start_request(self, route: str) -> None:
+        """ Starts timing a request, and profiling it if it is sampled """
+        if not self.enabled:
+            return
+        local = self._local
+        local.route = route
+        local.profiler = None
+        if self.profile_rate > 0 and self._rng.random() < self.profile_rate and self._profile_lock.acquire(False):
+            local.profiler = cProfile.Profile()
+            local.profiler.enable()
+        local.start = time.perf_counter()
+
+    def end_request(self) -> None:
+        """ Records the latency of the current request """
+        if not self.enabled:
+            return
+        local = self._local
+        route = getattr(local, 'route', None)
+        if route is None:
+            return
+        elapsed = time.perf_counter() - local.start
+        profiler, local.route, local.profiler = local.profiler, None, None
+        if profiler is not None:
+            profiler.disable()
+            self._add_profile(profiler)
+            self._profile_lock.release()
+        with self._lock:
+            self._histogram(self._requests, route).observe(elapsed)
+
+    def stage(self, name: str):
+        """ Returns a context manager timing a stage of the current request """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record_stage(self, name: str, seconds: float) -> None:
+        """ Records the time of a stage of the current request. Stages run outside a request are not recorded """
+        route = getattr(self._local, 'route', None)
+        if route is None:
+            return
+        with self._lock:
+            self._histogram(self._stages, (route, name)).observe(seconds)
+
+    def render(self) -> str:
+        """ Returns every histogram in the Prometheus text exposition format """
+        lines = []
+        with self._lock:
+            _render_histograms(lines, 'othello_request_duration_seconds', 'Request latency by route',
+                               {(('route', route),): histogram for route, histogram in self._requests.items()})
+            _render_histograms(lines, 'othello_stage_duration_seconds', 'Time spent in each stage of a route',
+                               {(('route', route), ('stage', stage)): histogram
+                                for (route, stage), histogram in self._stages.items()})
+        lines.append('# HELP othello_profiled_requests_total Requests run under the sampling profiler')
+        lines.append('# TYPE othello_profiled_requests_total counter')
+        lines.append(f'othello_profiled_requests_total {self.profiled_requests}')
+        return '\n'.join(lines) + '\n'
+
+    def profile_report(self, limit: int = DEFAULT_PROFILE_LIMIT) -> str:
+        """ Returns the hottest functions of every profiled request, by cumulative time """
+        with self._lock:
+            if self._profile_stats is None:
+                return 'No requests profiled\n'
+            output = io.StringIO()
+            self._profile_stats.stream = output
+            self._profile_stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+            return output.getvalue()
+
+    def reset(self) -> None:
+        """ Drops every recorded observation and profile """
+        with self._lock:
+            self._requests.clear()
+            self._stages.clear()
+            self._profile_stats = None
+            self.profiled_requests = 0
+
+    def _histogram(self, histograms: dict, key) -> Histogram:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(self.buckets)
+        return histogram
+
+    def _add_profile(self, profiler: cProfile.Profile) -> None:
+        with self._lock:
+            if self._profile_stats is None:
+                self._profile_stats = pstats.Stats(profiler)
+            else:
+                self._profile_stats.add(profiler)
+            self.profiled_requests += 1
+
+
+class _Stage:
+    """ Times one stage of a request """
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics: Metrics, name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record_stage(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullStage:
+    """ Stage used while metrics are disabled """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def render_gauges(gauges: [(str, str, float)]) -> str:
+    """ Returns (name, description, value) gauges in the Prometheus text exposition format """
+    return _render_values(gauges, 'gauge')
+
+
+def render_counters(counters: [(str, str, float)]) -> str:
+    """ Returns (name, description, value) counters, named ..._total, in the Prometheus text exposition format """
+    return _render_values(counters, 'counter')
+
+
+# Helper functions
+
+
+def _render_values(values: [(str, str, float)], metric_type: str) -> str:
+    """ Returns unlabelled (name, description, value) metrics of one type in the Prometheus text format """
+    lines = []
+    for name, description, value in values:
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        lines.append(f'{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _render_histograms(lines: [str], name: str, description: str, histograms: {tuple: Histogram}) -> None:
+    """ Appends the Prometheus text of a histogram family, one series per label set """
+    lines.append(f'# HELP {name} {description}')
+    lines.append(f'# TYPE {name} histogram')
+    for labels, histogram in sorted(histograms.items()):
+        label_text = ','.join(f'{label}="{_escape(value)}"' for label, value in labels)
+        cumulative = histogram.cumulative_counts()
+        for bound, count in zip(histogram.buckets, cumulative):
+            lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {cumulative[-1]}')
+        lines.append(f'{name}_sum{{{label_text}}} {histogram.total}')
+        lines.append(f'{name}_count{{{label_text}}} {histogram.count}')
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,231 @@
+# othello_numpy.py
+import numpy as np
+
+import othello_bitboard
+import othello_logic
+
+# Batches of positions as NumPy arrays. Every function works on a whole batch at once: the Python loops
+# run over directions and ray lengths, never over boards.
+#
+# Array form: int8 (B, n, n) with BLACK, WHITE or EMPTY per cell and the player to move as a (B,) int8
+# vector of BLACK or WHITE, so the opponent is always -player. Works for every board size.
+# Packed form: (B,) uint64 bitboards with the bit layout of othello_bitboard, for boards up to 8x8.
+
+EMPTY = 0
+BLACK = 1
+WHITE = -1
+MAX_PACKED_SIZE = 8
+
+_CELL_CHARS = np.array([othello_logic.EMPTY_CELL, othello_logic.P_BLACK, othello_logic.P_WHITE])  # WHITE is -1
+
+
+# Conversion functions
+
+
+def boards_to_array(boards: [[[str]]]) -> np.ndarray:
+    """ Converts a list of nxn boards to a (B, n, n) int8 array """
+    cells = np.array(boards, dtype='<U1')
+    return ((cells == othello_logic.P_BLACK).astype(np.int8) - (cells == othello_logic.P_WHITE).astype(np.int8))
+
+
+def array_to_boards(boards: np.ndarray) -> [[[str]]]:
+    """ Converts a (B, n, n) array back to a list of boards """
+    return _CELL_CHARS[boards].tolist()
+
+
+def players_to_array(turns: [str]) -> np.ndarray:
+    """ Converts P_BLACK/P_WHITE turns to a (B,) int8 vector of BLACK/WHITE """
+    return np.where(np.array(turns, dtype='<U1') == othello_logic.P_BLACK, BLACK, WHITE).astype(np.int8)
+
+
+def pack(boards: np.ndarray) -> (np.ndarray, np.ndarray):
+    """ Packs a (B, n, n) array into (black, white) uint64 bitboard vectors. Bit (row * n + column) is set
+        for an occupied cell, as in othello_bitboard """
+    count, n, _ = boards.shape
+    _check_packed_size(n)
+    flat = boards.reshape(count, n * n)
+    return _pack_bits(flat == BLACK), _pack_bits(flat == WHITE)
+
+
+def unpack(black: np.ndarray, white: np.ndarray, n: int) -> np.ndarray:
+    """ Unpacks (black, white) uint64 bitboard vectors into a (B, n, n) int8 array """
+    _check_packed_size(n)
+    black_bits = _unpack_bits(black, n).astype(np.int8)
+    white_bits = _unpack_bits(white, n).astype(np.int8)
+    return (black_bits - white_bits).reshape(len(black), n, n)
+
+
+# Array form functions
+
+
+def legal_move_masks(boards: np.ndarray, players: np.ndarray) -> np.ndarray:
+    """ Returns a (B, n, n) bool array of the cells where each board's player to move outflanks a piece """
+    n = boards.shape[1]
+    player, opponent = _player_planes(boards, players)
+    legal = np.zeros(boards.shape, dtype=bool)
+    for row_step, column_step in othello_bitboard.DIRECTION_STEPS:
+        # run: every cell so far along the ray from the candidate cell is an opponent piece
+        run = _shifted(opponent, row_step, column_step)
+        for distance in range(2, n):
+            legal |= run & _shifted(player, row_step * distance, column_step * distance)
+            run &= _shifted(opponent, row_step * distance, column_step * distance)
+    return legal & (boards == EMPTY)
+
+
+def flip_masks(boards: np.ndarray, players: np.ndarray, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """ Returns a (B, n, n) bool array of the pieces flipped by each board's move (none if it is illegal) """
+    count, n, _ = boards.shape
+    player, opponent = _player_planes(boards, players)
+    indices = np.arange(count)
+    rows, columns = np.asarray(rows), np.asarray(columns)
+    on_board = (rows >= 0) & (rows < n) & (columns >= 0) & (columns < n)
+    rows, columns = np.where(on_board, rows, 0), np.where(on_board, columns, 0)
+    open_cell = on_board & (boards[indices, rows, columns] == EMPTY)
+
+    flips = np.zeros(boards.shape, dtype=bool)
+    for row_step, column_step in othello_bitboard.DIRECTION_STEPS:
+        # Walk every board's ray in step, marking opponent pieces until one of the player's closes the line
+        line = np.zeros(boards.shape, dtype=bool)
+        run = open_cell.copy()
+        closed = np.zeros(count, dtype=bool)
+        for distance in range(1, n):
+            ray_rows, ray_columns = rows + row_step * distance, columns + column_step * distance
+            inside = run & (ray_rows >= 0) & (ray_rows < n) & (ray_columns >= 0) & (ray_columns < n)
+            ray_rows, ray_columns = np.where(inside, ray_rows, 0), np.where(inside, ray_columns, 0)
+            closed |= inside & (distance > 1) & player[indices, ray_rows, ray_columns]
+            run = inside & opponent[indices, ray_rows, ray_columns]
+            line[indices[run], ray_rows[run], ray_columns[run]] = True
+        flips |= line & closed[:, None, None]
+    return flips
+
+
+def apply_moves(boards: np.ndarray, players: np.ndarray, rows: np.ndarray,
+                columns: np.ndarray) -> (np.ndarray, np.ndarray):
+    """ Plays each board's move. Returns the new boards and a (B,) bool vector of which moves were legal;
+        boards whose move is illegal are returned unchanged """
+    flips = flip_masks(boards, players, rows, columns)
+    legal = flips.any(axis=(1, 2))
+    placed = players.astype(np.int8)[:, None, None]
+    new_boards = np.where(flips, placed, boards)
+    indices = np.flatnonzero(legal)
+    new_boards[indices, np.asarray(rows)[indices], np.asarray(columns)[indices]] = placed[indices, 0, 0]
+    return new_boards, legal
+
+
+def disc_counts(boards: np.ndarray) -> (np.ndarray, np.ndarray):
+    """ Returns (B,) vectors of the black and white disc counts """
+    return (boards == BLACK).sum(axis=(1, 2)), (boards == WHITE).sum(axis=(1, 2))
+
+
+# Packed form functions
+
+
+def packed_legal_moves(player: np.ndarray, opponent: np.ndarray, n: int) -> np.ndarray:
+    """ Returns the uint64 legal move masks of [player], as othello_bitboard.legal_moves_mask """
+    _check_packed_size(n)
+    full, directions = _packed_masks(n)
+    empty = ~(player | opponent) & full
+    moves = np.zeros_like(player)
+    for shift, pre_mask in directions:
+        run = _shift(player & pre_mask, shift) & opponent
+        for _ in range(n - 3):
+            run |= _shift(run & pre_mask, shift) & opponent
+        moves |= _shift(run & pre_mask, shift) & empty
+    return moves
+
+
+def packed_flips(player: np.ndarray, opponent: np.ndarray, squares: np.ndarray, n: int) -> np.ndarray:
+    """ Returns the uint64 masks of the pieces flipped by [player] moving on [squares], as
+        othello_bitboard.flip_mask (0 where the move is illegal) """
+    _check_packed_size(n)
+    full, directions = _packed_masks(n)
+    move = np.left_shift(np.uint64(1), np.asarray(squares, dtype=np.uint64))
+    move = np.where((player | opponent) & move, np.uint64(0), move)
+    flips = np.zeros_like(player)
+    for shift, pre_mask in directions:
+        line = _shift(move & pre_mask, shift) & opponent
+        run = line
+        for _ in range(n - 3):
+            run = _shift(run & pre_mask, shift) & opponent
+            line |= run
+        # The line is contiguous from the move, so the cell past its end is the only one that can be the player's
+        flips |= np.where(_shift(line & pre_mask, shift) & player, line, np.uint64(0))
+    return flips
+
+
+def packed_apply(player: np.ndarray, opponent: np.ndarray, squares: np.ndarray,
+                 flips: np.ndarray) -> (np.ndarray, np.ndarray):
+    """ Returns the (player, opponent) bitboards after each move, as othello_bitboard.apply_move """
+    move = np.left_shift(np.uint64(1), np.asarray(squares, dtype=np.uint64))
+    return player | flips | move, opponent & ~flips
+
+
+def packed_popcount(bits: np.ndarray) -> np.ndarray:
+    """ Counts the set bits of every uint64 bitboard """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bits).astype(np.int64)
+    return np.unpackbits(np.ascontiguousarray(bits, dtype='<u8').view(np.uint8).reshape(-1, 8),
+                         axis=1).sum(axis=1, dtype=np.int64)
+
+
+# Helper functions
+
+
+def _check_packed_size(n: int) -> None:
+    if n > MAX_PACKED_SIZE:
+        raise PackedSizeError(f'A {n}x{n} board does not fit in 64 bits')
+
+
+def _pack_bits(bits: np.ndarray) -> np.ndarray:
+    """ Packs a (B, cells) bool array into a (B,) uint64 vector, cell 0 in the lowest bit """
+    padded = np.zeros((len(bits), 64), dtype=bool)
+    padded[:, :bits.shape[1]] = bits
+    return np.packbits(padded, axis=1, bitorder='little').view('<u8').reshape(-1).astype(np.uint64)
+
+
+def _unpack_bits(packed: np.ndarray, n: int) -> np.ndarray:
+    """ Unpacks a (B,) uint64 vector into a (B, n * n) bool array """
+    as_bytes = np.ascontiguousarray(packed, dtype='<u8').view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(as_bytes, axis=1, bitorder='little')[:, :n * n].astype(bool)
+
+
+def _packed_masks(n: int) -> (np.uint64, ((int, np.uint64),)):
+    """ Returns othello_bitboard.board_masks as uint64 scalars """
+    full, directions = othello_bitboard.board_masks(n)
+    return np.uint64(full), tuple((shift, np.uint64(pre_mask)) for shift, pre_mask in directions)
+
+
+def _shift(bits: np.ndarray, shift: int) -> np.ndarray:
+    """ Shifts bitboards towards higher squares for a positive shift, lower squares for a negative one.
+        Bits shifted past square 63 are dropped, and every caller masks to the board afterwards """
+    if shift > 0:
+        return np.left_shift(bits, np.uint64(shift))
+    return np.right_shift(bits, np.uint64(-shift))
+
+
+def _player_planes(boards: np.ndarray, players: np.ndarray) -> (np.ndarray, np.ndarray):
+    """ Returns bool (B, n, n) arrays of the pieces of each board's player to move and of its opponent """
+    players = np.asarray(players, dtype=np.int8)[:, None, None]
+    return boards == players, boards == -players
+
+
+def _shifted(plane: np.ndarray, row_offset: int, column_offset: int) -> np.ndarray:
+    """ Returns a plane whose cell (row, column) holds [plane]'s cell (row + row_offset, column + column_offset),
+        False where that cell is off the board """
+    n = plane.shape[1]
+    shifted = np.zeros_like(plane)
+    if abs(row_offset) >= n or abs(column_offset) >= n:
+        return shifted
+    target_rows = slice(max(0, -row_offset), n - max(0, row_offset))
+    target_columns = slice(max(0, -column_offset), n - max(0, column_offset))
+    source_rows = slice(max(0, row_offset), n - max(0, -row_offset))
+    source_columns = slice(max(0, column_offset), n - max(0, -column_offset))
+    shifted[:, target_rows, target_columns] = plane[:, source_rows, source_columns]
+    return shifted
+
+
+# Exception classes
+
+
+class PackedSizeError(Exception):
+    pass
@@ -0,0 +1,256 @@
+# othello_parallel.py
+import argparse
+import multiprocessing
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+
+import othello_ai
+import othello_bitboard
+import othello_hashing
+import othello_logic
+import othello_patterns
+
+# Root-split search: every iteration of the iterative deepening searches the first (best so far) root move in a
+# worker, then hands the other root moves to the rest of the pool at once. Workers share the best root score
+# found so far through a multiprocessing.Value, so a move started after a better one finished is searched with
+# the tighter window. A second Value numbers the searches of the pool: a task only reads or raises the shared score
+# while its search is the current one, so a task left running past its deadline cannot leak a score into the next
+# search. Each worker keeps its own transposition table for the length of a search. One search uses a pool at a
+# time; a search that cannot have it within half its time limit searches alone in the calling process instead.
+
+SpeedupResult = namedtuple('SpeedupResult', 'depth positions workers serial_ms parallel_ms speedup '
+                                            'serial_nodes parallel_nodes')
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+_NO_SCORE = -othello_ai.WIN_SCORE * 2
+
+_pools = {}  # worker count -> (executor, shared alpha, search number, lock serialising the searches using the pool)
+_pools_lock = threading.Lock()
+
+# Worker process state
+_shared_alpha = None
+_shared_search = None
+_table = None
+_table_search = None
+
+
+def parallel_search(player: int, opponent: int, n: int, time_limit_ms: int = othello_ai.DEFAULT_TIME_LIMIT_MS,
+                    evaluator=othello_ai.evaluate, max_depth: int = None, color: int = othello_hashing.BLACK,
+                    table: othello_hashing.TranspositionTable = None, workers: int = DEFAULT_WORKERS,
+                    deterministic: bool = False) -> othello_ai.SearchResult:
+    """ othello_ai.search with the root moves split across [workers] processes. [table] is not used, every worker
+        keeps its own. In deterministic mode every root move is searched with a full window and a fresh table and
+        a [max_depth] search ignores the time limit, so the result depends only on the position and depth.
+        The evaluator must pickle; othello_ai.evaluate and loaded pattern weights are passed by reference """
+    start = time.perf_counter()
+    moves = othello_ai.ordered_moves(player, opponent, n)
+    empties = n * n - othello_bitboard.popcount(player | opponent)
+    if workers <= 1 or len(moves) <= 1 or (empties <= othello_ai.ENDGAME_EMPTIES and max_depth is None):
+        # Nothing to split, or the exact endgame solver's turn
+        return othello_ai.search(player, opponent, n, time_limit_ms, evaluator, max_depth, color, table)
+    timed = not deterministic or max_depth is None
+    max_depth = empties if max_depth is None else min(max_depth, empties)
+    reference = _evaluator_reference(evaluator)
+    executor, shared_alpha, shared_search, lock = _get_pool(workers)
+    search_id = (os.getpid(), threading.get_ident(), start)
+
+    # The time limit runs from the call, waiting for the pool included. Wall clock time, comparable across processes
+    deadline = time.time() + time_limit_ms / 1000 if timed else float('inf')
+    if not lock.acquire(timeout=time_limit_ms / 2000 if timed else -1):
+        # Another search holds the pool for more than half the time limit: search here with the rest of it
+        result = othello_ai.search(player, opponent, n, max((deadline - time.time()) * 1000, 0), evaluator,
+                                   max_depth, color, table)
+        return result._replace(elapsed_ms=(time.perf_counter() - start) * 1000)
+    best_move, best_score, completed_depth, nodes = moves[0][0], 0, 0, 0
+    try:
+        with shared_alpha.get_lock():
+            shared_search.value += 1
+            search_number = shared_search.value
+        for depth in range(1, max_depth + 1):
+            task = (search_id, search_number, player, opponent, n, depth, color, deadline, reference, deterministic)
+            if deterministic:
+                results = _run_tasks(executor, task, moves, _NO_SCORE, deadline)
+            else:
+                with shared_alpha.get_lock():
+                    shared_alpha.value = _NO_SCORE
+                results = _run_tasks(executor, task, moves[:1], _NO_SCORE, deadline)
+                if results is not None:
+                    nodes += results[0][3]
+                    alpha = results[0][1]
+                    with shared_alpha.get_lock():
+                        shared_alpha.value = max(shared_alpha.value, alpha)
+                    rest = _run_tasks(executor, task, moves[1:], alpha, deadline)
+                    results = results + rest if rest is not None else None
+            if results is None:
+                break
+            nodes += sum(result[3] for result in results[0 if deterministic else 1:])
+            # A score above its search's alpha is exact, the first (best ordered) move wins ties
+            move, score = results[0][0], results[0][1]
+            for square, square_score, alpha, _ in results[1:]:
+                if square_score > alpha and square_score > score:
+                    move, score = square, square_score
+            best_move, best_score, completed_depth = move, score, depth
+            moves.sort(key=lambda candidate: candidate[0] != best_move)
+    finally:
+        lock.release()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return othello_ai.SearchResult(best_move, best_score, completed_depth, nodes, elapsed_ms)
+
+
+def measure_speedup(positions: [(int, int, int)], n: int, depth: int,
+                    workers: int = DEFAULT_WORKERS) -> SpeedupResult:
+    """ Searches (player, opponent, color) positions to [depth] in one process and across [workers] processes.
+        Returns the total times and nodes of both and the speedup """
+    _get_pool(workers)  # Start the workers before timing
+    serial_ms = parallel_ms = 0.0
+    serial_nodes = parallel_nodes = 0
+    for player, opponent, color in positions:
+        start = time.perf_counter()
+        result = othello_ai.search(player, opponent, n, 10 ** 9, max_depth=depth, color=color)
+        serial_ms += (time.perf_counter() - start) * 1000
+        serial_nodes += result.nodes
+        start = time.perf_counter()
+        result = parallel_search(player, opponent, n, 10 ** 9, max_depth=depth, color=color, workers=workers)
+        parallel_ms += (time.perf_counter() - start) * 1000
+        parallel_nodes += result.nodes
+    return SpeedupResult(depth, len(positions), workers, serial_ms, parallel_ms,
+                         serial_ms / parallel_ms if parallel_ms else 0.0, serial_nodes, parallel_nodes)
+
+
+def sample_positions(n: int, count: int, plies: int, seed: int = 0) -> [(int, int, int)]:
+    """ Returns [count] (player, opponent, color) positions reached by [plies] seeded random moves """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        state = othello_logic.GameState.new(n)
+        for _ in range(plies):
+            if state.is_game_over:
+                break
+            state = state.apply(rng.choice(sorted(state.legal_moves())))
+        if not state.is_game_over:
+            color = othello_hashing.BLACK if state.curr_turn == othello_logic.P_BLACK else othello_hashing.WHITE
+            positions.append((*state.player_bitboards(), color))
+    return positions
+
+
+def shutdown() -> None:
+    """ Stops every worker pool """
+    with _pools_lock:
+        for executor, _, _, _ in _pools.values():
+            executor.shutdown(cancel_futures=True)
+        _pools.clear()
+
+
+# Helper functions
+
+
+def _get_pool(workers: int) -> (ProcessPoolExecutor, multiprocessing.Value, multiprocessing.Value, threading.Lock):
+    """ Returns the pool of [workers] processes, its shared alpha and search number, starting them on first use """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            shared_alpha = multiprocessing.Value('q', _NO_SCORE)
+            shared_search = multiprocessing.Value('q', 0, lock=False)  # Guarded by shared_alpha's lock
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                           initargs=(shared_alpha, shared_search))
+            pool = _pools[workers] = (executor, shared_alpha, shared_search, threading.Lock())
+        return pool
+
+
+def _run_tasks(executor: ProcessPoolExecutor, task: tuple, moves: [(int, int)], alpha: int,
+               deadline: float) -> [(int, int, int, int)]:
+    """ Searches root moves in the pool. Returns their results in move order, or None if the deadline passed """
+    futures = [executor.submit(_search_task, *task, square, flips, alpha) for square, flips in moves]
+    done, pending = wait(futures, timeout=max(deadline - time.time(), 0) if deadline != float('inf') else None)
+    results = [future.result() for future in futures if future in done]
+    if pending or any(result[1] is None for result in results):
+        for future in pending:
+            future.cancel()  # Running ones stop at the deadline on their own
+        return None
+    return results
+
+
+def _init_worker(shared_alpha: multiprocessing.Value, shared_search: multiprocessing.Value) -> None:
+    global _shared_alpha, _shared_search
+    _shared_alpha, _shared_search = shared_alpha, shared_search
+
+
+def _search_task(search_id: tuple, search_number: int, player: int, opponent: int, n: int, depth: int, color: int,
+                 deadline: float, reference, deterministic: bool, square: int, flips: int,
+                 alpha: int) -> (int, int, int, int):
+    """ Worker task: searches one root move of search [search_number]. Returns its square, score (None on
+        timeout), the alpha it was searched with and the nodes searched """
+    global _table, _table_search
+    if deterministic:
+        table = othello_hashing.TranspositionTable()
+    else:
+        if _table_search != search_id:
+            _table, _table_search = othello_hashing.TranspositionTable(), search_id
+        table = _table
+        with _shared_alpha.get_lock():
+            if _shared_search.value == search_number:
+                alpha = max(alpha, _shared_alpha.value)
+    perf_deadline = time.perf_counter() + (deadline - time.time()) if deadline != float('inf') else deadline
+    score, nodes = othello_ai.search_root_move(player, opponent, n, square, flips, depth, alpha, -_NO_SCORE,
+                                               _resolve_evaluator(reference), color, perf_deadline, table)
+    if not deterministic and score is not None and score > alpha:
+        with _shared_alpha.get_lock():
+            if _shared_search.value == search_number and score > _shared_alpha.value:
+                _shared_alpha.value = score
+    return square, score, alpha, nodes
+
+
+def _evaluator_reference(evaluator):
+    """ Returns what to send workers for an evaluator: None for the default, a weights file path for loaded
+        pattern weights, else the evaluator itself """
+    if evaluator is othello_ai.evaluate:
+        return None
+    if isinstance(evaluator, othello_patterns.PatternEvaluator) and evaluator.path is not None:
+        return evaluator.path
+    return evaluator
+
+
+def _resolve_evaluator(reference):
+    if reference is None:
+        return othello_ai.evaluate
+    if isinstance(reference, str):
+        return _load_patterns(reference)
+    return reference
+
+
+@lru_cache(maxsize=None)
+def _load_patterns(path: str) -> othello_patterns.PatternEvaluator:
+    return othello_patterns.PatternEvaluator.load(path)
+
+
+def main():
+    """ Reports the speedup of the parallel search over the single process search at equal depth """
+    parser = argparse.ArgumentParser(description='Measure the parallel search speedup.')
+    parser.add_argument('-s', '--size', type=int, default=8, help='board size')
+    parser.add_argument('-d', '--depth', type=int, default=5, help='search depth')
+    parser.add_argument('-w', '--workers', type=int, default=DEFAULT_WORKERS, help='worker processes')
+    parser.add_argument('-p', '--positions', type=int, default=10, help='number of positions searched')
+    parser.add_argument('--plies', type=int, default=16, help='random moves played to reach each position')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the positions')
+    args = parser.parse_args()
+    if not othello_logic.is_valid_board_size(args.size):
+        parser.error(f'invalid board size {args.size}')
+
+    try:
+        result = measure_speedup(sample_positions(args.size, args.positions, args.plies, args.seed), args.size,
+                                 args.depth, args.workers)
+    finally:
+        shutdown()
+    print(f'{result.positions} positions at depth {result.depth} with {result.workers} workers')
+    print(f'single process: {result.serial_ms:.0f}ms, {result.serial_nodes} nodes')
+    print(f'parallel:       {result.parallel_ms:.0f}ms, {result.parallel_nodes} nodes')
+    print(f'speedup:        {result.speedup:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
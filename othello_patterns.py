@@ -0,0 +1,337 @@
+# othello_patterns.py
+import argparse
+import array
+import itertools
+import os
+import random
+import struct
+import sys
+import time
+from functools import lru_cache
+
+import othello_ai
+import othello_bitboard
+import othello_book
+import othello_hashing
+import othello_logic
+import othello_records
+
+# Pattern evaluation: the board is read through lines of cells (edges, rows, corners, diagonals), every pattern
+# instance's cells form a base-3 index (0 empty, 1 the side to move's disc, 2 the opponent's) and the score is
+# the sum of one weight per instance, looked up in the weight table of the instance's family and game phase.
+# The eight symmetric instances of a family share its table.
+#
+# Weights file: a header, then every weight as a little-endian float32, phase by phase and family by family
+
+DEFAULT_PHASES = 4
+MAX_PATTERN_CELLS = 10  # A family of k cells has 3^k weights per phase
+SCORE_SCALE = 100  # Scores are hundredths of a disc of predicted final differential
+PATTERNS_MAGIC = b'OTHP'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sHBBI')  # magic, version, board size, phases, weight count
+
+
+class PatternSet:
+    """ The pattern instances of a board size and the tables to compute their indices. Made once per size """
+    def __init__(self, n: int):
+        self.n = n
+        self.families = []  # (name, cell count)
+        self.instances = []  # (family index, squares)
+        family_offsets = []
+        self.phase_size = 0
+        for name, cells in _family_cells(n):
+            family_offsets.append(self.phase_size)
+            self.phase_size += 3 ** len(cells)
+            for squares in _symmetric_instances(cells, n):
+                self.instances.append((len(self.families), squares))
+            self.families.append((name, len(cells)))
+        self.offsets = tuple(family_offsets[family] for family, _ in self.instances)
+        self.swaps = tuple(_swap_table(len(squares)) for _, squares in self.instances)
+        updates = [[] for _ in range(n * n)]
+        for instance, (_, squares) in enumerate(self.instances):
+            for position, square in enumerate(squares):
+                updates[square].append((instance, 3 ** position))
+        self.square_updates = tuple(map(tuple, updates))  # square -> (instance, power of its cell)
+
+    def indices(self, first: int, second: int) -> [int]:
+        """ Computes every instance's index from scratch, with [first]'s discs as 1 and [second]'s as 2 """
+        indices = [0] * len(self.instances)
+        updates = self.square_updates
+        for square in othello_bitboard.iter_squares(first):
+            for instance, power in updates[square]:
+                indices[instance] += power
+        for square in othello_bitboard.iter_squares(second):
+            for instance, power in updates[square]:
+                indices[instance] += 2 * power
+        return indices
+
+    def update(self, indices: [int], square: int, flips: int, color: int) -> None:
+        """ Updates black-1/white-2 indices in place for the player of [color] moving on [square] """
+        updates = self.square_updates
+        for instance, power in updates[square]:
+            indices[instance] += (color + 1) * power
+        delta = 2 * color - 1  # Opponent digit to mover digit: 2 -> 1 for black, 1 -> 2 for white
+        for flipped in othello_bitboard.iter_squares(flips):
+            for instance, power in updates[flipped]:
+                indices[instance] += delta * power
+
+    def undo(self, indices: [int], square: int, flips: int, color: int) -> None:
+        """ Reverses update() in place """
+        updates = self.square_updates
+        for instance, power in updates[square]:
+            indices[instance] -= (color + 1) * power
+        delta = 2 * color - 1
+        for flipped in othello_bitboard.iter_squares(flips):
+            for instance, power in updates[flipped]:
+                indices[instance] -= delta * power
+
+    def features(self, indices: [int], color: int) -> [int]:
+        """ Returns the weight offsets within a phase of black-1/white-2 indices seen by the player of [color] """
+        if color == othello_hashing.BLACK:
+            return [offset + index for offset, index in zip(self.offsets, indices)]
+        return [offset + swap[index] for offset, swap, index in zip(self.offsets, self.swaps, indices)]
+
+
+@lru_cache(maxsize=None)
+def pattern_set(n: int) -> PatternSet:
+    """ Returns the pattern set of a board size """
+    return PatternSet(n)
+
+
+class PatternEvaluator:
+    """ Pattern weights of a board size. Called as (player, opponent, n) it is an othello_ai evaluator """
+    def __init__(self, n: int, phases: int = DEFAULT_PHASES, weights: array.array = None):
+        self.n = n
+        self.phases = phases
+        self.path = None  # The weights file, when loaded from one
+        self.patterns = pattern_set(n)
+        size = phases * self.patterns.phase_size
+        self.weights = weights if weights is not None else array.array('f', bytes(4 * size))
+        if len(self.weights) != size:
+            raise InvalidWeightsError(f'A {n}x{n} table with {phases} phases has {size} weights, '
+                                      f'not {len(self.weights)}')
+        cells = n * n
+        # Weight offset of the phase of every disc count, the phases splitting the game into equal parts
+        self.phase_bases = tuple(max(discs - 4, 0) * phases // (cells - 3) * self.patterns.phase_size
+                                 for discs in range(cells + 1))
+
+    def __call__(self, player: int, opponent: int, n: int) -> int:
+        return self.score(self.patterns.indices(player, opponent), othello_hashing.BLACK,
+                          othello_bitboard.popcount(player | opponent))
+
+    def score(self, indices: [int], color: int, discs: int) -> int:
+        """ Scores black-1/white-2 indices for the player of [color] to move, [discs] being on the board """
+        weights = self.weights
+        base = self.phase_bases[discs]
+        total = 0.0
+        if color == othello_hashing.BLACK:
+            for offset, index in zip(self.patterns.offsets, indices):
+                total += weights[base + offset + index]
+        else:
+            for offset, swap, index in zip(self.patterns.offsets, self.patterns.swaps, indices):
+                total += weights[base + offset + swap[index]]
+        return round(total * SCORE_SCALE)
+
+    def save(self, path: str) -> None:
+        """ Writes the weights file, replacing [path] atomically """
+        weights = self.weights
+        if sys.byteorder == 'big':
+            weights = array.array('f', weights)
+            weights.byteswap()
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as weights_file:
+            weights_file.write(_HEADER.pack(PATTERNS_MAGIC, FORMAT_VERSION, self.n, self.phases, len(weights)))
+            weights.tofile(weights_file)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'PatternEvaluator':
+        """ Reads a weights file. The table is read in one call, so this takes milliseconds """
+        with open(path, 'rb') as weights_file:
+            header = weights_file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise InvalidWeightsError(f'{path} is not a pattern weights file')
+            magic, version, n, phases, count = _HEADER.unpack(header)
+            if magic != PATTERNS_MAGIC or version != FORMAT_VERSION:
+                raise InvalidWeightsError(f'{path} is not a version {FORMAT_VERSION} pattern weights file')
+            weights = array.array('f')
+            try:
+                weights.fromfile(weights_file, count)
+            except EOFError:
+                raise InvalidWeightsError(f'{path} is truncated')
+        if sys.byteorder == 'big':
+            weights.byteswap()
+        evaluator = cls(n, phases, weights)
+        evaluator.path = path
+        return evaluator
+
+
+def load_weights(n: int, directory: str = othello_book.DEFAULT_BOOK_DIR) -> PatternEvaluator:
+    """ Returns the trained evaluator of a board size (read once per process), or None if it has not been trained.
+        Weights trained while the server runs are used once their file appears """
+    path = weights_path(n, directory)
+    if not os.path.exists(path):
+        return None
+    return _read_weights(path)
+
+
+@lru_cache(maxsize=None)
+def _read_weights(path: str) -> PatternEvaluator:
+    """ Reads a weights file once per path """
+    return PatternEvaluator.load(path)
+
+
+def weights_path(n: int, directory: str = othello_book.DEFAULT_BOOK_DIR) -> str:
+    """ Returns the default file of a board size's pattern weights """
+    return os.path.join(directory, f'patterns_{n}.bin')
+
+
+# Training
+
+
+def training_samples(records, n: int):
+    """ Yields (disc count, features, final disc differential for the player to move) for every position of the
+        finished nxn games in an iterable of records. Indices are carried from move to move incrementally """
+    patterns = pattern_set(n)
+    for record in records:
+        if record.n != n or not record.finished:
+            continue
+        indices = None
+        for position in othello_records.replay(record):
+            state = position.state
+            if indices is None:
+                indices = patterns.indices(state.black, state.white)
+            color = othello_hashing.BLACK if state.curr_turn == othello_logic.P_BLACK else othello_hashing.WHITE
+            yield state.black_count + state.white_count, patterns.features(indices, color), position.result
+            patterns.update(indices, position.move.row * n + position.move.column, state.flips(position.move), color)
+
+
+def train(records_path: str, n: int, phases: int = DEFAULT_PHASES, epochs: int = 4, learning_rate: float = 0.01,
+          evaluator: PatternEvaluator = None, report=None) -> PatternEvaluator:
+    """ Fits pattern weights to the final results of the games in a record file by stochastic gradient descent on
+        the squared error. The file is streamed once per epoch, so it may hold any number of games. [report] is
+        called with (epoch, positions, mean squared error) after every epoch """
+    if evaluator is None:
+        evaluator = PatternEvaluator(n, phases)
+    weights, phase_bases = evaluator.weights, evaluator.phase_bases
+    step = learning_rate / len(evaluator.patterns.instances)
+    for epoch in range(epochs):
+        positions, squared_error = 0, 0.0
+        for discs, features, result in training_samples(othello_records.read_records(records_path), n):
+            base = phase_bases[discs]
+            error = result - sum(weights[base + feature] for feature in features)
+            correction = step * error
+            for feature in features:
+                weights[base + feature] += correction
+            positions += 1
+            squared_error += error * error
+        if report is not None:
+            report(epoch + 1, positions, squared_error / positions if positions else 0.0)
+    return evaluator
+
+
+def self_play_records(n: int, games: int, depth: int = 2, random_moves: int = 6, seed: int = 0):
+    """ Yields the records of [games] games of the alpha-beta search against itself to [depth] plies, each opened
+        with [random_moves] random plies so the games differ """
+    rng = random.Random(seed)
+    for _ in range(games):
+        state = othello_logic.GameState.new(n)
+        moves = []
+        while not state.is_game_over:
+            if len(moves) < random_moves:
+                move = rng.choice(sorted(state.legal_moves()))
+            else:
+                move = othello_ai.choose_move(state.to_board(), state.to_game_info(), 10 ** 9, max_depth=depth).move
+            moves.append(move)
+            state = state.apply(move)
+        yield othello_records.make_record(state, moves)
+
+
+# Helper functions
+
+
+def _family_cells(n: int) -> [(str, ((int, int),))]:
+    """ Returns the (name, cells) of every pattern family of a nxn board, cells in the top left orientation.
+        Families longer than MAX_PATTERN_CELLS are left out, so large boards keep only the shorter ones """
+    edge = [(0, column) for column in range(n)]
+    families = [('edge', edge + [(1, 1), (1, n - 2)] if n <= 8 else edge)]
+    for row in range(1, min(4, n // 2)):
+        families.append((f'row{row + 1}', [(row, column) for column in range(n)]))
+    families.append(('corner3x3', [(row, column) for row in range(3) for column in range(3)]))
+    if n >= 5:
+        families.append(('corner2x5', [(row, column) for row in range(2) for column in range(5)]))
+    for offset in range(n - 3):
+        families.append((f'diagonal{n - offset}', [(i, i + offset) for i in range(n - offset)]))
+    return [(name, tuple(cells)) for name, cells in families if len(cells) <= MAX_PATTERN_CELLS]
+
+
+def _symmetric_instances(cells: ((int, int),), n: int) -> [(int,)]:
+    """ Returns the squares of every distinct image of a pattern under the eight board symmetries """
+    instances, seen = [], set()
+    for transpose, flip_rows, flip_columns in itertools.product((False, True), repeat=3):
+        squares = []
+        for row, column in cells:
+            if transpose:
+                row, column = column, row
+            if flip_rows:
+                row = n - 1 - row
+            if flip_columns:
+                column = n - 1 - column
+            squares.append(row * n + column)
+        if frozenset(squares) not in seen:
+            seen.add(frozenset(squares))
+            instances.append(tuple(squares))
+    return instances
+
+
+@lru_cache(maxsize=None)
+def _swap_table(length: int) -> (int,):
+    """ Maps every index of a [length] cell pattern to the index with the two colours exchanged """
+    table = (0,)
+    for position in range(length):
+        power = 3 ** position
+        table = tuple(swapped + digit * power for digit in (0, 2, 1) for swapped in table)
+    return table
+
+
+def main():
+    """ Trains pattern weights from the command line """
+    parser = argparse.ArgumentParser(description='Train pattern evaluation weights from game records.')
+    parser.add_argument('records', help='game record file (othello_records text or binary format)')
+    parser.add_argument('-s', '--size', type=int, default=8, help='board size')
+    parser.add_argument('--self-play', type=int, default=0, metavar='GAMES',
+                        help='first append this many search self-play games to the record file')
+    parser.add_argument('--depth', type=int, default=2, help='search depth of the self-play games')
+    parser.add_argument('--phases', type=int, default=DEFAULT_PHASES, help='game phases with their own weights')
+    parser.add_argument('--epochs', type=int, default=4, help='passes over the record file')
+    parser.add_argument('--learning-rate', type=float, default=0.01, help='gradient descent step size')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the self-play openings')
+    parser.add_argument('-o', '--output', default=None, help='weights file (default: books/patterns_<size>.bin)')
+    args = parser.parse_args()
+    if not othello_logic.is_valid_board_size(args.size):
+        parser.error(f'invalid board size {args.size}')
+
+    if args.self_play:
+        start = time.perf_counter()
+        for record in self_play_records(args.size, args.self_play, args.depth, seed=args.seed):
+            othello_records.append_record(args.records, record)
+        print(f'Played {args.self_play} games in {time.perf_counter() - start:.1f}s')
+    output = args.output or weights_path(args.size)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    def report(epoch, positions, error):
+        print(f'Epoch {epoch}: {positions} positions, mean squared error {error:.2f}')
+    evaluator = train(args.records, args.size, args.phases, args.epochs, args.learning_rate, report=report)
+    evaluator.save(output)
+    print(f'Wrote {len(evaluator.weights)} weights to {output}')
+
+
+# Exception classes
+
+
+class InvalidWeightsError(Exception):
+    pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+# othello_records.py
+import os
+import struct
+import tempfile
+from collections import namedtuple
+
+import othello_logic
+
+# A game record is the move list of a game plus its final disc counts. Passes are not stored:
+# replaying the moves from the start position recovers them.
+GameRecord = namedtuple('GameRecord', 'n moves finished black_count white_count')
+ReplayPosition = namedtuple('ReplayPosition', 'state move result')  # result: final disc differential for the mover
+
+# Text format: one game per line, the board size, the moves in standard notation (column letter, row number)
+# and the final 'black-white' disc counts, or '*' for an unfinished game:  8 f5 d6 c3 ... 40-24
+UNFINISHED = '*'
+TEXT_SUFFIX = '.txt'
+
+# Binary format: a file header, then per game a record header followed by one byte per move square
+RECORDS_MAGIC = b'OTHR'
+FORMAT_VERSION = 1
+_FILE_HEADER = struct.Struct('<4sH')  # magic, version
+_RECORD_HEADER = struct.Struct('<BBHHH')  # board size, finished, black count, white count, move count
+
+
+def make_record(state: othello_logic.GameState, moves: [othello_logic.Move]) -> GameRecord:
+    """ Returns the record of the game that reached [state] by playing [moves] """
+    return GameRecord(state.n, tuple(moves), state.is_game_over, state.black_count, state.white_count)
+
+
+def record_from_moves(n: int, moves: [othello_logic.Move]) -> GameRecord:
+    """ Plays [moves] from the start of a nxn game and returns its record.
+        Raises InvalidMoveError if a move is illegal """
+    state = othello_logic.GameState.new(n)
+    for move in moves:
+        state = state.apply(move)
+    return make_record(state, moves)
+
+
+# Text format
+
+
+def move_to_text(move: othello_logic.Move) -> str:
+    """ Returns a move in standard notation, e.g. Move(4, 5) -> 'f5' """
+    return f'{chr(ord("a") + move.column)}{move.row + 1}'
+
+
+def text_to_move(text: str) -> othello_logic.Move:
+    """ Parses a move in standard notation """
+    try:
+        return othello_logic.Move(int(text[1:]) - 1, ord(text[0].lower()) - ord('a'))
+    except (IndexError, ValueError):
+        raise InvalidRecordError(f'Invalid move {text!r}')
+
+
+def format_text(record: GameRecord) -> str:
+    """ Formats a record as one line of the text format, without the newline """
+    result = f'{record.black_count}-{record.white_count}' if record.finished else UNFINISHED
+    return ' '.join([str(record.n), *map(move_to_text, record.moves), result])
+
+
+def parse_text(line: str) -> GameRecord:
+    """ Parses one line of the text format. The final counts of an unfinished game are taken from its moves """
+    tokens = line.split()
+    if len(tokens) < 2 or not tokens[0].isdigit():
+        raise InvalidRecordError(f'Invalid record {line!r}')
+    n, moves = int(tokens[0]), tuple(text_to_move(token) for token in tokens[1:-1])
+    if tokens[-1] == UNFINISHED:
+        return record_from_moves(n, moves)
+    black_count, _, white_count = tokens[-1].partition('-')
+    if not black_count.isdigit() or not white_count.isdigit():
+        raise InvalidRecordError(f'Invalid result {tokens[-1]!r}')
+    return GameRecord(n, moves, True, int(black_count), int(white_count))
+
+
+# Binary format
+
+
+def pack_record(record: GameRecord) -> bytes:
+    """ Packs a record into the binary format """
+    squares = bytes(move.row * record.n + move.column for move in record.moves)
+    return _RECORD_HEADER.pack(record.n, record.finished, record.black_count, record.white_count,
+                               len(squares)) + squares
+
+
+def read_binary_records(path: str):
+    """ Yields the records of a binary file one at a time, never holding more than one in memory """
+    with open(path, 'rb') as records_file:
+        _check_file_header(records_file.read(_FILE_HEADER.size), path)
+        while True:
+            header = records_file.read(_RECORD_HEADER.size)
+            if not header:
+                return
+            if len(header) < _RECORD_HEADER.size:
+                raise InvalidRecordError(f'Truncated record in {path}')
+            n, finished, black_count, white_count, move_count = _RECORD_HEADER.unpack(header)
+            squares = records_file.read(move_count)
+            if len(squares) < move_count:
+                raise InvalidRecordError(f'Truncated record in {path}')
+            moves = tuple(othello_logic.Move(*divmod(square, n)) for square in squares)
+            yield GameRecord(n, moves, bool(finished), black_count, white_count)
+
+
+def read_text_records(path: str):
+    """ Yields the records of a text file one line at a time. Blank lines and lines starting with # are skipped """
+    with open(path) as records_file:
+        for line in records_file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield parse_text(line)
+
+
+# Reading and writing files
+
+
+def read_records(path: str):
+    """ Yields the records of a text or binary file, telling the format from the file's first bytes """
+    with open(path, 'rb') as records_file:
+        is_binary = records_file.read(len(RECORDS_MAGIC)) == RECORDS_MAGIC
+    return read_binary_records(path) if is_binary else read_text_records(path)
+
+
+def append_record(path: str, record: GameRecord) -> None:
+    """ Appends a record to a file, in the text format if [path] ends with TEXT_SUFFIX, else the binary format.
+        Each record goes out in one append-mode write, so processes sharing the file do not interleave records """
+    if path.endswith(TEXT_SUFFIX):
+        data = (format_text(record) + '\n').encode('utf-8')
+    else:
+        _create_binary_file(path)
+        data = pack_record(record)
+    descriptor = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(descriptor, data)
+    finally:
+        os.close(descriptor)
+
+
+def write_records(path: str, records) -> int:
+    """ Writes an iterable of records to a new file in the format chosen by [path], streaming them so any
+        number fits in constant memory. Returns the number written """
+    count = 0
+    if path.endswith(TEXT_SUFFIX):
+        with open(path, 'w') as records_file:
+            for record in records:
+                records_file.write(format_text(record) + '\n')
+                count += 1
+    else:
+        with open(path, 'wb') as records_file:
+            records_file.write(_FILE_HEADER.pack(RECORDS_MAGIC, FORMAT_VERSION))
+            for record in records:
+                records_file.write(pack_record(record))
+                count += 1
+    return count
+
+
+# Replay
+
+
+def replay(record: GameRecord):
+    """ Yields a ReplayPosition for every move of a record: the state before the move, the move, and the final
+        disc differential for the player making it (None for an unfinished game) """
+    state = othello_logic.GameState.new(record.n)
+    difference = record.black_count - record.white_count
+    for move in record.moves:
+        result = None
+        if record.finished:
+            result = difference if state.curr_turn == othello_logic.P_BLACK else -difference
+        yield ReplayPosition(state, move, result)
+        state = state.apply(move)
+
+
+def replay_records(records):
+    """ Yields the ReplayPositions of every record in an iterable of records, lazily """
+    for record in records:
+        yield from replay(record)
+
+
+def replay_file(path: str):
+    """ Yields the ReplayPositions of every game in a record file, lazily and at constant memory """
+    return replay_records(read_records(path))
+
+
+# Helper functions
+
+
+def _create_binary_file(path: str) -> None:
+    """ Creates a binary records file holding only its header, unless [path] exists. The header is written to a
+        temporary file that is then hard linked to [path], so no process ever appends to a file without it """
+    if os.path.exists(path):
+        return
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(descriptor, 'wb') as records_file:
+            records_file.write(_FILE_HEADER.pack(RECORDS_MAGIC, FORMAT_VERSION))
+        os.chmod(temporary, 0o644)
+        try:
+            os.link(temporary, path)
+        except FileExistsError:
+            pass  # Another process created it first
+    finally:
+        os.remove(temporary)
+
+
+def _check_file_header(header: bytes, path: str) -> None:
+    if len(header) < _FILE_HEADER.size:
+        raise InvalidRecordError(f'{path} is not a game record file')
+    magic, version = _FILE_HEADER.unpack(header)
+    if magic != RECORDS_MAGIC or version != FORMAT_VERSION:
+        raise InvalidRecordError(f'{path} is not a version {FORMAT_VERSION} game record file')
+
+
+# Exception classes
+
+
+class InvalidRecordError(Exception):
+    pass
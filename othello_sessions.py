@@ -0,0 +1,245 @@
+# othello_sessions.py
+import json
+import os
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from collections import namedtuple
+
+import othello_logic
+
+# Current GameState, the MoveRecords played to reach it (oldest first), the undone ones (next to redo last) and
+# whether the game has been written to the records file, which happens once even if its end is undone and replayed
+Session = namedtuple('Session', 'state history redo recorded', defaults=(False,))
+
+DEFAULT_MAX_SESSIONS = 10000
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+
+def new_game_id() -> str:
+    """ Returns a new random game id """
+    return uuid.uuid4().hex
+
+
+def new_session(n: int) -> Session:
+    """ Returns the session of a new nxn game """
+    return Session(othello_logic.GameState.new(n), (), ())
+
+
+def session_moves(session: Session) -> (othello_logic.Move,):
+    """ Returns the moves played in a session's game """
+    return tuple(record.move for record in session.history)
+
+
+def play(session: Session, move: othello_logic.Move, flips: int = None) -> Session:
+    """ Returns the session after [move]. A new move discards the undone moves """
+    state, record = session.state.apply_recorded(move, flips)
+    return Session(state, session.history + (record,), (), session.recorded)
+
+
+def undo(session: Session) -> Session:
+    """ Returns the session with its last move taken back, or None if no move has been played """
+    if not session.history:
+        return None
+    record = session.history[-1]
+    return Session(session.state.undo(record), session.history[:-1], session.redo + (record,), session.recorded)
+
+
+def redo(session: Session) -> Session:
+    """ Returns the session with its last undone move played again, or None if there is none """
+    if not session.redo:
+        return None
+    record = session.redo[-1]
+    state = session.state.apply(record.move, record.flips)
+    return Session(state, session.history + (record,), session.redo[:-1], session.recorded)
+
+
+def session_to_dict(session: Session) -> dict:
+    """ Converts a session to a JSON serialisable dict """
+    data = state_to_dict(session.state)
+    data['history'] = [_record_to_list(record) for record in session.history]
+    data['redo'] = [_record_to_list(record) for record in session.redo]
+    data['recorded'] = session.recorded
+    return data
+
+
+def session_from_dict(data: dict) -> Session:
+    """ Rebuilds a session from session_to_dict output """
+    return Session(state_from_dict(data), tuple(_record_from_list(record) for record in data.get('history', ())),
+                   tuple(_record_from_list(record) for record in data.get('redo', ())), data.get('recorded', False))
+
+
+def state_to_dict(state: othello_logic.GameState) -> dict:
+    """ Converts a game state to a JSON serialisable dict """
+    return {
+        'n': state.n,
+        'black': state.black,
+        'white': state.white,
+        'game_info': state.to_game_info()
+    }
+
+
+def state_from_dict(data: dict) -> othello_logic.GameState:
+    """ Rebuilds a game state from state_to_dict output """
+    game_info = othello_logic.GameInfo._make(data['game_info'])
+    prev_move = othello_logic.Move._make(game_info.prev_move) if game_info.prev_move is not None else None
+    return othello_logic.GameState(data['n'], data['black'], data['white'], game_info.curr_turn, game_info.winner,
+                                   game_info.is_game_over, prev_move, game_info.prev_turn, game_info.passed_turn,
+                                   game_info.black_count, game_info.white_count)
+
+
+class SessionStore:
+    """ Interface of a store of game sessions keyed by game id """
+    def get(self, game_id: str) -> Session:
+        """ Returns the session of a game, or None if the game is unknown or expired """
+        raise NotImplementedError
+
+    def put(self, game_id: str, session: Session) -> None:
+        """ Saves the session of a game """
+        raise NotImplementedError
+
+    def delete(self, game_id: str) -> None:
+        """ Forgets a game """
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """ In-process store that evicts the least recently used game past [max_sessions]
+        and games not touched for [ttl_seconds] """
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()  # game id -> (last used time, session), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, game_id: str) -> Session:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(game_id)
+            if entry is None:
+                return None
+            if now - entry[0] > self.ttl_seconds:
+                del self._sessions[game_id]
+                return None
+            self._sessions[game_id] = (now, entry[1])
+            self._sessions.move_to_end(game_id)
+            return entry[1]
+
+    def put(self, game_id: str, session: Session) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[game_id] = (now, session)
+            self._sessions.move_to_end(game_id)
+            self._evict(now)
+
+    def delete(self, game_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(game_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _evict(self, now: float) -> None:
+        """ Drops expired games from the old end, then the least recently used games over the limit """
+        sessions = self._sessions
+        while sessions:
+            game_id, (last_used, _) = next(iter(sessions.items()))
+            if len(sessions) <= self.max_sessions and now - last_used <= self.ttl_seconds:
+                break
+            del sessions[game_id]
+
+
+class DiskSessionStore(SessionStore):
+    """ Store that keeps one JSON file per game in [directory], so games survive restarts and
+        can be shared by several worker processes on one machine """
+    def __init__(self, directory: str, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, game_id: str) -> Session:
+        path = self._path(game_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                self.delete(game_id)
+                return None
+            with open(path) as session_file:
+                return session_from_dict(json.load(session_file))
+        except FileNotFoundError:
+            return None
+
+    def put(self, game_id: str, session: Session) -> None:
+        path = self._path(game_id)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as session_file:
+            json.dump(session_to_dict(session), session_file)
+        os.replace(temp_path, path)  # Readers never see a half written file
+
+    def delete(self, game_id: str) -> None:
+        try:
+            os.remove(self._path(game_id))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, game_id: str) -> str:
+        """ Returns the file of a game, rejecting ids that are not plain hex """
+        if not game_id or not all(char in '0123456789abcdef' for char in game_id):
+            raise InvalidGameIdError(game_id)
+        return os.path.join(self.directory, f'{game_id}.json')
+
+
+class GameLocks:
+    """ One lock per game id, held around every read-modify-write of a game's session so concurrent moves,
+        undos and redos on one game never lose an update. Locks live only while someone holds or waits on them.
+        They serialise the threads of one process; processes sharing a DiskSessionStore are not coordinated """
+    def __init__(self):
+        self._locks = weakref.WeakValueDictionary()  # game id -> _GameLock
+        self._lock = threading.Lock()
+
+    def get(self, game_id: str) -> '_GameLock':
+        """ Returns the lock of a game, to be used as a context manager """
+        with self._lock:
+            lock = self._locks.get(game_id)
+            if lock is None:
+                lock = self._locks[game_id] = _GameLock()
+            return lock
+
+
+class _GameLock:
+    """ A threading.Lock that can be weakly referenced """
+    __slots__ = ('_lock', '__weakref__')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+        return False
+
+
+# Helper functions
+
+
+def _record_to_list(record: othello_logic.MoveRecord) -> list:
+    return [record.move.row, record.move.column, record.player, record.flips, record.game_info]
+
+
+def _record_from_list(data: list) -> othello_logic.MoveRecord:
+    row, column, player, flips, game_info = data
+    game_info = othello_logic.GameInfo._make(game_info)
+    if game_info.prev_move is not None:
+        game_info = game_info._replace(prev_move=othello_logic.Move._make(game_info.prev_move))
+    return othello_logic.MoveRecord(othello_logic.Move(row, column), player, flips, game_info)
+
+
+# Exception classes
+
+
+class InvalidGameIdError(Exception):
+    pass
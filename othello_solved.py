@@ -0,0 +1,187 @@
+# othello_solved.py
+import argparse
+import os
+import random
+import struct
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import othello_bitboard
+import othello_book
+import othello_hashing
+import othello_logic
+
+SolvedEntry = namedtuple('SolvedEntry', 'score move')
+
+SOLVED_MAGIC = b'OTHS'
+NO_MOVE = 0xFF
+SPLIT_PLIES = 3  # Positions this many plies below a root are solved as separate worker tasks
+_SOLVED_RECORD = struct.Struct('<QbB')  # canonical key, disc differential for the side to move, canonical best square
+
+
+class SolvedTable(othello_book.MappedTable):
+    """ Memory-mapped table of exactly solved positions keyed by canonical position hash """
+    def __init__(self, path: str):
+        super().__init__(path, SOLVED_MAGIC)
+
+    def lookup(self, black: int, white: int, side_to_move: int) -> SolvedEntry:
+        """ Returns the perfect-play disc differential for the side to move and its best move (None when it
+            must pass), or None if the position is not in the table """
+        key, symmetry = othello_hashing.canonical_hash(black, white, self.n, side_to_move)
+        offset = self.find(key)
+        if offset < 0:
+            return None
+        _, score, square = self.read(_SOLVED_RECORD, offset)
+        if square == NO_MOVE:
+            return SolvedEntry(score, None)
+        square = othello_hashing.inverse_symmetry_permutations(self.n)[symmetry][square]
+        return SolvedEntry(score, othello_logic.Move(*divmod(square, self.n)))
+
+    def lookup_state(self, state: othello_logic.GameState) -> SolvedEntry:
+        """ Looks up the position of a game state """
+        if state.n != self.n or state.is_game_over:
+            return None
+        return self.lookup(state.black, state.white, _side_to_move(state.curr_turn))
+
+
+def load_table(n: int, directory: str = othello_book.DEFAULT_BOOK_DIR) -> SolvedTable:
+    """ Returns the solved table of a board size (opened once per process), or None if it has not been built.
+        Only tables that were found are kept """
+    path = table_path(n, directory)
+    if not os.path.exists(path):
+        return None
+    return _open_table(path)
+
+
+@lru_cache(maxsize=None)
+def _open_table(path: str) -> SolvedTable:
+    """ Maps a solved table file once per path """
+    return SolvedTable(path)
+
+
+def table_path(n: int, directory: str = othello_book.DEFAULT_BOOK_DIR) -> str:
+    """ Returns the default file of a board size's solved table """
+    return os.path.join(directory, f'solved_{n}.bin')
+
+
+# Solving
+
+
+def solve_positions(roots: [othello_logic.GameState], workers: int = None) -> {int: (int, int)}:
+    """ Solves every position reachable from [roots] with a full-window search, so every stored value is exact.
+        Symmetric positions are solved once. The positions [SPLIT_PLIES] below the roots are farmed out to a
+        process pool and their results merged before the top of the tree is solved from them.
+        Returns {canonical key: (score for the side to move, canonical best square or NO_MOVE)} """
+    n = roots[0].n
+    tasks = {}
+    for root in roots:
+        _collect_split_positions(root, SPLIT_PLIES, tasks)
+    solved = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for subtree in executor.map(_solve_subtree, tasks.values(), chunksize=max(1, len(tasks) // 64)):
+            solved.update(subtree)
+    for root in roots:
+        player, opponent = root.player_bitboards()
+        _solve(player, opponent, n, _side_to_move(root.curr_turn), solved)
+    return solved
+
+
+def sample_roots(n: int, empties: int, count: int, seed: int = 0) -> [othello_logic.GameState]:
+    """ Returns up to [count] distinct positions with [empties] empty cells from seeded random games """
+    rng = random.Random(seed)
+    roots = {}
+    for _ in range(count * 10):
+        if len(roots) >= count:
+            break
+        state = othello_logic.GameState.new(n)
+        while not state.is_game_over and n * n - state.black_count - state.white_count > empties:
+            state = state.apply(rng.choice(sorted(state.legal_moves())))
+        if not state.is_game_over:
+            roots.setdefault(othello_hashing.canonical_hash(state.black, state.white, n,
+                                                            _side_to_move(state.curr_turn))[0], state)
+    return list(roots.values())
+
+
+def write_solved(path: str, n: int, solved: {int: (int, int)}) -> None:
+    """ Writes solved positions as a SolvedTable file """
+    records = [(key, score, square) for key, (score, square) in solved.items()]
+    othello_book.write_table(path, SOLVED_MAGIC, n, _SOLVED_RECORD, records)
+
+
+def _collect_split_positions(state: othello_logic.GameState, plies: int, tasks: dict) -> None:
+    """ Adds the distinct positions [plies] below [state] (or games ending sooner) to [tasks] """
+    key = othello_hashing.canonical_hash(state.black, state.white, state.n, _side_to_move(state.curr_turn))[0]
+    if plies == 0 or state.is_game_over:
+        tasks.setdefault(key, state)
+        return
+    for move in state.legal_moves():
+        _collect_split_positions(state.apply(move), plies - 1, tasks)
+
+
+def _solve_subtree(state: othello_logic.GameState) -> {int: (int, int)}:
+    """ Worker task: solves one position and returns every position solved on the way """
+    solved = {}
+    player, opponent = state.player_bitboards()
+    _solve(player, opponent, state.n, _side_to_move(state.curr_turn), solved)
+    return solved
+
+
+def _solve(player: int, opponent: int, n: int, color: int, solved: dict) -> int:
+    """ Returns the exact score of the position for [player] (of [color]) to move, memoising every position """
+    black, white = (player, opponent) if color == othello_hashing.BLACK else (opponent, player)
+    key, symmetry = othello_hashing.canonical_hash(black, white, n, color)
+    known = solved.get(key)
+    if known is not None:
+        return known[0]
+    best_score, best_square = None, NO_MOVE
+    for square, flips in othello_bitboard.legal_moves(player, opponent, n):
+        new_player, new_opponent = othello_bitboard.apply_move(player, opponent, square, flips)
+        score = -_solve(new_opponent, new_player, n, 1 - color, solved)
+        if best_score is None or score > best_score:
+            best_score, best_square = score, square
+    if best_score is None:
+        if othello_bitboard.has_any_move(opponent, player, n):
+            best_score = -_solve(opponent, player, n, 1 - color, solved)
+        else:
+            best_score = othello_bitboard.popcount(player) - othello_bitboard.popcount(opponent)
+    else:
+        best_square = othello_hashing.symmetry_permutations(n)[symmetry][best_square]
+    solved[key] = (best_score, best_square)
+    return best_score
+
+
+def _side_to_move(curr_turn: str) -> int:
+    """ Returns the hashing colour of the player to move """
+    return othello_hashing.BLACK if curr_turn == othello_logic.P_BLACK else othello_hashing.WHITE
+
+
+def main():
+    """ Solves a board size from the command line and writes its table """
+    parser = argparse.ArgumentParser(description='Solve small boards and write a position table.')
+    parser.add_argument('-s', '--size', type=int, default=4, help='board size')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--empties', type=int, default=None,
+                        help='solve sampled positions with this many empties instead of the whole game')
+    parser.add_argument('--positions', type=int, default=1000, help='number of positions sampled with --empties')
+    parser.add_argument('--seed', type=int, default=0, help='seed for sampling positions')
+    parser.add_argument('-o', '--output', default=None, help='table file (default: books/solved_<size>.bin)')
+    args = parser.parse_args()
+    if not othello_logic.is_valid_board_size(args.size) or args.size * args.size > NO_MOVE:
+        parser.error(f'invalid board size {args.size}')
+
+    if args.empties is None:
+        roots = [othello_logic.GameState.new(args.size)]
+    else:
+        roots = sample_roots(args.size, args.empties, args.positions, args.seed)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * args.size * args.size))
+    solved = solve_positions(roots, args.workers)
+    output = args.output or table_path(args.size)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    write_solved(output, args.size, solved)
+    print(f'Wrote {len(solved)} solved positions to {output}')
+
+
+if __name__ == '__main__':
+    main()
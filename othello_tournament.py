@@ -0,0 +1,190 @@
+# othello_tournament.py
+import itertools
+import json
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import othello_ai
+import othello_bitboard
+import othello_logic
+import othello_mcts
+import othello_patterns
+
+# black, white and player are entrant ids, '<index>:<bot spec>', so a spec entered twice is two players
+GameResult = namedtuple('GameResult', 'game black white size seed winner black_count white_count moves elapsed_ms')
+Standing = namedtuple('Standing', 'player wins losses draws rating')
+
+ELO_START = 1500
+ELO_K = 16
+
+_mcts_players = {}  # (options, colour) -> MctsPlayer, so a bot keeps its tree between the moves of a game
+
+
+# Bots: functions (state, rng, **options) -> Move
+
+
+def random_bot(state: othello_logic.GameState, rng: random.Random) -> othello_logic.Move:
+    """ Plays a uniformly random legal move """
+    return rng.choice(sorted(state.legal_moves()))
+
+
+def greedy_bot(state: othello_logic.GameState, rng: random.Random) -> othello_logic.Move:
+    """ Plays the move that flips the most pieces, breaking ties randomly """
+    moves = state.legal_moves()
+    flip_counts = {move: othello_bitboard.popcount(flips) for move, flips in moves.items()}
+    most_flips = max(flip_counts.values())
+    return rng.choice(sorted(move for move, count in flip_counts.items() if count == most_flips))
+
+
+def ai_bot(state: othello_logic.GameState, rng: random.Random, ms: str = None, depth: str = None,
+           patterns: str = None) -> othello_logic.Move:
+    """ Plays the alpha-beta search move, limited by [ms] milliseconds and/or [depth] plies. With [patterns], a
+        directory holding trained pattern weights, positions are scored by othello_patterns """
+    time_limit_ms = int(ms) if ms is not None else othello_ai.DEFAULT_TIME_LIMIT_MS
+    if depth is not None and ms is None:
+        time_limit_ms = 10 ** 9  # Depth limited only, so results do not depend on machine load
+    evaluator = othello_ai.evaluate
+    if patterns is not None:
+        evaluator = othello_patterns.load_weights(state.n, patterns)
+        if evaluator is None:
+            raise InvalidBotError(f'No {state.n}x{state.n} pattern weights in {patterns}')
+    return othello_ai.choose_move(state.to_board(), state.to_game_info(), time_limit_ms, evaluator=evaluator,
+                                  max_depth=int(depth) if depth is not None else None).move
+
+
+def mcts_bot(state: othello_logic.GameState, rng: random.Random, ms: str = None, iterations: str = None,
+             workers: str = None) -> othello_logic.Move:
+    """ Plays the Monte Carlo tree search move after [ms] milliseconds and/or [iterations] playouts, searching
+        [workers] trees in parallel """
+    time_limit_ms = int(ms) if ms is not None else None
+    if ms is None and iterations is None:
+        time_limit_ms = othello_mcts.DEFAULT_TIME_LIMIT_MS
+    key = (ms, iterations, workers, state.curr_turn)
+    player = _mcts_players.get(key)
+    if player is None:
+        player = _mcts_players[key] = othello_mcts.MctsPlayer(workers=int(workers) if workers is not None else 1)
+    player.rng.seed(rng.getrandbits(32))  # Playouts follow the game's seed
+    return player.choose_move(state, time_limit_ms, int(iterations) if iterations is not None else None).move
+
+
+BOTS = {
+    'random': random_bot,
+    'greedy': greedy_bot,
+    'ai': ai_bot,
+    'mcts': mcts_bot
+}
+
+
+def parse_bot(spec: str):
+    """ Parses a bot spec such as 'random' or 'ai:depth=3,ms=50' into (bot function, options) """
+    name, _, option_text = spec.partition(':')
+    if name not in BOTS:
+        raise InvalidBotError(f'Unknown bot {name!r}, expected one of {", ".join(sorted(BOTS))}')
+    options = {}
+    for option in filter(None, option_text.split(',')):
+        key, _, value = option.partition('=')
+        options[key] = value
+    return BOTS[name], options
+
+
+def entrant_ids(players: [str]) -> [str]:
+    """ Returns the entrant id of every bot spec, its position in [players] and the spec """
+    return [f'{index}:{spec}' for index, spec in enumerate(players)]
+
+
+def entrant_spec(entrant: str) -> str:
+    """ Returns the bot spec of an entrant id. A plain bot spec is returned unchanged """
+    index, _, spec = entrant.partition(':')
+    return spec if index.isdigit() else entrant
+
+
+def play_game(game: int, black: str, white: str, size: int, seed: int, opening_moves: int) -> GameResult:
+    """ Plays one game between two entrants (or bot specs). The first [opening_moves] plies are random """
+    start = time.perf_counter()
+    rng = random.Random(seed)
+    bots = {othello_logic.P_BLACK: parse_bot(entrant_spec(black)),
+            othello_logic.P_WHITE: parse_bot(entrant_spec(white))}
+    state = othello_logic.GameState.new(size)
+    moves = []
+    while not state.is_game_over:
+        if len(moves) < opening_moves:
+            move = random_bot(state, rng)
+        else:
+            bot, options = bots[state.curr_turn]
+            move = bot(state, rng, **options)
+        state = state.apply(move)
+        moves.append(f'{move.row},{move.column}')
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return GameResult(game, black, white, size, seed, state.winner, state.black_count, state.white_count,
+                      ' '.join(moves), elapsed_ms)
+
+
+def schedule(players: [str], games: int, size: int, seed: int, opening_moves: int) -> [tuple]:
+    """ Returns the play_game arguments of [games] games, cycling through every ordered pair of players
+        so each pairing is played with both colours. Players are named by their entrant ids """
+    pairings = itertools.cycle(itertools.permutations(entrant_ids(players), 2))
+    seeds = random.Random(seed)
+    return [(game, *next(pairings), size, seeds.getrandbits(32), opening_moves) for game in range(games)]
+
+
+def run_tournament(players: [str], games: int, size: int = 8, workers: int = None, seed: int = 0,
+                   opening_moves: int = 4, output_path: str = None) -> [GameResult]:
+    """ Plays the scheduled games across a process pool. Each result is appended to [output_path] as a JSON
+        line as soon as its game finishes. Returns the results in game order """
+    for player in players:
+        parse_bot(player)  # Fail before starting any worker
+    results = []
+    output = open(output_path, 'a') if output_path is not None else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(play_game, *arguments)
+                       for arguments in schedule(players, games, size, seed, opening_moves)]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if output is not None:
+                    output.write(json.dumps(result._asdict()) + '\n')
+                    output.flush()
+    finally:
+        if output is not None:
+            output.close()
+    return sorted(results, key=lambda result: result.game)
+
+
+def standings(results: [GameResult]) -> [Standing]:
+    """ Aggregates wins, losses, draws and Elo ratings (updated in game order) per entrant, best rated first """
+    records = {}
+    ratings = {}
+    for result in sorted(results, key=lambda result: result.game):
+        for player in (result.black, result.white):
+            records.setdefault(player, [0, 0, 0])
+            ratings.setdefault(player, ELO_START)
+        if result.winner == othello_logic.TIE:
+            black_score = 0.5
+            records[result.black][2] += 1
+            records[result.white][2] += 1
+        elif result.winner == othello_logic.P_BLACK:
+            black_score = 1.0
+            records[result.black][0] += 1
+            records[result.white][1] += 1
+        else:
+            black_score = 0.0
+            records[result.white][0] += 1
+            records[result.black][1] += 1
+        if result.black == result.white:
+            continue
+        expected = 1 / (1 + 10 ** ((ratings[result.white] - ratings[result.black]) / 400))
+        change = ELO_K * (black_score - expected)
+        ratings[result.black] += change
+        ratings[result.white] -= change
+    table = [Standing(player, *records[player], round(ratings[player], 1)) for player in records]
+    return sorted(table, key=lambda standing: standing.rating, reverse=True)
+
+
+# Exception classes
+
+
+class InvalidBotError(Exception):
+    pass
@@ -1,17 +1,20 @@
 // Functions to handle game processing from backend
-import { game_board, game_info } from './script.js';
+import { game_id } from './script.js';
+
+// Board wire format asked of the server: 'list' (nested arrays), 'string' (n * n cells) or 'packed'
+export const BOARD_FORMAT = 'packed';
 
 export async function handleMove(e) {
     try {
-        const pos = e.target.getAttribute('position').split(','); // [row,col]
+        const pos = e.currentTarget.getAttribute('position').split(','); // [row,col]
         const headers = { 'Content-type': 'application/json' }
-        const res = await fetch('/game/request_move', {
+        // The server holds the game, so only the move is sent and only the changed cells come back
+        const res = await fetch('/game/move', {
             method: 'POST',
             body: JSON.stringify({
-                board: game_board,
-                game_info: game_info,
-                move_row: pos[0],
-                move_column: pos[1]
+                game_id: game_id,
+                row: pos[0],
+                column: pos[1]
             }),
             headers: headers
         });
@@ -22,6 +25,36 @@ export async function handleMove(e) {
     }
 }
 
+export function sendMove(socket, e) {
+    // Push mode: the result comes back as a socket message, along with the opponent's replies
+    const pos = e.currentTarget.getAttribute('position').split(','); // [row,col]
+    socket.send(JSON.stringify({
+        type: 'move',
+        row: pos[0],
+        column: pos[1]
+    }));
+}
+
+export function decodeBoard(data, format) {
+    // Turns a board in any wire format back into nested arrays of 'B', 'W' and '-'
+    if (format === 'string') {
+        const size = Math.round(Math.sqrt(data.length));
+        return Array.from({ length: size }, (_, row) => data.slice(row * size, (row + 1) * size).split(''));
+    }
+    if (format === 'packed') {
+        // Board size byte, then the black and white bitboards, one bit per cell in little-endian byte order
+        const raw = atob(data);
+        const size = raw.charCodeAt(0);
+        const bytes = (size * size + 7) >> 3;
+        const bit = (offset, i) => (raw.charCodeAt(offset + (i >> 3)) >> (i & 7)) & 1;
+        return Array.from({ length: size }, (_, row) => Array.from({ length: size }, (_, col) => {
+            const i = row * size + col;
+            return bit(1, i) ? 'B' : bit(1 + bytes, i) ? 'W' : '-';
+        }));
+    }
+    return data;
+}
+
 export function createGamePiece(color) {
     // Piece container
     let piece = document.createElement('div');
@@ -1,10 +1,12 @@
-import { handleMove, createGamePiece } from './game.js';
+import { handleMove, sendMove, createGamePiece, decodeBoard, BOARD_FORMAT } from './game.js';
 
 const body = document.querySelector('body');
 const gameSettingForm = document.querySelector('#game-setting-form');
 
 export let game_board;
 export let game_info;
+export let game_id;
+export let socket = null;
 
 gameSettingForm.addEventListener('submit', async (e) => {
     e.preventDefault();
@@ -15,6 +17,8 @@ gameSettingForm.addEventListener('submit', async (e) => {
         fadeOutSettings();
         // Fade in game
         fadeGameIn();
+        // Moves are pushed over a socket when the server runs in async mode
+        connectSocket();
     } catch(err) {
         console.error(err);
     }
@@ -25,13 +29,32 @@ async function setGame(size) {
     const res = await fetch('/game/new_game', { 
         method: 'POST', 
         body: JSON.stringify({ 
-            boardSize: size 
+            boardSize: size,
+            board_format: BOARD_FORMAT
         }), 
         headers: headers 
     });
     const data = await res.json();
-    game_board = data.board;
+    game_board = decodeBoard(data.board, BOARD_FORMAT);
     game_info = data.game_info;
+    game_id = data.game_id;
+}
+
+function connectSocket() {
+    // Only the ASGI server accepts sockets; under plain Flask this fails and moves keep going over HTTP
+    if (!('WebSocket' in window)) {
+        return;
+    }
+    const protocol = location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const ws = new WebSocket(`${protocol}//${location.host}/game/ws/${game_id}`);
+    ws.addEventListener('open', () => { socket = ws; });
+    ws.addEventListener('close', () => { socket = null; });
+    ws.addEventListener('message', (e) => {
+        const message = JSON.parse(e.data);
+        if (message.type === 'move') {
+            showMove(message);
+        }
+    });
 }
 
 function fadeOutSettings() {
@@ -99,6 +122,18 @@ function addGameInfoDisplay() {
 
     gameInfoDisplay.appendChild(gameStats);
 
+    // Take back and replay moves
+    const historyControls = document.createElement('div');
+    historyControls.className = 'history-controls';
+    for (let [label, route] of [['Undo', '/game/undo'], ['Redo', '/game/redo']]) {
+        let button = document.createElement('button');
+        button.className = 'game-setting-btn';
+        button.innerText = label;
+        button.addEventListener('click', () => stepHistory(route));
+        historyControls.appendChild(button);
+    }
+    gameInfoDisplay.appendChild(historyControls);
+
     // Move Log
     const moveLogDisplay = document.createElement('div');
     moveLogDisplay.className = 'move-log';
@@ -114,6 +149,10 @@ function addGameBoardDisplay() {
     const boardElement = document.createElement('section');
     boardElement.className = 'game-board';
     boardElement.style.gridTemplateColumns = `repeat(${game_board.length}, 1fr)`;
+    if (game_board.length > 8) {
+        // Thinner cell borders so the pieces of 10x10 to 16x16 boards stay visible
+        boardElement.classList.add('large-board');
+    }
     for (let row = 0; row < game_board.length; row++) {
         for (let col = 0; col < game_board.length; col++) {
             let cell = document.createElement('div');
@@ -141,17 +180,47 @@ function addGameBoardDisplay() {
 }
 
 async function handlePiecePlacement(e) {
-    const log = document.createElement('li');
-    const move = await handleMove(e);
+    if (socket !== null) {
+        sendMove(socket, e);
+        return;
+    }
+    showMove(await handleMove(e));
+}
+
+function showMove(move) {
+    let log = document.createElement('li');
     const newGameInfo = move.game_info;
     // console.log(updatedGame);
-    if (move.status !== 500) {
+    if (move.status === 200 || move.status === 201) {
         refreshInfo(move.game_info);
-        refreshBoard(move.board);
+        applyBoardDelta(move.placed, move.flipped);
         // Log move to move log
         log.innerText = `Player ${newGameInfo[6]} makes move at ${newGameInfo[5][0]}, ${newGameInfo[5][1]}.`;
+        // Log a forced pass
+        if (newGameInfo[7] !== null) {
+            document.querySelector('#move-log-list').appendChild(log);
+            log = document.createElement('li');
+            log.innerText = `Player ${newGameInfo[7]} has no moves and passes.`;
+        }
     } else {
-        log.innerText = 'Invalid move.'
+        log.innerText = move.status === 404 ? 'Game expired, please start a new game.' : 'Invalid move.';
+    }
+    document.querySelector('#move-log-list').appendChild(log);
+}
+
+async function stepHistory(route) {
+    const headers = { 'Content-type': 'application/json' }
+    const res = await fetch(route, { method: 'POST', body: JSON.stringify({ game_id: game_id, board_format: BOARD_FORMAT }),
+                                  headers: headers });
+    const data = await res.json();
+    const log = document.createElement('li');
+    if (data.status === 200) {
+        refreshBoard(decodeBoard(data.board, BOARD_FORMAT));
+        refreshInfo(data.game_info);
+        const [row, column, player] = data.move;
+        log.innerText = `${data.message}: player ${player} at ${row}, ${column}.`;
+    } else {
+        log.innerText = data.status === 404 ? 'Game expired, please start a new game.' : `${data.message}.`;
     }
     document.querySelector('#move-log-list').appendChild(log);
 }
@@ -182,6 +251,22 @@ function refreshBoard(newBoard) {
     }
 }
 
+function applyBoardDelta(placed, flipped) {
+    // Only the placed cell and the flipped cells change
+    const [placedRow, placedColumn, player] = placed;
+    setCell(placedRow, placedColumn, player);
+    for (let [row, column] of flipped) {
+        setCell(row, column, player);
+    }
+}
+
+function setCell(row, column, piece) {
+    game_board[row][column] = piece;
+    const cell = document.querySelector(`.board-cell[position="${row},${column}"]`);
+    cell.innerHTML = '';
+    cell.appendChild(createGamePiece(piece === 'B' ? 'black' : 'white'));
+}
+
 function refreshInfo(newInfo) {
     // Set new game info
     game_info = newInfo;
@@ -1,4 +1,6 @@
 # terminal.py
+import os
+
 import othello_interface
 
 # Press ⌃R to execute it or replace it with your code.
@@ -6,4 +8,4 @@ import othello_interface
 # Press the green button in the gutter to run the script.
 # See PyCharm help at https://www.jetbrains.com/help/pycharm/
 if __name__ == '__main__':
-    othello_interface.game_loop()
+    othello_interface.game_loop(os.environ.get('OTHELLO_RECORDS_FILE'))
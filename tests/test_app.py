@@ -0,0 +1,175 @@
+# tests/test_app.py
+import random
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+
+import app as flask_app
+import othello_logic
+import othello_mcts
+import othello_records
+import othello_sessions
+
+OPENING = ((4, 5), (5, 3), (2, 2), (3, 5))
+
+
+@pytest.fixture
+def client():
+    return flask_app.app.test_client()
+
+
+class SlowSessionStore(othello_sessions.MemorySessionStore):
+    """ Widens the window between reading and writing a session, as a disk store would """
+    def get(self, game_id: str) -> othello_sessions.Session:
+        session = super().get(game_id)
+        time.sleep(0.001)
+        return session
+
+
+def new_game(client, size: int = 8) -> str:
+    return client.post('/game/new_game', json={ 'boardSize': size }).json['game_id']
+
+
+def test_concurrent_undo_and_redo_keep_the_session_consistent(client, monkeypatch):
+    monkeypatch.setattr(flask_app, 'sessions', SlowSessionStore())
+    game_id = new_game(client)
+    for row, column in OPENING:
+        response = client.post('/game/move', json={ 'game_id': game_id, 'row': row, 'column': column })
+        assert response.json['status'] == 200
+
+    accepted = { 'undo': 0, 'redo': 0 }
+
+    def step_back_and_forth():
+        thread_client = flask_app.app.test_client()
+        for _ in range(20):
+            for step in ('undo', 'redo'):
+                if thread_client.post(f'/game/{step}', json={ 'game_id': game_id }).json['status'] == 200:
+                    accepted[step] += 1
+    threads = [threading.Thread(target=step_back_and_forth) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Every accepted undo and redo is in the stored session: none was lost to a concurrent write
+    session = flask_app.sessions.get(game_id)
+    assert len(session.redo) == accepted['undo'] - accepted['redo']
+    assert len(session.history) + len(session.redo) == len(OPENING)
+    state = othello_logic.GameState.new(8)
+    for record in session.history:
+        state = state.apply(record.move)
+    assert state == session.state
+
+
+def test_game_locks_are_shared_while_held():
+    locks = othello_sessions.GameLocks()
+    with locks.get('a') as lock:
+        assert locks.get('a') is lock
+        assert locks.get('b') is not lock
+
+
+@pytest.mark.parametrize('size', [0, 3, 7, 18, 40, 'eight', None])
+def test_new_game_rejects_unsupported_sizes(client, size):
+    response = client.post('/game/new_game', json={ 'boardSize': size })
+    assert response.json == { 'message': 'Invalid board size', 'status': 400 }
+
+
+@pytest.mark.parametrize('size', [4, 6, 8, 10, 12, 14, 16])
+def test_new_game_accepts_supported_sizes(client, size):
+    data = client.post('/game/new_game', json={ 'boardSize': size }).json
+    assert len(data['board']) == size and flask_app.sessions.get(data['game_id']).state.n == size
+
+
+def test_malformed_string_board_is_a_bad_request(client):
+    response = client.post('/game/request_move', json={ 'board': 'X' * 64, 'board_format': 'string',
+                                                        'game_info': othello_logic.default_game_info(),
+                                                        'move_row': 4, 'move_column': 5 })
+    assert response.json['status'] == 400
+
+
+@pytest.mark.parametrize('route', ['/game/request_move', '/game/analyze'])
+@pytest.mark.parametrize('board', [[['-'] * 30] * 30, [['-'] * 8] * 7 + [['-'] * 7 + [0]], [['-'] * 8] * 7])
+def test_malformed_list_board_is_a_bad_request(client, route, board):
+    size = flask_app.analysis_cache.stats().size
+    response = client.post(route, json={ 'board': board, 'game_info': othello_logic.default_game_info(),
+                                         'move_row': 0, 'move_column': 0 })
+    assert response.json['status'] == 400
+    assert flask_app.analysis_cache.stats().size == size
+
+
+@pytest.mark.parametrize('route', ['/game/request_move', '/game/ai_move', '/game/hint', '/game/analyze'])
+@pytest.mark.parametrize('game_info', [None, 3, othello_logic.default_game_info()[:7],
+                                       othello_logic.default_game_info()._replace(curr_turn='X')])
+def test_malformed_game_info_is_a_bad_request(client, route, game_info):
+    body = { 'board': othello_logic.empty_game_board(8), 'move_row': 4, 'move_column': 5 }
+    assert client.post(route, json={ **body, 'game_info': game_info }).json['status'] == 400
+    assert client.post(route, json=body).json['status'] == 400
+
+
+@pytest.mark.parametrize('engine', ['search', 'mcts'])
+def test_ai_move_without_moves_is_a_bad_request(client, engine):
+    # Game info that says the game is over is believed even when the board still has moves
+    finished = othello_logic.default_game_info()._replace(winner=othello_logic.TIE, is_game_over=True)
+    response = client.post('/game/ai_move', json={ 'board': othello_logic.empty_game_board(4), 'game_info': finished,
+                                                   'engine': engine })
+    assert (response.json['message'], response.json['status']) == ('Game over', 400)
+    board = [[othello_logic.P_BLACK] * 4 for _ in range(4)]
+    board[0][0] = othello_logic.EMPTY_CELL
+    stuck = othello_logic.GameState.from_board(board, curr_turn=othello_logic.P_WHITE).to_game_info()
+    response = client.post('/game/ai_move', json={ 'board': board, 'game_info': stuck, 'engine': engine })
+    assert (response.json['message'], response.json['status']) == ('No moves available', 400)
+    assert response.json['board'] == board
+
+
+def test_mcts_moves_reuse_the_tree_of_their_game(client, monkeypatch):
+    monkeypatch.setattr(flask_app, 'mcts_players', othello_mcts.MctsPlayers(capacity=4))
+    state = othello_logic.GameState.new(6)
+    body = { 'board': state.encoded_board(othello_logic.LIST_FORMAT), 'game_info': state.to_game_info(),
+             'engine': 'mcts', 'time_limit_ms': 20 }
+    for game_id in ('a', 'b', 'a'):
+        response = client.post('/game/ai_move', json={ **body, 'game_id': game_id })
+        assert response.json['status'] == 200
+    assert len(flask_app.mcts_players) == 2
+    assert flask_app.mcts_players.get('a').playouts > response.json['search']['playouts']
+
+
+def test_finished_game_is_recorded_once(client, monkeypatch, tmp_path):
+    path = str(tmp_path / 'games.txt')
+    monkeypatch.setitem(flask_app.app.config, 'RECORDS_PATH', path)
+    game_id = new_game(client, 4)
+    rng = random.Random(1)
+    state = othello_logic.GameState.new(4)
+    while not state.is_game_over:
+        move = rng.choice(sorted(state.legal_moves()))
+        state = state.apply(move)
+        client.post('/game/move', json={ 'game_id': game_id, 'row': move.row, 'column': move.column })
+    # Take the last move back and play it again: the game ends a second time
+    assert client.post('/game/undo', json={ 'game_id': game_id }).json['status'] == 200
+    response = client.post('/game/move', json={ 'game_id': game_id, 'row': move.row, 'column': move.column })
+    assert response.json['status'] == 201
+    assert len(list(othello_records.read_records(path))) == 1
+
+
+def test_metrics_export_analysis_cache_counters(client):
+    lines = client.get('/metrics').get_data(as_text=True).splitlines()
+    assert '# TYPE othello_analysis_cache_hits_total counter' in lines
+    assert '# TYPE othello_analysis_cache_misses_total counter' in lines
+    assert '# TYPE othello_analysis_cache_size gauge' in lines
+    assert '# TYPE othello_analysis_cache_hit_ratio gauge' in lines
+
+
+def test_batch_route_reports_error_indices(client):
+    state = othello_logic.GameState.new(8)
+    item = { 'board': state.to_board(), 'game_info': state.to_game_info() }
+    response = client.post('/game/batch', json={ 'items': [
+        { **item, 'moves': [[4, 5], [5, 3]] },
+        { **item, 'moves': [[4, 5], [4, 5]] }
+    ] })
+    ok, repeated = response.json['results']
+    assert (ok['moves_applied'], ok['error']) == (2, None)
+    assert (repeated['moves_applied'], repeated['error']) == (1, 1)
+    assert repeated['board'] == state.apply(othello_logic.Move(4, 5)).to_board()
+    assert response.json['positions'] == 3
@@ -0,0 +1,62 @@
+# tests/test_asgi.py
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('asgiref')
+
+import app as flask_app
+import asgi
+import othello_logic
+
+
+def run_socket(path: str, messages: [dict], query_string: bytes = b'') -> [dict]:
+    """ Connects a WebSocket to [path], sends the client messages, then disconnects. Returns what the server sent """
+    incoming = [{ 'type': 'websocket.connect' }]
+    incoming += [{ 'type': 'websocket.receive', 'text': json.dumps(message) } for message in messages]
+    incoming.append({ 'type': 'websocket.disconnect' })
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = { 'type': 'websocket', 'path': path, 'query_string': query_string }
+    asyncio.run(asgi.game_socket(scope, receive, send))
+    return sent
+
+
+def texts(sent: [dict]) -> [dict]:
+    return [json.loads(message['text']) for message in sent if message['type'] == 'websocket.send']
+
+
+@pytest.fixture
+def game_id() -> str:
+    return flask_app.app.test_client().post('/game/new_game', json={ 'boardSize': 8 }).json['game_id']
+
+
+def test_unknown_game_is_closed():
+    sent = run_socket(asgi.SOCKET_PATH_PREFIX + 'nope', [])
+    assert sent == [{ 'type': 'websocket.close', 'code': asgi.UNKNOWN_GAME_CLOSE_CODE }]
+
+
+def test_moves_are_pushed_and_bad_requests_reported(game_id):
+    sent = run_socket(asgi.SOCKET_PATH_PREFIX + game_id, [{ 'type': 'move', 'row': 4, 'column': 5 },
+                                                          { 'type': 'move', 'row': 0, 'column': 0 },
+                                                          { 'type': 'resign' }])
+    assert sent[0] == { 'type': 'websocket.accept' }
+    state, accepted, rejected, unknown = texts(sent)
+    assert state['type'] == 'state' and state['moves'] == []
+    assert accepted['type'] == 'move' and accepted['placed'] == [4, 5, othello_logic.P_BLACK]
+    assert rejected['status'] == 500
+    assert unknown == { 'type': 'error', 'message': 'Invalid request', 'status': 400 }
+    assert flask_app.get_session(game_id).state.curr_turn == othello_logic.P_WHITE
+
+
+def test_malformed_time_limit_falls_back_to_the_default(game_id):
+    sent = run_socket(asgi.SOCKET_PATH_PREFIX + game_id, [], query_string=b'ms=fast')
+    assert sent[0] == { 'type': 'websocket.accept' }
+    assert texts(sent)[0]['type'] == 'state'
@@ -0,0 +1,93 @@
+# tests/test_othello_ai.py
+import random
+
+import pytest
+
+import othello_ai
+import othello_bitboard
+import othello_hashing
+import othello_logic
+
+SEARCH_SEED = 23
+
+
+class NoTable(othello_hashing.TranspositionTable):
+    """ A transposition table that never finds anything, so the search runs as plain alpha-beta """
+    def probe(self, key: int) -> othello_hashing.TableEntry:
+        self.misses += 1
+        return None
+
+
+def minimax(player: int, opponent: int, n: int, depth: int) -> int:
+    """ Full-width negamax without pruning or a table: the value the search must reproduce """
+    moves = othello_bitboard.legal_moves(player, opponent, n)
+    if not moves:
+        if not othello_bitboard.has_any_move(opponent, player, n):
+            difference = othello_bitboard.popcount(player) - othello_bitboard.popcount(opponent)
+            return difference + (othello_ai.WIN_SCORE if difference > 0 else -othello_ai.WIN_SCORE if difference else 0)
+        return -minimax(opponent, player, n, depth)
+    if depth <= 0:
+        return othello_ai.evaluate(player, opponent, n)
+    best = None
+    for square, flips in moves:
+        new_player, new_opponent = othello_bitboard.apply_move(player, opponent, square, flips)
+        score = -minimax(new_opponent, new_player, n, depth - 1)
+        best = score if best is None else max(best, score)
+    return best
+
+
+def positions(n: int, count: int, plies: int) -> [(int, int, int)]:
+    """ Returns (player, opponent, colour) positions, with moves for the player, reached by seeded random moves """
+    rng = random.Random(SEARCH_SEED + n)
+    found = []
+    while len(found) < count:
+        (player, opponent), color = othello_bitboard.initial_position(n), othello_hashing.BLACK
+        for _ in range(rng.randrange(plies + 1)):
+            moves = othello_bitboard.legal_moves(player, opponent, n)
+            if moves:
+                player, opponent = othello_bitboard.apply_move(player, opponent, *rng.choice(moves))
+            elif not othello_bitboard.has_any_move(opponent, player, n):
+                break
+            player, opponent, color = opponent, player, 1 - color
+        if othello_bitboard.has_any_move(player, opponent, n):
+            found.append((player, opponent, color))
+    return found
+
+
+@pytest.mark.parametrize('n, depth', [(4, 4), (4, 8), (6, 2), (6, 3)])
+def test_search_with_table_matches_minimax(n, depth):
+    for player, opponent, color in positions(n, 6, 2 * n):
+        result = othello_ai.search(player, opponent, n, 10 ** 6, max_depth=depth, color=color)
+        expected = minimax(player, opponent, n, result.depth)
+        assert result.score == expected
+        square, flips = next(move for move in othello_bitboard.legal_moves(player, opponent, n)
+                             if move[0] == result.move)
+        new_player, new_opponent = othello_bitboard.apply_move(player, opponent, square, flips)
+        assert -minimax(new_opponent, new_player, n, result.depth - 1) == expected
+
+
+def test_table_does_not_change_scores():
+    for player, opponent, color in positions(6, 4, 10):
+        table = othello_hashing.TranspositionTable()
+        with_table = othello_ai.search(player, opponent, 6, 10 ** 6, max_depth=4, color=color, table=table)
+        without_table = othello_ai.search(player, opponent, 6, 10 ** 6, max_depth=4, color=color, table=NoTable())
+        assert with_table.score == without_table.score
+        assert table.stats().hits > 0
+        # A table kept from the last search answers the same question again without changing the answer
+        again = othello_ai.search(player, opponent, 6, 10 ** 6, max_depth=4, color=color, table=table)
+        assert again.score == with_table.score and again.nodes < with_table.nodes
+
+
+def test_choose_move_returns_a_legal_move():
+    board = othello_logic.empty_game_board(6)
+    result = othello_ai.choose_move(board, othello_logic.default_game_info(), 50)
+    assert result.move in othello_logic.legal_moves(board, othello_logic.P_BLACK)
+    assert result.source == othello_ai.SOURCE_SEARCH
+
+
+def test_choose_move_without_moves():
+    board = [[othello_logic.P_BLACK] * 4 for _ in range(4)]
+    board[0][0] = othello_logic.EMPTY_CELL
+    game_info = othello_logic.default_game_info()._replace(curr_turn=othello_logic.P_WHITE)
+    with pytest.raises(othello_ai.NoMovesError):
+        othello_ai.choose_move(board, game_info, 50)
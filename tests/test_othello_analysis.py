@@ -0,0 +1,31 @@
+# tests/test_othello_analysis.py
+import othello_analysis
+import othello_bitboard
+import othello_logic
+
+
+def test_symmetric_positions_share_a_cache_entry():
+    cache = othello_analysis.AnalysisCache()
+    opening_moves = [othello_logic.Move(4, 5), othello_logic.Move(2, 3), othello_logic.Move(3, 2),
+                     othello_logic.Move(5, 4)]
+    for index, move in enumerate(opening_moves):
+        state = othello_logic.GameState.new(8).apply(move)
+        moves, cached = othello_analysis.analyze(state, 2, cache)
+        assert cached == (index > 0)
+        assert {analysis.move: analysis.flip_count for analysis in moves} == {
+            legal_move: othello_bitboard.popcount(flips)
+            for legal_move, flips in state.legal_moves().items()}
+        uncached, _ = othello_analysis.analyze(state, 2)
+        assert sorted(moves) == sorted(uncached)
+    assert cache.stats()[:3] == (3, 1, 1)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = othello_analysis.AnalysisCache(capacity=2)
+    cache.put((1, 2), [])
+    cache.put((2, 2), [])
+    assert cache.get((1, 2)) == []
+    cache.put((3, 2), [])
+    assert cache.get((2, 2)) is None
+    assert len(cache) == 2
+    assert cache.stats().hit_ratio == 0.5
@@ -0,0 +1,87 @@
+# tests/test_othello_book.py
+import shutil
+
+import pytest
+
+import othello_ai
+import othello_book
+import othello_hashing
+import othello_logic
+
+LINE_NAME, LINE = 'Test line', 'c4 d4 d3 b4 a4'  # Longer than the enumerated plies
+
+
+def transform_state(state: othello_logic.GameState, permutation: (int,)) -> othello_logic.GameState:
+    """ Returns the game state with its discs moved by a symmetry """
+    board = [[othello_logic.EMPTY_CELL] * state.n for _ in range(state.n)]
+    for row, cells in enumerate(state.to_board()):
+        for column, cell in enumerate(cells):
+            square = permutation[row * state.n + column]
+            board[square // state.n][square % state.n] = cell
+    return othello_logic.GameState.from_board(board, state.to_game_info())
+
+
+@pytest.fixture(scope='module')
+def book_file(tmp_path_factory) -> (str, dict):
+    book = othello_book.build_book(4, 2, search_depth=2, lines=[(LINE_NAME, LINE)])
+    path = str(tmp_path_factory.mktemp('books') / 'opening_book_4.bin')
+    othello_book.write_book(path, 4, book)
+    return path, book
+
+
+def test_write_map_lookup_round_trip(book_file):
+    path, book = book_file
+    table = othello_book.OpeningBook(path)
+    assert (table.n, len(table)) == (4, len(book))
+    state = othello_logic.GameState.new(4)
+    entry = table.lookup_state(state)
+    assert entry is not None and 0 < len(entry.moves) <= othello_book.MAX_BOOK_MOVES
+    # Every symmetric variant finds the record, with its moves turned to match the variant's board
+    child = state.apply(entry.moves[0])
+    child_moves = table.lookup_state(child).moves
+    for permutation in othello_hashing.symmetry_permutations(4):
+        variant = transform_state(child, permutation)
+        variant_moves = table.lookup_state(variant).moves
+        assert variant_moves == [othello_logic.Move(*divmod(permutation[move.row * 4 + move.column], 4))
+                                 for move in child_moves]
+        assert set(variant_moves) <= set(variant.legal_moves())
+    table.close()
+
+
+def test_named_line_is_followed_and_named(book_file):
+    path, _ = book_file
+    table = othello_book.OpeningBook(path)
+    state = othello_logic.GameState.new(4)
+    for move in othello_book.parse_line(LINE, 4):
+        entry = table.lookup_state(state)
+        assert entry.moves[0] == move
+        state = state.apply(move)
+    assert table.lookup_state(state).name == LINE_NAME
+    assert table.lookup_state(othello_logic.GameState.new(6)) is None  # Another board size
+    table.close()
+
+
+def test_choose_move_plays_the_book_move(book_file):
+    table = othello_book.OpeningBook(book_file[0])
+    state = othello_logic.GameState.new(4)
+    result = othello_ai.choose_move(state.to_board(), state.to_game_info(), 50, book=table)
+    assert (result.move, result.source) == (table.lookup_state(state).moves[0], othello_ai.SOURCE_BOOK)
+    table.close()
+
+
+def test_invalid_line():
+    with pytest.raises(othello_book.InvalidBookLineError):
+        othello_book.parse_line('a1', 4)
+
+
+def test_missing_and_invalid_books(tmp_path, book_file):
+    assert othello_book.load_book(4, str(tmp_path)) is None
+    built = tmp_path / 'built'
+    built.mkdir()
+    assert othello_book.load_book(4, str(built)) is None
+    shutil.copy(book_file[0], othello_book.book_path(4, str(built)))
+    assert len(othello_book.load_book(4, str(built))) == len(book_file[1])  # Built after the miss
+    bad_path = tmp_path / 'opening_book_4.bin'
+    bad_path.write_bytes(b'\0' * 64)
+    with pytest.raises(othello_book.InvalidTableError):
+        othello_book.OpeningBook(str(bad_path))
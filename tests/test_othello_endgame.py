@@ -0,0 +1,63 @@
+# tests/test_othello_endgame.py
+import random
+
+import pytest
+
+import othello_bitboard
+import othello_endgame
+import othello_logic
+
+ENDGAME_SEED = 41
+
+
+def exact_score(player: int, opponent: int, n: int) -> int:
+    """ Final disc differential for [player] under perfect play, by full-width negamax """
+    moves = othello_bitboard.legal_moves(player, opponent, n)
+    if not moves:
+        if not othello_bitboard.has_any_move(opponent, player, n):
+            return othello_bitboard.popcount(player) - othello_bitboard.popcount(opponent)
+        return -exact_score(opponent, player, n)
+    best = None
+    for square, flips in moves:
+        new_player, new_opponent = othello_bitboard.apply_move(player, opponent, square, flips)
+        score = -exact_score(new_opponent, new_player, n)
+        best = score if best is None else max(best, score)
+    return best
+
+
+def endgame_positions(n: int, empties: int, count: int) -> [othello_logic.GameState]:
+    """ Returns positions with at most [empties] empty cells from seeded random games, passes included """
+    rng = random.Random(ENDGAME_SEED + n)
+    found = []
+    while len(found) < count:
+        state = othello_logic.GameState.new(n)
+        while not state.is_game_over and n * n - state.black_count - state.white_count > empties:
+            state = state.apply(rng.choice(sorted(state.legal_moves())))
+        if not state.is_game_over:
+            found.append(state)
+    return found
+
+
+@pytest.mark.parametrize('n, empties', [(4, 9), (6, 8)])
+def test_solver_matches_brute_force(n, empties):
+    for state in endgame_positions(n, empties, 8):
+        player, opponent = state.player_bitboards()
+        result = othello_endgame.solve(player, opponent, n)
+        assert result.score == exact_score(player, opponent, n)
+        square, flips = next(move for move in othello_bitboard.legal_moves(player, opponent, n)
+                             if move[0] == result.move)
+        new_player, new_opponent = othello_bitboard.apply_move(player, opponent, square, flips)
+        assert -exact_score(new_opponent, new_player, n) == result.score  # The move reaches the score
+
+
+def test_solve_board_returns_a_move():
+    state = endgame_positions(4, 6, 1)[0]
+    result = othello_endgame.solve_board(state.to_board(), state.curr_turn)
+    assert result.move in state.legal_moves()
+    assert result.nodes > 0
+
+
+def test_node_limit():
+    state = endgame_positions(6, 12, 1)[0]
+    with pytest.raises(othello_endgame.SearchLimitError):
+        othello_endgame.solve(*state.player_bitboards(), 6, node_limit=100)
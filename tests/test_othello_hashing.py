@@ -0,0 +1,79 @@
+# tests/test_othello_hashing.py
+import random
+
+import pytest
+
+import othello_bitboard
+import othello_hashing
+import othello_logic
+
+HASHING_SEED = 97
+GAMES_PER_SIZE = 10
+
+
+def color_of(state: othello_logic.GameState) -> int:
+    return othello_hashing.BLACK if state.curr_turn == othello_logic.P_BLACK else othello_hashing.WHITE
+
+
+def transform(bitboard: int, permutation: (int,)) -> int:
+    """ Moves every set bit of a bitboard to its square under a symmetry """
+    transformed = 0
+    for square in othello_bitboard.iter_squares(bitboard):
+        transformed |= 1 << permutation[square]
+    return transformed
+
+
+@pytest.mark.parametrize('n', [4, 6, 8, 10])
+def test_incremental_hash_matches_full_computation(n):
+    rng = random.Random(HASHING_SEED + n)
+    for _ in range(GAMES_PER_SIZE):
+        state = othello_logic.GameState.new(n)
+        key = othello_hashing.position_hash(state.black, state.white, n, color_of(state))
+        while not state.is_game_over:
+            move = rng.choice(sorted(state.legal_moves()))
+            color = color_of(state)
+            key = othello_hashing.update_hash(key, move.row * n + move.column, state.flips(move), color, n)
+            state = state.apply(move)
+            if color_of(state) == color:
+                key = othello_hashing.pass_hash(key, n)  # The opponent had to pass
+            assert key == othello_hashing.position_hash(state.black, state.white, n, color_of(state))
+
+
+@pytest.mark.parametrize('n', [4, 6, 8])
+def test_canonical_hash_is_shared_by_all_symmetries(n):
+    rng = random.Random(HASHING_SEED)
+    state = othello_logic.GameState.new(n)
+    for _ in range(n):
+        state = state.apply(rng.choice(sorted(state.legal_moves())))
+    color = color_of(state)
+    key, symmetry = othello_hashing.canonical_hash(state.black, state.white, n, color)
+    # The canonical key is the plain hash of the position under its symmetry
+    permutation = othello_hashing.symmetry_permutations(n)[symmetry]
+    assert key == othello_hashing.position_hash(transform(state.black, permutation),
+                                                transform(state.white, permutation), n, color)
+    for permutation, inverse in zip(othello_hashing.symmetry_permutations(n),
+                                    othello_hashing.inverse_symmetry_permutations(n)):
+        black, white = transform(state.black, permutation), transform(state.white, permutation)
+        assert othello_hashing.canonical_hash(black, white, n, color)[0] == key
+        assert transform(black, inverse) == state.black
+    assert othello_hashing.canonical_hash(state.black, state.white, n, 1 - color)[0] != key
+
+
+def test_table_keeps_the_deeper_entry_of_a_bucket():
+    table = othello_hashing.TranspositionTable(bits=4)
+    first, second = 5, 5 + table.capacity  # Same bucket
+    table.store(first, 6, 10, othello_hashing.EXACT, 1)
+    table.store(second, 2, 20, othello_hashing.EXACT, 2)
+    assert table.probe(first).depth == 6 and table.probe(second).depth == 2
+    # A shallower result for the deep entry's own key does not replace it either
+    table.store(first, 3, 30, othello_hashing.LOWER_BOUND, 3)
+    assert table.probe(first) == othello_hashing.TableEntry(first, 6, 10, othello_hashing.EXACT, 1)
+    table.store(second, 8, 40, othello_hashing.EXACT, 4)
+    assert table.probe(second).depth == 8
+    assert table.probe(first).depth == 3  # The old deep entry lost its slot, the recent one is left
+    assert table.probe(5 + 2 * table.capacity) is None
+    stats = table.stats()
+    assert (stats.hits, stats.misses, stats.collisions, stats.stores) == (5, 1, 1, 4)
+    assert (stats.size, stats.capacity) == (2, 2 * table.capacity)
+    table.clear()
+    assert table.probe(first) is None and table.stats().stores == 0
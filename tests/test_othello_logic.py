@@ -0,0 +1,214 @@
+# tests/test_othello_logic.py
+import base64
+import copy
+import json
+import pickle
+import random
+
+import pytest
+
+import othello_bitboard
+import othello_logic
+import othello_sessions
+
+UNDO_SEED = 4
+RULES_SEED = 40
+GAMES_PER_SIZE = 10
+
+
+@pytest.mark.parametrize('n', [4, 6, 8, 12])
+def test_unmake_move_restores_every_position(n):
+    rng = random.Random(UNDO_SEED + n)
+    for _ in range(GAMES_PER_SIZE):
+        state = othello_logic.GameState.new(n)
+        board, game_info = othello_logic.empty_game_board(n), othello_logic.default_game_info()
+        positions, states, records, board_records = [], [state], [], []
+        while not state.is_game_over:
+            move = rng.choice(sorted(state.legal_moves()))
+            flips = state.flips(move)
+            positions.append((copy.deepcopy(board), game_info))
+            game_info, board_record = othello_logic.make_move_in_place(board, game_info, move.row, move.column, flips)
+            state, record = state.apply_recorded(move, flips)
+            assert (board, game_info) == (state.to_board(), state.to_game_info())
+            states.append(state)
+            records.append(record)
+            board_records.append(board_record)
+
+        while records:
+            state = state.undo(records.pop())
+            states.pop()
+            assert state == states[-1] and state.key == states[-1].key
+            assert state.to_game_info() == states[-1].to_game_info()
+            game_info = othello_logic.unmake_move(board, board_records.pop())
+            assert (board, game_info) == positions.pop()
+
+
+DIRECTIONS = [(row, column) for row in (-1, 0, 1) for column in (-1, 0, 1) if (row, column) != (0, 0)]
+
+
+def reference_flips(board: [[str]], player: str, row: int, column: int) -> {(int, int)}:
+    """ The cells a move on a list board flips, walking the eight directions cell by cell """
+    n, flipped = len(board), set()
+    if board[row][column] != othello_logic.EMPTY_CELL:
+        return flipped
+    for row_step, column_step in DIRECTIONS:
+        line = []
+        r, c = row + row_step, column + column_step
+        while 0 <= r < n and 0 <= c < n and board[r][c] not in (othello_logic.EMPTY_CELL, player):
+            line.append((r, c))
+            r, c = r + row_step, c + column_step
+        if line and 0 <= r < n and 0 <= c < n and board[r][c] == player:
+            flipped.update(line)
+    return flipped
+
+
+@pytest.mark.parametrize('n', [4, 6, 8, 10])
+def test_game_state_follows_the_rules(n):
+    rng = random.Random(RULES_SEED + n)
+    for _ in range(GAMES_PER_SIZE):
+        state = othello_logic.GameState.new(n)
+        assert state.key == othello_logic.GameState.from_board(state.to_board()).key  # Later keys are incremental
+        while not state.is_game_over:
+            board, player = state.to_board(), state.curr_turn
+            expected = {}
+            for row in range(n):
+                for column in range(n):
+                    cells = reference_flips(board, player, row, column)
+                    if cells:
+                        expected[othello_logic.Move(row, column)] = cells
+            legal = state.legal_moves()
+            assert {move: {divmod(square, n) for square in othello_bitboard.iter_squares(flips)}
+                    for move, flips in legal.items()} == expected
+            move = rng.choice(sorted(legal))
+            next_state = state.apply(move)
+            for row, column in expected[move] | {tuple(move)}:
+                board[row][column] = player
+            assert next_state.to_board() == board
+            assert next_state.key == othello_logic.GameState.from_board(board, next_state.to_game_info()).key
+            assert next_state.black_count == othello_logic.count_player_pieces(board, othello_logic.P_BLACK)
+            assert next_state.white_count == othello_logic.count_player_pieces(board, othello_logic.P_WHITE)
+            opponent = othello_logic.P_WHITE if player == othello_logic.P_BLACK else othello_logic.P_BLACK
+            opponent_can_move = any(reference_flips(board, opponent, r, c) for r in range(n) for c in range(n))
+            player_can_move = any(reference_flips(board, player, r, c) for r in range(n) for c in range(n))
+            if opponent_can_move:
+                assert (next_state.curr_turn, next_state.passed_turn) == (opponent, None)
+            elif player_can_move:
+                assert (next_state.curr_turn, next_state.passed_turn) == (player, opponent)
+            else:
+                assert next_state.is_game_over and next_state.winner is not None
+            state = next_state
+        with pytest.raises(othello_logic.InvalidMoveError):
+            state.apply(othello_logic.Move(0, 0))
+
+
+def test_game_state_is_an_immutable_value():
+    state = othello_logic.GameState.new(8).apply(othello_logic.Move(4, 5))
+    with pytest.raises(AttributeError):
+        state.curr_turn = othello_logic.P_BLACK
+    with pytest.raises(othello_logic.InvalidMoveError):
+        state.apply(othello_logic.Move(0, 0))  # Outflanks nothing
+    with pytest.raises(othello_logic.InvalidMoveError):
+        state.apply(othello_logic.Move(8, 0))  # Off the board
+    rebuilt = othello_logic.GameState.from_board(state.to_board(), state.to_game_info())
+    assert rebuilt == state and hash(rebuilt) == hash(state) and rebuilt.to_game_info() == state.to_game_info()
+    assert pickle.loads(pickle.dumps(state)) == state
+    assert len({state, rebuilt, othello_logic.GameState.new(8)}) == 2
+
+
+def test_session_undo_and_redo():
+    session = othello_sessions.new_session(8)
+    assert othello_sessions.undo(session) is None
+    for move in (othello_logic.Move(4, 5), othello_logic.Move(5, 3), othello_logic.Move(2, 2)):
+        session = othello_sessions.play(session, move)
+    played = session
+
+    session = othello_sessions.undo(othello_sessions.undo(session))
+    assert othello_sessions.session_moves(session) == (othello_logic.Move(4, 5),)
+    assert othello_sessions.redo(othello_sessions.redo(session)).state == played.state
+    assert othello_sessions.redo(played) is None
+
+    session = othello_sessions.play(session, othello_logic.Move(3, 5))
+    assert othello_sessions.redo(session) is None  # A new move discards the undone ones
+
+
+def test_session_dict_round_trip():
+    session = othello_sessions.new_session(6)
+    for move in (othello_logic.Move(1, 2), othello_logic.Move(1, 1)):
+        session = othello_sessions.play(session, move)
+    session = othello_sessions.undo(session)
+    rebuilt = othello_sessions.session_from_dict(othello_sessions.session_to_dict(session))
+    assert rebuilt == session
+
+
+@pytest.mark.parametrize('n', (4, 8, 10, 16))
+@pytest.mark.parametrize('board_format', othello_logic.BOARD_FORMATS)
+def test_board_format_round_trip(n, board_format):
+    rng = random.Random(n)
+    state = othello_logic.GameState.new(n)
+    for _ in range(n):
+        state = state.apply(rng.choice(sorted(state.legal_moves())))
+    board = state.to_board()
+    encoded = othello_logic.encode_board(board, board_format)
+    assert encoded == state.encoded_board(board_format)
+    assert othello_logic.decode_board(json.loads(json.dumps(encoded)), board_format) == board
+
+
+def test_packed_board_size():
+    encoded = othello_logic.encode_board(othello_logic.empty_game_board(8), othello_logic.PACKED_FORMAT)
+    assert len(base64.b64decode(encoded)) == 1 + 8 + 8
+
+
+@pytest.mark.parametrize('board_format, data', [
+    ('hex', [['-']]),
+    (othello_logic.LIST_FORMAT, '-' * 64),
+    (othello_logic.LIST_FORMAT, [['-'] * 30] * 30),  # Larger than any supported board
+    (othello_logic.LIST_FORMAT, [['-'] * 3] * 3),
+    (othello_logic.LIST_FORMAT, [['-'] * 8] * 7 + [['-'] * 7]),  # Not rectangular
+    (othello_logic.LIST_FORMAT, [['-'] * 8] * 7 + ['-' * 8]),  # A row that is not a list
+    (othello_logic.LIST_FORMAT, [['-'] * 8] * 7 + [['-'] * 7 + ['X']]),
+    (othello_logic.LIST_FORMAT, [['-'] * 8] * 7 + [['-'] * 7 + [None]]),
+    (othello_logic.LIST_FORMAT, [['-'] * 8] * 7 + [['-'] * 7 + ['BW']]),
+    (othello_logic.STRING_FORMAT, 'BW-'),
+    (othello_logic.STRING_FORMAT, 'X' * 64),
+    (othello_logic.STRING_FORMAT, '-' * 9),  # Square, but 3x3
+    (othello_logic.STRING_FORMAT, [['-'] * 8] * 8),
+    (othello_logic.PACKED_FORMAT, base64.b64encode(bytes((3, 0, 0, 0, 0))).decode()),
+    (othello_logic.PACKED_FORMAT, base64.b64encode(bytes((0,))).decode()),
+    (othello_logic.PACKED_FORMAT, 'not base64!'),
+    (othello_logic.PACKED_FORMAT, base64.b64encode(bytes((4, 1, 0, 1, 0))).decode()),  # Cell 0 owned twice
+    (othello_logic.PACKED_FORMAT, base64.b64encode(bytes((8, 0))).decode()),  # Truncated
+])
+def test_decode_invalid_board(board_format, data):
+    with pytest.raises(othello_logic.InvalidBoardFormatError):
+        othello_logic.decode_board(data, board_format)
+
+
+def test_play_batch_reports_the_first_invalid_move():
+    start = othello_logic.GameState.new(8)
+    board, game_info = start.to_board(), start.to_game_info()
+    opening = [othello_logic.Move(4, 5), othello_logic.Move(5, 3)]
+    batch = othello_logic.play_batch([
+        (board, game_info, opening[0]),  # A single move
+        (board, game_info, opening + [othello_logic.Move(0, 0), othello_logic.Move(2, 2)]),
+        (board, game_info, [othello_logic.Move(0, 0)]),
+        (board, game_info, [])
+    ])
+    single, stopped, invalid, empty = batch.results
+    assert (single.moves_applied, single.error) == (1, None)
+    assert single.board == start.apply(opening[0]).to_board()
+    assert (stopped.moves_applied, stopped.error) == (2, 2)  # Stops at the third move, the first two are kept
+    after_opening = start.apply(opening[0]).apply(opening[1])
+    assert (stopped.board, stopped.game_info) == (after_opening.to_board(), after_opening.to_game_info())
+    assert (invalid.moves_applied, invalid.error, invalid.board) == (0, 0, board)
+    assert (empty.moves_applied, empty.error) == (0, None)
+    assert batch.positions == 3
+
+
+def test_make_move_in_place_checks_piece_counts(monkeypatch):
+    monkeypatch.setattr(othello_logic, 'CHECK_PIECE_COUNTS', True)
+    board, game_info = othello_logic.empty_game_board(8), othello_logic.default_game_info()
+    flips = othello_logic.is_valid_move(board, 4, 5, othello_logic.P_BLACK)[1]
+    with pytest.raises(othello_logic.PieceCountError):
+        othello_logic.make_move_in_place(copy.deepcopy(board), game_info._replace(black_count=3), 4, 5, flips)
+    game_info, _ = othello_logic.make_move_in_place(board, game_info, 4, 5, flips)
+    assert (game_info.black_count, game_info.white_count) == (4, 1)
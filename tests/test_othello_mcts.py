@@ -0,0 +1,102 @@
+# tests/test_othello_mcts.py
+import random
+
+import pytest
+
+import othello_bitboard
+import othello_logic
+import othello_mcts
+
+MCTS_SEED = 11
+
+
+@pytest.fixture(scope='module', autouse=True)
+def pools():
+    yield
+    othello_mcts.shutdown()
+
+
+def replay_playout(n: int, rng: random.Random) -> float:
+    """ Plays the random game of playout() from the start with GameState, picking the same moves """
+    state = othello_logic.GameState.new(n)
+    while not state.is_game_over:
+        moves = sorted(state.legal_moves())  # Square order, as playout() counts the bits of the move mask
+        state = state.apply(moves[rng.randrange(len(moves))])
+    difference = state.black_count - state.white_count
+    return 1.0 if difference > 0 else 0.0 if difference < 0 else 0.5
+
+
+@pytest.mark.parametrize('n', [4, 6, 8])
+def test_playout_result_matches_the_final_position(n):
+    player, opponent = othello_bitboard.initial_position(n)
+    for seed in range(20):
+        result = othello_mcts.playout(player, opponent, n, random.Random(MCTS_SEED + seed))
+        assert result == replay_playout(n, random.Random(MCTS_SEED + seed))
+
+
+def test_iteration_budget_and_legal_move():
+    player = othello_mcts.MctsPlayer(seed=MCTS_SEED)
+    state = othello_logic.GameState.new(6)
+    result = player.choose_move(state, time_limit_ms=None, iterations=150)
+    assert result.playouts == 150 and player.playouts == 150
+    assert result.move in state.legal_moves()
+    assert sum(child.visits for child in player.root.children) == 150
+    assert player.playouts_per_second > 0
+
+
+def test_tree_is_reused_between_moves():
+    player = othello_mcts.MctsPlayer(seed=MCTS_SEED)
+    state = othello_logic.GameState.new(6)
+    move = player.choose_move(state, time_limit_ms=None, iterations=300).move
+    state = state.apply(move)
+    reply = sorted(state.legal_moves())[0]
+    state = state.apply(reply)
+    old_root = player.root
+    reused = next(grandchild for child in old_root.children if child.move == move[0] * 6 + move[1]
+                  for grandchild in child.children if grandchild.move == reply[0] * 6 + reply[1])
+    visits = reused.visits
+    player.choose_move(state, time_limit_ms=None, iterations=10)
+    assert player.root is reused and player.root.parent is None
+    assert player.root.visits == visits + 10
+
+
+def test_finishes_games_with_passes_and_beats_random_play():
+    wins = 0
+    for game in range(4):
+        player, rng = othello_mcts.MctsPlayer(seed=game), random.Random(game)
+        state = othello_logic.GameState.new(4)
+        while not state.is_game_over:
+            if state.curr_turn == othello_logic.P_BLACK:
+                move = player.choose_move(state, time_limit_ms=None, iterations=100).move
+            else:
+                move = rng.choice(sorted(state.legal_moves()))
+            state = state.apply(move)
+        wins += state.winner == othello_logic.P_BLACK
+    assert wins >= 3
+
+
+def test_root_parallel_search_adds_up_worker_playouts():
+    player = othello_mcts.MctsPlayer(workers=2, seed=MCTS_SEED)
+    result = player.choose_move(othello_logic.GameState.new(6), time_limit_ms=None, iterations=50)
+    assert result.playouts == 100
+    assert result.visits > max(child.visits for child in player.root.children)  # Visits from both trees
+
+
+def test_players_keep_one_tree_per_game():
+    players = othello_mcts.MctsPlayers(capacity=2, seed=MCTS_SEED)
+    state = othello_logic.GameState.new(4)
+    players.choose_move('a', state, time_limit_ms=None, iterations=20)
+    players.choose_move('b', state, time_limit_ms=None, iterations=20)
+    first = players.get('a')
+    assert first is not players.get('b')
+    players.choose_move('a', state, time_limit_ms=None, iterations=20)
+    assert players.get('a') is first and first.root.visits == 40  # The game's tree was reused
+    players.choose_move('c', state, time_limit_ms=None, iterations=20)
+    assert len(players) == 2 and players.get('b') is None  # Least recently used game evicted
+    players.choose_move(None, state, time_limit_ms=None, iterations=20)
+    assert len(players) == 2
+
+
+def test_no_moves():
+    with pytest.raises(othello_mcts.NoMovesError):
+        othello_mcts.MctsPlayer().choose_move(othello_logic.GameState.from_board([['B'] * 4 for _ in range(4)]))
@@ -0,0 +1,53 @@
+# tests/test_othello_metrics.py
+import othello_metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = othello_metrics.Histogram((0.001, 0.01))
+    for seconds in (0.0005, 0.001, 0.005, 0.5):
+        histogram.observe(seconds)
+    assert histogram.cumulative_counts() == [2, 3, 4]
+    assert histogram.count == 4
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = othello_metrics.Metrics(enabled=False)
+    metrics.start_request('update_game')
+    with metrics.stage('validate'):
+        pass
+    metrics.end_request()
+    assert 'route=' not in metrics.render()
+
+
+def test_render_prometheus_text():
+    metrics = othello_metrics.Metrics(enabled=True, buckets=(0.5, 1.0))
+    metrics.start_request('update_game')
+    with metrics.stage('validate'):
+        pass
+    metrics.end_request()
+    with metrics.stage('outside'):  # Not part of a request
+        pass
+    lines = metrics.render().splitlines()
+    assert '# TYPE othello_request_duration_seconds histogram' in lines
+    assert 'othello_request_duration_seconds_bucket{route="update_game",le="+Inf"} 1' in lines
+    assert 'othello_request_duration_seconds_count{route="update_game"} 1' in lines
+    assert 'othello_stage_duration_seconds_count{route="update_game",stage="validate"} 1' in lines
+    assert not any('outside' in line for line in lines)
+
+
+def test_sampled_requests_are_profiled():
+    metrics = othello_metrics.Metrics(enabled=True, profile_rate=1.0)
+    assert metrics.profile_report() == 'No requests profiled\n'
+    for _ in range(3):
+        metrics.start_request('update_game')
+        sorted(range(1000), key=lambda value: -value)
+        metrics.end_request()
+    assert metrics.profiled_requests == 3
+    assert 'function calls' in metrics.profile_report()
+
+
+def test_render_counters_and_gauges():
+    counters = othello_metrics.render_counters([('othello_things_total', 'Things seen', 3)]).splitlines()
+    assert counters == ['# HELP othello_things_total Things seen', '# TYPE othello_things_total counter',
+                        'othello_things_total 3']
+    assert '# TYPE othello_ratio gauge' in othello_metrics.render_gauges([('othello_ratio', 'A ratio', 0.5)])
@@ -0,0 +1,109 @@
+# tests/test_othello_numpy.py
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import othello_bitboard
+import othello_logic
+import othello_numpy
+
+CROSS_CHECK_SEED = 1729
+GAMES_PER_SIZE = 30
+
+
+def random_positions(n: int, games: int, seed: int) -> [othello_logic.GameState]:
+    """ Returns every position of [games] seeded random games, including the final ones """
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(games):
+        state = othello_logic.GameState.new(n)
+        positions.append(state)
+        while not state.is_game_over:
+            state = state.apply(rng.choice(sorted(state.legal_moves())))
+            positions.append(state)
+    return positions
+
+
+@pytest.fixture(params=(4, 6, 8, 10), ids=lambda n: f'{n}x{n}')
+def positions(request) -> [othello_logic.GameState]:
+    return random_positions(request.param, GAMES_PER_SIZE, CROSS_CHECK_SEED + request.param)
+
+
+def test_board_conversion_round_trips(positions):
+    boards = [state.to_board() for state in positions]
+    assert othello_numpy.array_to_boards(othello_numpy.boards_to_array(boards)) == boards
+
+
+def test_disc_counts_match_scalar(positions):
+    black, white = othello_numpy.disc_counts(othello_numpy.boards_to_array([state.to_board() for state in positions]))
+    for state, black_count, white_count in zip(positions, black, white):
+        board = state.to_board()
+        assert black_count == othello_logic.count_player_pieces(board, othello_logic.P_BLACK)
+        assert white_count == othello_logic.count_player_pieces(board, othello_logic.P_WHITE)
+
+
+def test_legal_move_masks_match_scalar(positions):
+    n = positions[0].n
+    boards = othello_numpy.boards_to_array([state.to_board() for state in positions])
+    players = othello_numpy.players_to_array([state.curr_turn for state in positions])
+    masks = othello_numpy.legal_move_masks(boards, players)
+    for state, mask in zip(positions, masks):
+        expected = set(othello_logic.legal_moves(state.to_board(), state.curr_turn))
+        assert {othello_logic.Move(*divmod(int(square), n)) for square in np.flatnonzero(mask)} == expected
+
+
+def test_apply_moves_match_scalar(positions):
+    rng = random.Random(CROSS_CHECK_SEED)
+    n = positions[0].n
+    boards = [state.to_board() for state in positions]
+    turns = [state.curr_turn for state in positions]
+    # Random cells, legal or not, so illegal and occupied moves are checked too
+    moves = [othello_logic.Move(rng.randrange(n), rng.randrange(n)) for _ in positions]
+    rows, columns = np.array([move.row for move in moves]), np.array([move.column for move in moves])
+
+    array = othello_numpy.boards_to_array(boards)
+    new_array, legal = othello_numpy.apply_moves(array, othello_numpy.players_to_array(turns), rows, columns)
+    new_boards = othello_numpy.array_to_boards(new_array)
+    for board, turn, move, is_legal, new_board in zip(boards, turns, moves, legal, new_boards):
+        try:
+            valid, flips = othello_logic.is_valid_move(board, move.row, move.column, turn)
+        except othello_logic.InvalidMoveError:  # Occupied cell
+            valid, flips = False, 0
+        assert is_legal == valid
+        expected = othello_logic.make_move(board, move.row, move.column, turn, flips) if valid else board
+        assert new_board == expected
+
+
+def test_packed_functions_match_bitboards(positions):
+    rng = random.Random(CROSS_CHECK_SEED)
+    n = positions[0].n
+    if n > othello_numpy.MAX_PACKED_SIZE:
+        with pytest.raises(othello_numpy.PackedSizeError):
+            othello_numpy.pack(othello_numpy.boards_to_array([positions[0].to_board()]))
+        return
+    array = othello_numpy.boards_to_array([state.to_board() for state in positions])
+    black, white = othello_numpy.pack(array)
+    assert (othello_numpy.unpack(black, white, n) == array).all()
+    assert [int(bits) for bits in black] == [state.black for state in positions]
+    assert [int(bits) for bits in white] == [state.white for state in positions]
+
+    to_move_black = np.array([state.curr_turn == othello_logic.P_BLACK for state in positions])
+    player, opponent = np.where(to_move_black, black, white), np.where(to_move_black, white, black)
+    masks = othello_numpy.packed_legal_moves(player, opponent, n)
+    squares = np.array([rng.randrange(n * n) for _ in positions], dtype=np.uint64)
+    flips = othello_numpy.packed_flips(player, opponent, squares, n)
+    new_player, new_opponent = othello_numpy.packed_apply(player, opponent, squares, flips)
+    counts = othello_numpy.packed_popcount(player)
+    for index, state in enumerate(positions):
+        scalar_player, scalar_opponent = state.player_bitboards()
+        square = int(squares[index])
+        scalar_flips = 0
+        if not (scalar_player | scalar_opponent) >> square & 1:
+            scalar_flips = othello_bitboard.flip_mask(scalar_player, scalar_opponent, square, n)
+        assert int(masks[index]) == othello_bitboard.legal_moves_mask(scalar_player, scalar_opponent, n)
+        assert int(flips[index]) == scalar_flips
+        assert (int(new_player[index]), int(new_opponent[index])) == othello_bitboard.apply_move(
+            scalar_player, scalar_opponent, square, scalar_flips)
+        assert int(counts[index]) == othello_bitboard.popcount(scalar_player)
@@ -0,0 +1,77 @@
+# tests/test_othello_parallel.py
+import multiprocessing
+import time
+
+import pytest
+
+import othello_ai
+import othello_parallel
+
+PARALLEL_SEED = 3
+WORKERS = 2
+
+
+@pytest.fixture(scope='module', autouse=True)
+def pools():
+    yield
+    othello_parallel.shutdown()
+
+
+@pytest.fixture(scope='module')
+def positions() -> [(int, int, int)]:
+    return othello_parallel.sample_positions(6, 4, 8, seed=PARALLEL_SEED)
+
+
+def test_deterministic_mode_finds_the_minimax_move(positions):
+    for player, opponent, color in positions:
+        results = [othello_parallel.parallel_search(player, opponent, 6, 1, max_depth=3, color=color,
+                                                    workers=WORKERS, deterministic=True) for _ in range(2)]
+        assert results[0] == results[1]._replace(elapsed_ms=results[0].elapsed_ms)
+        scores = {square: score for square, _, score in othello_ai.score_moves(player, opponent, 6, 3, color=color)}
+        assert (results[0].score, results[0].depth) == (max(scores.values()), 3)
+        assert scores[results[0].move] == results[0].score
+
+
+def test_shared_alpha_search_matches_the_serial_score(positions):
+    for player, opponent, color in positions:
+        serial = othello_ai.search(player, opponent, 6, 10 ** 9, max_depth=4, color=color)
+        parallel = othello_parallel.parallel_search(player, opponent, 6, 10 ** 9, max_depth=4, color=color,
+                                                    workers=WORKERS)
+        assert (parallel.score, parallel.depth) == (serial.score, serial.depth)
+
+
+def test_time_limited_search_returns_a_legal_move(positions):
+    player, opponent, color = positions[0]
+    result = othello_parallel.parallel_search(player, opponent, 6, 50, color=color, workers=WORKERS)
+    assert result.move in dict(othello_ai.ordered_moves(player, opponent, 6))
+
+
+def test_search_waiting_for_a_busy_pool_keeps_its_time_limit(positions):
+    player, opponent, color = positions[0]
+    lock = othello_parallel._get_pool(WORKERS)[3]
+    with lock:  # Another search holds the pool
+        start = time.perf_counter()
+        result = othello_parallel.parallel_search(player, opponent, 6, 100, color=color, workers=WORKERS)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    assert result.move in dict(othello_ai.ordered_moves(player, opponent, 6)) and result.depth >= 1
+    assert 50 <= result.elapsed_ms <= elapsed_ms < 250  # Half the limit waiting, then a serial search for the rest
+
+
+def test_speedup_report(positions):
+    report = othello_parallel.measure_speedup(positions[:2], 6, 2, WORKERS)
+    assert (report.depth, report.positions, report.workers) == (2, 2, WORKERS)
+    assert report.serial_nodes > 0 and report.parallel_nodes > 0 and report.speedup > 0
+
+
+def test_stale_tasks_leave_the_shared_alpha_alone(positions, monkeypatch):
+    player, opponent, color = positions[0]
+    shared_alpha, shared_search = multiprocessing.Value('q', othello_parallel._NO_SCORE), multiprocessing.Value('q', 2)
+    monkeypatch.setattr(othello_parallel, '_shared_alpha', shared_alpha)
+    monkeypatch.setattr(othello_parallel, '_shared_search', shared_search)
+    square, flips = othello_ai.ordered_moves(player, opponent, 6)[0]
+    task = (('test',), 1, player, opponent, 6, 2, color, float('inf'), None, False, square, flips,
+            othello_parallel._NO_SCORE)
+    assert othello_parallel._search_task(*task)[1] is not None
+    assert shared_alpha.value == othello_parallel._NO_SCORE  # Search 1 is over, search 2 is running
+    _, score, _, _ = othello_parallel._search_task(*task[:1], 2, *task[2:])
+    assert shared_alpha.value == score
@@ -0,0 +1,108 @@
+# tests/test_othello_patterns.py
+import array
+import random
+
+import pytest
+
+import othello_ai
+import othello_hashing
+import othello_logic
+import othello_patterns
+import othello_records
+
+PATTERNS_SEED = 7
+
+
+def random_weights(evaluator: othello_patterns.PatternEvaluator, rng: random.Random) -> None:
+    evaluator.weights = array.array('f', [rng.uniform(-1, 1) for _ in evaluator.weights])
+
+
+@pytest.mark.parametrize('n', [4, 6, 8, 10, 16])
+def test_incremental_indices_match_full_computation(n):
+    rng = random.Random(PATTERNS_SEED + n)
+    evaluator = othello_patterns.PatternEvaluator(n, phases=2)
+    random_weights(evaluator, rng)
+    patterns = evaluator.patterns
+    state = othello_logic.GameState.new(n)
+    indices = patterns.indices(state.black, state.white)
+    history = []
+    while not state.is_game_over:
+        color = othello_hashing.BLACK if state.curr_turn == othello_logic.P_BLACK else othello_hashing.WHITE
+        player, opponent = state.player_bitboards()
+        # Scoring the shared black/white indices from the mover's side equals scoring the mover's own view
+        assert evaluator.score(indices, color, state.black_count + state.white_count) == evaluator(player, opponent, n)
+        move = rng.choice(sorted(state.legal_moves()))
+        square, flips = move.row * n + move.column, state.flips(move)
+        patterns.update(indices, square, flips, color)
+        history.append((square, flips, color))
+        state = state.apply(move)
+        assert indices == patterns.indices(state.black, state.white)
+    while history:
+        patterns.undo(indices, *history.pop())
+    assert indices == patterns.indices(*othello_logic.GameState.new(n).player_bitboards())
+
+
+@pytest.mark.parametrize('color', [othello_hashing.BLACK, othello_hashing.WHITE])
+def test_search_with_incremental_indices_matches_full_evaluation(color):
+    n = 6
+    rng = random.Random(PATTERNS_SEED)
+    evaluator = othello_patterns.PatternEvaluator(n, phases=2)
+    random_weights(evaluator, rng)
+    state = othello_logic.GameState.new(n)
+    for _ in range(6):
+        state = state.apply(rng.choice(sorted(state.legal_moves())))
+    player, opponent = state.player_bitboards()
+    # A plain function hides score() from the search, which then evaluates every leaf from scratch
+    incremental = othello_ai.score_moves(player, opponent, n, 4, evaluator, color)
+    full = othello_ai.score_moves(player, opponent, n, 4, lambda *position: evaluator(*position), color)
+    assert incremental == full
+    result = othello_ai.search(player, opponent, n, 10 ** 6, evaluator, max_depth=4, color=color)
+    assert result.score == full[0][2]
+    assert result.move in [square for square, _, score in full if score == result.score]
+
+
+def test_timeout_leaves_the_indices_at_the_root():
+    n = 6
+    evaluator = othello_patterns.PatternEvaluator(n, phases=2)
+    state = othello_logic.GameState.new(n)
+    player, opponent = state.player_bitboards()
+    searcher = othello_ai._Searcher(n, evaluator, 0.0, othello_hashing.TranspositionTable())  # Already past
+    with pytest.raises(othello_ai._SearchTimeout):
+        searcher.search_root(player, opponent, othello_ai.ordered_moves(player, opponent, n), 10,
+                             othello_hashing.BLACK)
+    assert searcher.indices == evaluator.patterns.indices(state.black, state.white)
+
+
+def test_every_cell_pattern_is_short_enough():
+    for n in (4, 6, 8, 10, 12, 16):
+        patterns = othello_patterns.pattern_set(n)
+        assert all(len(squares) <= othello_patterns.MAX_PATTERN_CELLS for _, squares in patterns.instances)
+        assert all(0 <= square < n * n for _, squares in patterns.instances for square in squares)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    evaluator = othello_patterns.PatternEvaluator(6, phases=3)
+    random_weights(evaluator, random.Random(PATTERNS_SEED))
+    path = str(tmp_path / 'patterns_6.bin')
+    assert othello_patterns.load_weights(6, str(tmp_path)) is None
+    evaluator.save(path)
+    loaded = othello_patterns.PatternEvaluator.load(path)
+    assert (loaded.n, loaded.phases, loaded.weights) == (6, 3, evaluator.weights)
+    assert othello_patterns.load_weights(6, str(tmp_path)).weights == evaluator.weights  # Saved after the miss
+    assert othello_patterns.load_weights(8, str(tmp_path)) is None
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / 'patterns_6.bin'
+    path.write_bytes(b'OTHR not a weights file')
+    with pytest.raises(othello_patterns.InvalidWeightsError):
+        othello_patterns.PatternEvaluator.load(str(path))
+
+
+def test_training_reduces_error(tmp_path):
+    path = str(tmp_path / 'games.bin')
+    othello_records.write_records(path, othello_patterns.self_play_records(4, 20, depth=1, seed=PATTERNS_SEED))
+    errors = []
+    othello_patterns.train(path, 4, phases=2, epochs=3, learning_rate=0.1,
+                           report=lambda epoch, positions, error: errors.append(error))
+    assert len(errors) == 3 and errors[-1] < errors[0]
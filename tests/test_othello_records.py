@@ -0,0 +1,88 @@
+# tests/test_othello_records.py
+import os
+import random
+
+import pytest
+
+import othello_logic
+import othello_records
+
+RECORDS_SEED = 99
+
+
+def random_record(n: int, rng: random.Random, max_moves: int = None) -> othello_records.GameRecord:
+    """ Plays a seeded random game, stopping after [max_moves] moves when given """
+    state, moves = othello_logic.GameState.new(n), []
+    while not state.is_game_over and (max_moves is None or len(moves) < max_moves):
+        move = rng.choice(sorted(state.legal_moves()))
+        state = state.apply(move)
+        moves.append(move)
+    return othello_records.make_record(state, moves)
+
+
+@pytest.fixture
+def records() -> [othello_records.GameRecord]:
+    rng = random.Random(RECORDS_SEED)
+    return [random_record(n, rng) for n in (4, 6, 8) for _ in range(5)] + [random_record(8, rng, max_moves=10)]
+
+
+@pytest.mark.parametrize('file_name', ['games.txt', 'games.bin'])
+def test_write_and_read_round_trip(tmp_path, records, file_name):
+    path = str(tmp_path / file_name)
+    assert othello_records.write_records(path, records) == len(records)
+    assert list(othello_records.read_records(path)) == records
+
+
+@pytest.mark.parametrize('file_name', ['games.txt', 'games.bin'])
+def test_append_round_trip(tmp_path, records, file_name):
+    path = str(tmp_path / file_name)
+    for record in records:
+        othello_records.append_record(path, record)
+    assert list(othello_records.read_records(path)) == records
+
+
+def test_append_after_another_writer_created_the_file(tmp_path, records, monkeypatch):
+    path = str(tmp_path / 'games.bin')
+    othello_records.append_record(path, records[0])
+    # As if the other writer created the file between this writer's existence check and its link
+    monkeypatch.setattr(othello_records.os.path, 'exists', lambda _: False)
+    othello_records.append_record(path, records[1])
+    assert list(othello_records.read_records(path)) == records[:2]
+    assert os.listdir(tmp_path) == ['games.bin']
+
+
+def test_text_format():
+    record = othello_records.record_from_moves(8, [othello_logic.Move(4, 5), othello_logic.Move(5, 3)])
+    assert othello_records.format_text(record) == '8 f5 d6 *'
+    assert othello_records.parse_text('8 f5 d6 *') == record
+
+
+def test_truncated_binary_file_is_rejected(tmp_path, records):
+    path = tmp_path / 'games.bin'
+    othello_records.write_records(str(path), records)
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(othello_records.InvalidRecordError):
+        list(othello_records.read_records(str(path)))
+
+
+def test_replay_yields_every_position_and_result(records):
+    for record in records:
+        positions = list(othello_records.replay(record))
+        assert [position.move for position in positions] == list(record.moves)
+        final = positions[-1].state.apply(positions[-1].move)
+        assert (final.black_count, final.white_count) == (record.black_count, record.white_count)
+        for position in positions:
+            if not record.finished:
+                assert position.result is None
+            elif position.state.curr_turn == othello_logic.P_BLACK:
+                assert position.result == record.black_count - record.white_count
+            else:
+                assert position.result == record.white_count - record.black_count
+
+
+def test_replay_file_is_lazy(tmp_path, records):
+    path = str(tmp_path / 'games.bin')
+    othello_records.write_records(path, records)
+    positions = othello_records.replay_file(path)
+    assert next(positions).move == records[0].moves[0]
+    assert sum(1 for _ in positions) == sum(len(record.moves) for record in records) - 1
@@ -0,0 +1,74 @@
+# tests/test_othello_solved.py
+import shutil
+
+import pytest
+
+import othello_ai
+import othello_endgame
+import othello_hashing
+import othello_logic
+import othello_solved
+
+SOLVED_SEED = 13
+EMPTIES = 8
+
+
+@pytest.fixture(scope='module')
+def solved_file(tmp_path_factory) -> (str, [othello_logic.GameState], dict):
+    roots = othello_solved.sample_roots(6, EMPTIES, 3, seed=SOLVED_SEED)
+    solved = othello_solved.solve_positions(roots, workers=2)
+    path = str(tmp_path_factory.mktemp('books') / 'solved_6.bin')
+    othello_solved.write_solved(path, 6, solved)
+    return path, roots, solved
+
+
+def test_sampled_roots_are_distinct(solved_file):
+    _, roots, _ = solved_file
+    assert len(roots) == 3
+    assert all(36 - root.black_count - root.white_count == EMPTIES for root in roots)
+    colors = [othello_hashing.BLACK if root.curr_turn == othello_logic.P_BLACK else othello_hashing.WHITE
+              for root in roots]
+    keys = {othello_hashing.canonical_hash(root.black, root.white, 6, color)[0] for root, color in zip(roots, colors)}
+    assert len(keys) == len(roots)
+
+
+def test_write_map_lookup_round_trip(solved_file):
+    path, roots, solved = solved_file
+    table = othello_solved.SolvedTable(path)
+    assert (table.n, len(table)) == (6, len(solved))
+    for root in roots:
+        entry = table.lookup_state(root)
+        assert entry.score == othello_endgame.solve(*root.player_bitboards(), 6).score
+        # The stored move reaches the stored score
+        child = root.apply(entry.move)
+        child_score = othello_endgame.solve(*child.player_bitboards(), 6).score
+        assert (child_score if child.curr_turn == root.curr_turn else -child_score) == entry.score
+    table.close()
+
+
+def test_every_stored_position_is_exact(solved_file):
+    path, roots, _ = solved_file
+    table = othello_solved.SolvedTable(path)
+    # The children of a root are stored too, in whatever orientation they were reached
+    for root in roots:
+        for move in root.legal_moves():
+            child = root.apply(move)
+            if child.is_game_over:
+                continue
+            entry = table.lookup_state(child)
+            assert entry.score == othello_endgame.solve(*child.player_bitboards(), 6).score
+    table.close()
+
+
+def test_choose_move_plays_the_solved_move(solved_file):
+    path, roots, _ = solved_file
+    table = othello_solved.SolvedTable(path)
+    result = othello_ai.choose_move(roots[0].to_board(), roots[0].to_game_info(), 50, solved=table)
+    assert (result.move, result.source) == (table.lookup_state(roots[0]).move, othello_ai.SOURCE_SOLVED)
+    table.close()
+
+
+def test_missing_table(tmp_path, solved_file):
+    assert othello_solved.load_table(6, str(tmp_path)) is None
+    shutil.copy(solved_file[0], othello_solved.table_path(6, str(tmp_path)))
+    assert len(othello_solved.load_table(6, str(tmp_path))) == len(solved_file[2])  # Built after the miss
@@ -0,0 +1,49 @@
+# tests/test_othello_tournament.py
+import pytest
+
+import othello_logic
+import othello_tournament
+
+TOURNAMENT_SEED = 5
+
+
+def result(game: int, black: str, white: str, winner: str) -> othello_tournament.GameResult:
+    return othello_tournament.GameResult(game, black, white, 4, 0, winner, 0, 0, '', 0.0)
+
+
+def test_repeated_specs_are_separate_entrants():
+    arguments = othello_tournament.schedule(['random', 'random', 'greedy'], 6, 4, TOURNAMENT_SEED, 0)
+    pairings = [(black, white) for _, black, white, _, _, _ in arguments]
+    assert len(set(pairings)) == 6 and all(black != white for black, white in pairings)
+    assert {black for black, _ in pairings} == {'0:random', '1:random', '2:greedy'}
+    assert othello_tournament.entrant_spec('2:ai:depth=3') == 'ai:depth=3'
+    assert othello_tournament.entrant_spec('ai:depth=3') == 'ai:depth=3'
+
+
+def test_standings_count_results_and_move_elo():
+    results = [result(0, '0:greedy', '1:greedy', othello_logic.P_BLACK),
+               result(1, '1:greedy', '0:greedy', othello_logic.P_WHITE),
+               result(2, '0:greedy', '2:random', othello_logic.TIE)]
+    table = {standing.player: standing for standing in othello_tournament.standings(results)}
+    assert set(table) == {'0:greedy', '1:greedy', '2:random'}
+    assert table['0:greedy'][1:4] == (2, 0, 1)
+    assert table['1:greedy'][1:4] == (0, 2, 0)
+    assert table['2:random'][1:4] == (0, 0, 1)
+    # A win against an equal rating is worth K/2, and Elo moves points between players without creating any
+    assert table['1:greedy'].rating < othello_tournament.ELO_START < table['2:random'].rating
+    assert table['0:greedy'].rating > othello_tournament.ELO_START + othello_tournament.ELO_K / 2
+    assert sum(standing.rating for standing in table.values()) == pytest.approx(3 * othello_tournament.ELO_START,
+                                                                                abs=0.2)
+    assert othello_tournament.standings(results)[0].player == '0:greedy'
+
+
+def test_play_game_finishes_and_is_seeded():
+    games = [othello_tournament.play_game(0, '0:greedy', '1:random', 4, TOURNAMENT_SEED, 2) for _ in range(2)]
+    assert games[0]._replace(elapsed_ms=0) == games[1]._replace(elapsed_ms=0)
+    assert games[0].black_count + games[0].white_count <= 16
+    assert (games[0].black, games[0].white) == ('0:greedy', '1:random')
+
+
+def test_unknown_bot():
+    with pytest.raises(othello_tournament.InvalidBotError):
+        othello_tournament.parse_bot('oracle')
@@ -0,0 +1,38 @@
+# tournament.py
+import argparse
+import time
+
+import othello_logic
+import othello_tournament
+
+
+def main():
+    """ Runs a self-play tournament from the command line and prints the standings """
+    parser = argparse.ArgumentParser(description='Play bots against each other across all cores.')
+    parser.add_argument('players', nargs='+',
+                        help='bot specs, e.g. random greedy ai:ms=50 ai:depth=3 ai:depth=3,patterns=books '
+                             'mcts:iterations=500 mcts:ms=100,workers=4 (the same spec may repeat)')
+    parser.add_argument('-n', '--games', type=int, default=100, help='number of games to play')
+    parser.add_argument('-s', '--size', type=int, default=8, help='board size')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the per-game seeds')
+    parser.add_argument('--opening-moves', type=int, default=4, help='random plies at the start of every game')
+    parser.add_argument('-o', '--output', default=None, help='JSONL file results are appended to')
+    args = parser.parse_args()
+    if not othello_logic.is_valid_board_size(args.size):
+        parser.error(f'invalid board size {args.size}')
+    if len(args.players) < 2:
+        parser.error('at least two players are needed')
+
+    start = time.perf_counter()
+    results = othello_tournament.run_tournament(args.players, args.games, args.size, args.workers, args.seed,
+                                                args.opening_moves, args.output)
+    elapsed = time.perf_counter() - start
+    print(f'{len(results)} games in {elapsed:.1f}s ({len(results) / elapsed:.1f} games/s)')
+    print(f'{"player":<24}{"wins":>6}{"losses":>8}{"draws":>7}{"elo":>9}')
+    for standing in othello_tournament.standings(results):
+        print(f'{standing.player:<24}{standing.wins:>6}{standing.losses:>8}{standing.draws:>7}{standing.rating:>9}')
+
+
+if __name__ == '__main__':
+    main()